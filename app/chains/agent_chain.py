@@ -1,11 +1,56 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator
 from langchain_openai import ChatOpenAI
 from langchain.agents import initialize_agent, AgentType
+from langchain.callbacks.base import AsyncCallbackHandler
 from langchain.tools import BaseTool
 from langchain.memory import ConversationBufferMemory
+from app.chains.llm_metrics import llm_metrics
 from app.tools.calculator import calculator_tool
 from app.tools.google_search import search_tool
+from app.utils.async_utils import run_async
 from app.utils.config import settings
+from app.utils.metrics import chat_stage_duration
+from app.utils.registry import registry
+from app.utils.tracing import span
+
+class FinalAnswerStreamHandler(AsyncCallbackHandler):
+    """Forwards LLM tokens that follow the agent's final answer prefix to a queue.
+    
+    Tool-selection turns never contain the prefix, so only the final answer is streamed.
+    """
+    
+    def __init__(self, queue: asyncio.Queue, answer_prefix: str = "AI:"):
+        self.queue = queue
+        self.answer_prefix = answer_prefix
+        self.buffer = ""
+        self.answer_started = False
+        self.streamed = False
+    
+    async def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        """Reset state at the start of each agent step."""
+        self.buffer = ""
+        self.answer_started = False
+    
+    async def on_chat_model_start(self, *args: Any, **kwargs: Any) -> None:
+        """Reset state at the start of each agent step."""
+        await self.on_llm_start()
+    
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """Queue tokens once the final answer prefix has been seen."""
+        if self.answer_started:
+            await self._emit(token)
+            return
+        
+        self.buffer += token
+        if self.answer_prefix in self.buffer:
+            self.answer_started = True
+            await self._emit(self.buffer.split(self.answer_prefix, 1)[1].lstrip())
+    
+    async def _emit(self, text: str) -> None:
+        if text:
+            self.streamed = True
+            await self.queue.put(text)
 
 class AgentChain:
     """LangChain agent with multiple tools for advanced reasoning."""
@@ -14,7 +59,8 @@ class AgentChain:
         self.llm = ChatOpenAI(
             openai_api_key=settings.OPENAI_API_KEY,
             model_name=settings.OPENAI_MODEL,
-            temperature=0.7
+            temperature=0.7,
+            streaming=True
         )
         self.memory = ConversationBufferMemory(
             memory_key="chat_history",
@@ -47,9 +93,22 @@ class AgentChain:
     
     def get_answer(self, question: str, session_id: str = "default") -> Dict[str, Any]:
         """Get an answer using the agent with tools."""
+        return run_async(self.aget_answer(question, session_id))
+    
+    async def aget_answer(
+        self,
+        question: str,
+        session_id: str = "default",
+        callbacks: Optional[List[AsyncCallbackHandler]] = None
+    ) -> Dict[str, Any]:
+        """Get an answer using the agent with tools without blocking the event loop."""
         try:
-            # Run the agent
-            result = self.agent.invoke({"input": question})
+            # Run the agent; the metrics handler is inherited by its model and tool calls
+            with chat_stage_duration.time(stage="agent"), span("agent"):
+                result = await self.agent.ainvoke(
+                    {"input": question},
+                    config={"callbacks": [llm_metrics, *(callbacks or [])]}
+                )
             
             # Extract reasoning if available
             reasoning = None
@@ -82,6 +141,41 @@ class AgentChain:
                 }
             }
     
+    async def astream_answer(self, question: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """Stream the agent's final answer as token events, followed by an end event."""
+        queue: asyncio.Queue = asyncio.Queue()
+        handler = FinalAnswerStreamHandler(queue, answer_prefix=f"{self.agent.agent.ai_prefix}:")
+        task = asyncio.create_task(self.aget_answer(question, session_id, callbacks=[handler]))
+        
+        try:
+            while True:
+                next_token = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({next_token, task}, return_when=asyncio.FIRST_COMPLETED)
+                if next_token in done:
+                    yield {"event": "token", "content": next_token.result()}
+                    continue
+                next_token.cancel()
+                break
+            
+            while not queue.empty():
+                yield {"event": "token", "content": queue.get_nowait()}
+            
+            result = task.result()
+            
+            # Errors and unparsed outputs never reach the answer prefix; send them whole
+            if not handler.streamed:
+                yield {"event": "token", "content": result["answer"]}
+            
+            yield {
+                "event": "end",
+                "sources": [],
+                "reasoning": result.get("reasoning"),
+                "metadata": result.get("metadata", {})
+            }
+        finally:
+            if not task.done():
+                task.cancel()
+    
     def get_tools_info(self) -> List[Dict[str, str]]:
         """Get information about available tools."""
         tools_info = []
@@ -93,4 +187,4 @@ class AgentChain:
         return tools_info
 
 # Global agent chain instance
-agent_chain = AgentChain() 
\ No newline at end of file
+agent_chain = registry.register("agent_chain", AgentChain) 
\ No newline at end of file
@@ -0,0 +1,150 @@
+import threading
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.utils.config import settings
+from app.utils.metrics import CACHE_COUNTERS, CACHE_GAUGES, metrics
+
+class SemanticAnswerCache:
+    """In-memory cache of RAG answers, looked up by question embedding similarity.
+    
+    A question whose embedding has a cosine similarity of at least `threshold` with an
+    earlier answered question gets that question's answer and sources, provided both
+    were answered in the same scope (retrieval mode and metadata filter). Entries are
+    tied to the vector store's collection version: once the collection changes, every
+    entry is dropped, since its retrieved context may no longer be what a fresh run
+    would see. With `max_entries` 0 the cache is disabled.
+    """
+    
+    def __init__(self, enabled: bool, max_entries: int, threshold: float, ttl: float):
+        self.enabled = enabled and max_entries > 0
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # One unit-length question embedding per slot, allocated on the first store
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._scopes = np.full(max_entries, None, dtype=object)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._created_at = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+    
+    def lookup(self, embedding: List[float], collection_version: int, scope: str = "") -> Optional[Dict[str, Any]]:
+        """Get the cached answer of the most similar earlier question in `scope`, if similar enough."""
+        vector = self._normalize(embedding)
+        now = time.time()
+        
+        with self._lock:
+            self._check_version(collection_version)
+            
+            live = self._valid & (now - self._created_at < self.ttl) & (self._scopes == scope)
+            if self._matrix is None or not live.any():
+                self.misses += 1
+                return None
+            
+            scores = self._matrix @ vector
+            scores[~live] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self._last_used[best] = now
+            return dict(self._entries[best], similarity=float(scores[best]))
+    
+    def store(
+        self,
+        embedding: List[float],
+        collection_version: int,
+        question: str,
+        answer: str,
+        sources: List[str],
+        scope: str = ""
+    ) -> None:
+        """Cache an answer computed against the given collection version within `scope`."""
+        vector = self._normalize(embedding)
+        now = time.time()
+        
+        with self._lock:
+            self._check_version(collection_version)
+            # The collection changed while the answer was being generated
+            if collection_version != self._version:
+                return
+            
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._valid[:] = False
+            
+            free = np.flatnonzero(~self._valid | (now - self._created_at >= self.ttl))
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            
+            self._matrix[slot] = vector
+            self._entries[slot] = {"question": question, "answer": answer, "sources": sources}
+            self._scopes[slot] = scope
+            self._valid[slot] = True
+            self._created_at[slot] = now
+            self._last_used[slot] = now
+    
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._valid[:] = False
+            self._entries = [None] * self.max_entries
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the number of cached answers."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": int(self._valid.sum()),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
+    
+    def _check_version(self, collection_version: int) -> None:
+        """Drop every entry if the collection moved past the version they were built on."""
+        if self._version is not None and collection_version <= self._version:
+            return
+        if self._valid.any():
+            self.invalidations += 1
+            self._valid[:] = False
+            self._entries = [None] * self.max_entries
+        self._version = collection_version
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+# Global answer cache instance
+answer_cache = SemanticAnswerCache(
+    settings.ANSWER_CACHE_ENABLED,
+    settings.ANSWER_CACHE_MAX_ENTRIES,
+    settings.ANSWER_CACHE_THRESHOLD,
+    settings.ANSWER_CACHE_TTL
+)
+
+metrics.export_stats(
+    "contextagent_cache",
+    answer_cache.get_stats,
+    counters={**CACHE_COUNTERS, "invalidations": "Times the cache was emptied because the collection changed"},
+    gauges=CACHE_GAUGES,
+    labels={"cache": "answer"}
+)
\ No newline at end of file
@@ -0,0 +1,150 @@
+from typing import List, Dict, Any, Optional, Tuple
+from langchain.schema import Document
+from app.utils.config import settings
+from app.utils.tokens import count_tokens
+
+# Chunks of one source whose character ranges are at most this far apart are merged;
+# the splitter strips the separator whitespace between neighbouring chunks
+ADJACENT_GAP = 4
+# Bounds of a text overlap recognised between chunks indexed without a start offset
+MIN_TEXT_OVERLAP = 20
+MAX_TEXT_OVERLAP = 400
+
+class _Segment:
+    """A run of merged chunks from one source, covering [start, end) when offsets are known."""
+    
+    __slots__ = ("key", "rank", "metadata", "text", "start", "end", "tokens", "chunks")
+    
+    def __init__(
+        self,
+        key: Tuple,
+        rank: int,
+        metadata: Dict[str, Any],
+        text: str,
+        start: Optional[int],
+        end: Optional[int],
+        chunks: int = 1
+    ):
+        self.key = key
+        self.rank = rank
+        self.metadata = metadata
+        self.text = text
+        self.start = start
+        self.end = end
+        self.tokens = count_tokens(text)
+        self.chunks = chunks
+
+class ContextBuilder:
+    """Assembles retrieved chunks into prompt context within a token budget.
+    
+    Chunks are taken in relevance order. One that overlaps or directly follows a chunk
+    of the same source (and page) already taken is merged with it, so the text the
+    splitter repeats between neighbouring chunks is sent once; exact duplicates are
+    dropped. Chunks whose new text no longer fits in `max_tokens` are skipped, and the
+    merged passages keep the rank of their most relevant chunk.
+    """
+    
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+    
+    def build(self, docs: List[Document]) -> Tuple[List[Document], Dict[str, Any]]:
+        """Return the context documents and token accounting for the given retrieved chunks."""
+        segments: List[_Segment] = []
+        seen = set()
+        retrieved_tokens = 0
+        used_tokens = 0
+        dropped = 0
+        
+        for rank, doc in enumerate(docs):
+            retrieved_tokens += count_tokens(doc.page_content)
+            if doc.page_content in seen:
+                continue
+            seen.add(doc.page_content)
+            
+            merged, absorbed = self._merge(rank, doc, segments)
+            cost = merged.tokens - sum(segment.tokens for segment in absorbed)
+            if self.max_tokens and used_tokens + cost > self.max_tokens:
+                dropped += 1
+                continue
+            used_tokens += cost
+            segments = [segment for segment in segments if segment not in absorbed]
+            segments.append(merged)
+        
+        segments.sort(key=lambda segment: segment.rank)
+        context = [Document(page_content=segment.text, metadata=segment.metadata) for segment in segments]
+        return context, {
+            "retrieved_tokens": retrieved_tokens,
+            "context_tokens": used_tokens,
+            "tokens_saved": retrieved_tokens - used_tokens,
+            "chunks_merged": sum(segment.chunks - 1 for segment in segments),
+            "chunks_dropped": dropped
+        }
+    
+    def _merge(self, rank: int, doc: Document, segments: List[_Segment]) -> Tuple[_Segment, List[_Segment]]:
+        """A segment holding `doc` and the segments it joins, plus the ones it absorbed."""
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        start = doc.metadata.get("start_index")
+        if isinstance(start, int) and start >= 0:
+            merged = _Segment(key, rank, doc.metadata, doc.page_content, start, start + len(doc.page_content))
+        else:
+            merged = _Segment(key, rank, doc.metadata, doc.page_content, None, None)
+        
+        absorbed = []
+        # Joining one segment can bring the merged range within reach of another
+        changed = True
+        while changed:
+            changed = False
+            for segment in segments:
+                if segment in absorbed or segment.key != key:
+                    continue
+                joined = self._join(segment, merged)
+                if joined is not None:
+                    merged = joined
+                    absorbed.append(segment)
+                    changed = True
+        return merged, absorbed
+    
+    @staticmethod
+    def _join(a: _Segment, b: _Segment) -> Optional[_Segment]:
+        """Merge two segments of one source if they overlap or are adjacent."""
+        rank = min(a.rank, b.rank)
+        metadata = a.metadata if a.rank < b.rank else b.metadata
+        chunks = a.chunks + b.chunks
+        
+        if a.start is not None and b.start is not None:
+            first, second = (a, b) if a.start <= b.start else (b, a)
+            gap = second.start - first.end
+            if gap > ADJACENT_GAP:
+                return None
+            if gap > 0:
+                # Stand in for the stripped separator with as many newlines, keeping offsets exact
+                text = first.text + "\n" * gap + second.text
+                return _Segment(a.key, rank, metadata, text, first.start, second.end, chunks)
+            
+            # Only trust the offsets if the overlapping text agrees, e.g. not for re-split chunks
+            offset = second.start - first.start
+            overlap = min(first.end, second.end) - second.start
+            if first.text[offset:offset + overlap] == second.text[:overlap]:
+                text = first.text + second.text[overlap:]
+                return _Segment(a.key, rank, metadata, text, first.start, max(first.end, second.end), chunks)
+        
+        text = _text_merge(a.text, b.text)
+        if text is None:
+            return None
+        return _Segment(a.key, rank, metadata, text, None, None, chunks)
+
+def _text_merge(a: str, b: str) -> Optional[str]:
+    """Merge two texts if one contains the other or one's end overlaps the other's start."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for overlap in range(min(len(a), len(b), MAX_TEXT_OVERLAP), MIN_TEXT_OVERLAP - 1, -1):
+        if a.endswith(b[:overlap]):
+            return a + b[overlap:]
+        if b.endswith(a[:overlap]):
+            return b + a[overlap:]
+    return None
+
+# Global context builder instance
+context_builder = ContextBuilder(settings.CONTEXT_MAX_TOKENS) 
\ No newline at end of file
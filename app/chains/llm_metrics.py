@@ -0,0 +1,124 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import BaseMessage, LLMResult
+from app.utils.metrics import metrics
+from app.utils.tokens import count_tokens
+from app.utils.tracing import Span, current_span
+
+llm_request_duration = metrics.histogram(
+    "contextagent_llm_request_duration_seconds",
+    "Latency of chat model calls, until the last token of streamed calls",
+    ["model"]
+)
+llm_tokens = metrics.counter(
+    "contextagent_llm_tokens_total",
+    "Chat model tokens by kind (prompt or completion), as reported by the API or counted when streaming",
+    ["model", "kind"]
+)
+llm_errors = metrics.counter("contextagent_llm_errors_total", "Failed chat model calls", ["model"])
+llm_requests_in_flight = metrics.gauge("contextagent_llm_requests_in_flight", "Chat model calls in progress")
+tool_duration = metrics.histogram("contextagent_agent_tool_duration_seconds", "Latency of agent tool calls", ["tool"])
+tool_errors = metrics.counter("contextagent_agent_tool_errors_total", "Failed agent tool calls", ["tool"])
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Records the latency, token usage and failures of chat model and tool calls.
+    
+    Attached to a chat model, it sees every call made through it, including those of
+    the chains built on it. Streamed calls report no token usage, so their prompt and
+    completion are counted when they end. In a traced request every call is also added
+    to the trace, with the agent's calls grouped into one `agent_step` span per iteration.
+    """
+    
+    # Bookkeeping only; running it in the thread pool would cost more than it does
+    run_inline = True
+    
+    def __init__(self):
+        self._llm_runs: Dict[UUID, Tuple[float, str, List[List[BaseMessage]], Optional[Span]]] = {}
+        self._tool_runs: Dict[UUID, Tuple[float, str, Optional[Span]]] = {}
+    
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or "unknown"
+        self._llm_runs[run_id] = (time.perf_counter(), model, messages, self._start_span("llm", model=model))
+        llm_requests_in_flight.inc()
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        start, model, messages, span = run
+        llm_requests_in_flight.inc(-1.0)
+        llm_request_duration.observe(time.perf_counter() - start, model=model)
+        
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        else:
+            prompt_tokens = sum(count_tokens(str(message.content), model) for batch in messages for message in batch)
+            completion_tokens = sum(
+                count_tokens(generation.text, model) for generations in response.generations for generation in generations
+            )
+        llm_tokens.inc(prompt_tokens, model=model, kind="prompt")
+        llm_tokens.inc(completion_tokens, model=model, kind="completion")
+        if span is not None:
+            span.finish(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        start, model, _, span = run
+        llm_requests_in_flight.inc(-1.0)
+        llm_request_duration.observe(time.perf_counter() - start, model=model)
+        llm_errors.inc(model=model)
+        if span is not None:
+            span.finish(error=repr(error))
+    
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        tool = serialized.get("name", "unknown")
+        self._tool_runs[run_id] = (time.perf_counter(), tool, self._start_span("tool", tool=tool))
+    
+    def on_tool_end(self, output: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._tool_runs.pop(run_id, None)
+        if run is not None:
+            start, tool, span = run
+            tool_duration.observe(time.perf_counter() - start, tool=tool)
+            if span is not None:
+                span.finish()
+    
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._tool_runs.pop(run_id, None)
+        if run is not None:
+            start, tool, span = run
+            tool_duration.observe(time.perf_counter() - start, tool=tool)
+            tool_errors.inc(tool=tool)
+            if span is not None:
+                span.finish(error=repr(error))
+    
+    @staticmethod
+    def _start_span(name: str, **attributes: Any) -> Optional[Span]:
+        """Add a call to the current trace; under the agent, a model call starts its next iteration."""
+        parent = current_span()
+        if parent is None:
+            return None
+        if parent.name == "agent":
+            steps = [child for child in parent.children if child.name == "agent_step"]
+            if name == "llm" or not steps:
+                if steps:
+                    steps[-1].finish()
+                steps.append(parent.child("agent_step", step=len(steps) + 1))
+            parent = steps[-1]
+        return parent.child(name, **attributes)
+
+# Global LLM metrics handler
+llm_metrics = LLMMetricsHandler() 
\ No newline at end of file
@@ -1,10 +1,22 @@
-from typing import List, Dict, Any, Optional
+import json
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from langchain_openai import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
-from langchain.schema import Document
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+from langchain.schema import BaseRetriever, Document, format_document
+from app.chains.answer_cache import answer_cache
+from app.chains.context_builder import context_builder
+from app.chains.llm_metrics import llm_metrics
 from app.ingest.vector_store import vector_store
-from app.memory.session_memory import memory_manager
+from app.memory.session_memory import SessionMemory, memory_manager
+from app.memory.summary import conversation_summarizer
+from app.utils.async_utils import run_async, run_sync
 from app.utils.config import settings
+from app.utils.metrics import chat_stage_duration
+from app.utils.registry import registry
+from app.utils.tracing import annotate, span
+
+NO_DOCUMENTS_ANSWER = "I don't have any relevant documents to answer your question. Please upload some documents first."
 
 class QAChain:
     """RAG-based question answering chain."""
@@ -13,7 +25,8 @@ class QAChain:
         self.llm = ChatOpenAI(
             openai_api_key=settings.OPENAI_API_KEY,
             model_name=settings.OPENAI_MODEL,
-            temperature=0.7
+            temperature=0.7,
+            callbacks=[llm_metrics]
         )
         self.chain = None
         self._initialize_chain()
@@ -21,10 +34,7 @@ class QAChain:
     def _initialize_chain(self):
         """Initialize the conversational retrieval chain."""
         # Create a retriever from the vector store
-        retriever = vector_store.vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 4}
-        )
+        retriever = vector_store.as_retriever(k=4)
         
         # Create the conversational chain
         self.chain = ConversationalRetrievalChain.from_llm(
@@ -34,41 +44,80 @@ class QAChain:
             verbose=False
         )
     
-    def get_answer(self, question: str, session_id: str = "default") -> Dict[str, Any]:
-        """Get an answer using RAG pipeline."""
+    def get_answer(
+        self,
+        question: str,
+        session_id: str = "default",
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Get an answer using RAG pipeline from synchronous code; use `aget_answer` in an event loop."""
+        return run_async(self.aget_answer(question, session_id, retrieval_mode, filter))
+    
+    async def aget_answer(
+        self,
+        question: str,
+        session_id: str = "default",
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        retriever: Optional[BaseRetriever] = None
+    ) -> Dict[str, Any]:
+        """Get an answer using RAG pipeline without blocking the event loop.
+        
+        Semantically equivalent questions asked earlier are answered from the answer cache
+        until the collection changes. `retrieval_mode` overrides RETRIEVAL_MODE, and
+        `filter` (a Chroma-style `where`) restricts retrieval to matching chunks. A given
+        `retriever` replaces the one built from them, e.g. to share retrieval in a batch.
+        """
         try:
-            # Get session memory
-            session_memory = memory_manager.get_session(session_id)
+            # Get session memory and conversation history
+            session_memory, chat_history = await self._aload_session(session_id)
             
-            # Get conversation history
-            chat_history = session_memory.get_messages()
+            # Condense first, so the cache is keyed by the question actually answered
+            standalone_question = await self._acondense_question(question, chat_history)
+            cached, embedding, version = await self._alookup_answer(standalone_question, retrieval_mode, filter)
             
-            # Run the chain
-            result = self.chain({
-                "question": question,
-                "chat_history": chat_history
-            })
+            if cached:
+                await self._aremember(session_memory, question, cached["answer"])
+                return {
+                    "answer": cached["answer"],
+                    "sources": cached["sources"],
+                    "cached": True,
+                    "metadata": self._cached_metadata(cached, session_id)
+                }
+            
+            # Run the chain's retrieve and answer stages on the standalone question, with
+            # the retrieved chunks merged and fitted to the context token budget
+            retriever = retriever or self._retriever(retrieval_mode, filter)
+            source_docs, context_docs, context_stats = await self._aretrieve_context(retriever, standalone_question)
+            with chat_stage_duration.time(stage="answer"), span("answer"):
+                answer = await self.chain.combine_docs_chain.arun(
+                    input_documents=context_docs,
+                    question=standalone_question
+                )
             
             # Extract source documents
-            source_docs = result.get("source_documents", [])
-            sources = []
-            for doc in source_docs:
-                if hasattr(doc, 'metadata') and doc.metadata:
-                    source = doc.metadata.get('source', 'unknown')
-                    if source not in sources:
-                        sources.append(source)
+            sources = self._extract_sources(context_docs)
+            
+            if embedding is not None:
+                answer_cache.store(
+                    embedding, version, standalone_question, answer, sources,
+                    self._answer_scope(retrieval_mode, filter)
+                )
             
             # Add to memory
-            session_memory.add_message("user", question)
-            session_memory.add_message("agent", result["answer"])
+            await self._aremember(session_memory, question, answer)
             
             return {
-                "answer": result["answer"],
+                "answer": answer,
                 "sources": sources,
+                "cached": False,
                 "metadata": {
                     "model": settings.OPENAI_MODEL,
                     "session_id": session_id,
-                    "documents_retrieved": len(source_docs)
+                    "documents_retrieved": len(source_docs),
+                    "retrieval_mode": retrieval_mode or settings.RETRIEVAL_MODE,
+                    **self._context_metadata(context_stats)
                 }
             }
             
@@ -82,20 +131,276 @@ class QAChain:
                 }
             }
     
-    def get_simple_answer(self, question: str) -> str:
+    async def astream_answer(
+        self,
+        question: str,
+        session_id: str = "default",
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a RAG answer as token events, followed by an end event with sources and metadata.
+        
+        Runs the same stages as the conversational retrieval chain (condense question,
+        retrieve, answer) with the chain's own prompts, streaming only the final answer.
+        """
+        try:
+            session_memory, chat_history = await self._aload_session(session_id)
+            
+            # Condense the follow-up question into a standalone one
+            standalone_question = await self._acondense_question(question, chat_history)
+            cached, embedding, version = await self._alookup_answer(standalone_question, retrieval_mode, filter)
+            
+            if cached:
+                await self._aremember(session_memory, question, cached["answer"])
+                yield {"event": "token", "content": cached["answer"]}
+                yield {
+                    "event": "end",
+                    "sources": cached["sources"],
+                    "cached": True,
+                    "metadata": self._cached_metadata(cached, session_id)
+                }
+                return
+            
+            source_docs, context_docs, context_stats = await self._aretrieve_context(
+                self._retriever(retrieval_mode, filter), standalone_question
+            )
+            
+            # Build the answer prompt exactly as the stuff documents chain would
+            combine_chain = self.chain.combine_docs_chain
+            context = combine_chain.document_separator.join(
+                format_document(doc, combine_chain.document_prompt) for doc in context_docs
+            )
+            prompt = combine_chain.llm_chain.prompt.format_prompt(**{
+                combine_chain.document_variable_name: context,
+                "question": standalone_question
+            })
+            
+            answer = ""
+            with chat_stage_duration.time(stage="answer"), span("answer"):
+                async for chunk in self.llm.astream(prompt):
+                    if chunk.content:
+                        answer += chunk.content
+                        yield {"event": "token", "content": chunk.content}
+            
+            sources = self._extract_sources(context_docs)
+            if embedding is not None:
+                answer_cache.store(
+                    embedding, version, standalone_question, answer, sources,
+                    self._answer_scope(retrieval_mode, filter)
+                )
+            
+            # Add to memory
+            await self._aremember(session_memory, question, answer)
+            
+            yield {
+                "event": "end",
+                "sources": sources,
+                "cached": False,
+                "metadata": {
+                    "model": settings.OPENAI_MODEL,
+                    "session_id": session_id,
+                    "documents_retrieved": len(source_docs),
+                    "retrieval_mode": retrieval_mode or settings.RETRIEVAL_MODE,
+                    **self._context_metadata(context_stats)
+                }
+            }
+            
+        except Exception as e:
+            yield {"event": "error", "detail": f"I encountered an error while processing your question: {str(e)}"}
+    
+    async def _acondense_question(self, question: str, chat_history: List) -> str:
+        """Rephrase a follow-up question as a standalone one using the chain's own prompt."""
+        if not chat_history:
+            return question
+        with chat_stage_duration.time(stage="condense_question"), span("condense_question"):
+            return await self.chain.question_generator.arun(
+                question=question,
+                chat_history=_get_chat_history(chat_history)
+            )
+    
+    @staticmethod
+    async def _aretrieve_context(
+        retriever: BaseRetriever,
+        question: str
+    ) -> Tuple[List[Document], List[Document], Dict[str, Any]]:
+        """Retrieve chunks for a question and fit them to the context budget.
+        
+        Returns the retrieved chunks, the context documents and the context token accounting.
+        """
+        with chat_stage_duration.time(stage="retrieval"), span("retrieval"):
+            source_docs = await retriever.aget_relevant_documents(question)
+            annotate(documents=len(source_docs))
+        with chat_stage_duration.time(stage="context_build"), span("context_build"):
+            context_docs, context_stats = context_builder.build(source_docs)
+            annotate(**context_stats)
+        return source_docs, context_docs, context_stats
+    
+    @staticmethod
+    async def _aload_session(session_id: str) -> Tuple[SessionMemory, List]:
+        """Get a session's memory and its conversation history.
+        
+        Runs in the thread pool, since a persistent session backend reads SQLite.
+        """
+        with span("memory_load", session_id=session_id):
+            session_memory = await run_sync(memory_manager.get_session, session_id)
+            chat_history = session_memory.get_messages()
+            annotate(messages=len(chat_history))
+        return session_memory, chat_history
+    
+    @staticmethod
+    async def _aremember(session_memory: SessionMemory, question: str, answer: str) -> None:
+        """Store a turn; older turns are summarized in the background, after the response."""
+        with span("memory_save", session_id=session_memory.session_id):
+            await run_sync(session_memory.add_messages, [("user", question), ("agent", answer)])
+            conversation_summarizer.schedule(session_memory)
+    
+    def _retriever(self, retrieval_mode: Optional[str], filter: Optional[Dict[str, Any]]) -> BaseRetriever:
+        """The chain's retriever, or one using another retrieval mode or filter."""
+        if not retrieval_mode and not filter:
+            return self.chain.retriever
+        return vector_store.as_retriever(k=self.chain.retriever.k, mode=retrieval_mode, filter=filter)
+    
+    @staticmethod
+    async def _alookup_answer(
+        question: str,
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]], Optional[int]]:
+        """Look a question up in the answer cache.
+        
+        Returns the cached entry (or None), plus the question embedding and collection
+        version to store a fresh answer under. Only answers retrieved with the same mode
+        and filter match. Lexical retrieval skips the cache, since the lookup itself would
+        need the embedding call that mode avoids.
+        """
+        if not answer_cache.enabled or (retrieval_mode or settings.RETRIEVAL_MODE) == "lexical":
+            return None, None, None
+        
+        with chat_stage_duration.time(stage="answer_cache_lookup"), span("answer_cache_lookup"):
+            version = vector_store.collection_version
+            embedding = await vector_store.aembed_query(question)
+            cached = answer_cache.lookup(embedding, version, QAChain._answer_scope(retrieval_mode, filter))
+            annotate(hit=cached is not None)
+            return cached, embedding, version
+    
+    @staticmethod
+    def _answer_scope(retrieval_mode: Optional[str], filter: Optional[Dict[str, Any]]) -> str:
+        """Answer cache scope: answers retrieved with another mode or filter never match."""
+        return json.dumps([retrieval_mode or settings.RETRIEVAL_MODE, filter or None], sort_keys=True, default=str)
+    
+    @staticmethod
+    def _cached_metadata(cached: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        return {
+            "model": settings.OPENAI_MODEL,
+            "session_id": session_id,
+            "documents_retrieved": 0,
+            "cache_similarity": round(cached["similarity"], 4),
+            "cached_question": cached["question"]
+        }
+    
+    @staticmethod
+    def _context_metadata(context_stats: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "context_tokens": context_stats["context_tokens"],
+            "context_tokens_saved": context_stats["tokens_saved"],
+            "chunks_merged": context_stats["chunks_merged"],
+            "chunks_dropped": context_stats["chunks_dropped"]
+        }
+    
+    @staticmethod
+    def _extract_sources(source_docs: List[Document]) -> List[str]:
+        """Get the unique sources of a list of documents, in retrieval order."""
+        sources = []
+        for doc in source_docs:
+            if hasattr(doc, 'metadata') and doc.metadata:
+                source = doc.metadata.get('source', 'unknown')
+                if source not in sources:
+                    sources.append(source)
+        return sources
+    
+    def get_simple_answer(
+        self,
+        question: str,
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Get a simple answer without conversation history."""
+        return run_async(self.aget_simple_answer(question, retrieval_mode, filter))
+    
+    async def aget_simple_answer(
+        self,
+        question: str,
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        retriever: Optional[BaseRetriever] = None
+    ) -> str:
+        """Get a simple answer without conversation history, asynchronously."""
+        result = await self.aget_simple_result(question, retrieval_mode, filter, retriever)
+        return result["answer"]
+    
+    async def aget_simple_result(
+        self,
+        question: str,
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        retriever: Optional[BaseRetriever] = None
+    ) -> Dict[str, Any]:
+        """Get a simple answer without conversation history, with its metadata."""
+        metadata = {"model": "simple_llm"}
         try:
             # Get relevant documents
-            relevant_docs = vector_store.get_relevant_documents(question)
+            retriever = retriever or self._retriever(retrieval_mode, filter)
+            relevant_docs, context_docs, context_stats = await self._aretrieve_context(retriever, question)
             
             if not relevant_docs:
-                return "I don't have any relevant documents to answer your question. Please upload some documents first."
+                return {"answer": NO_DOCUMENTS_ANSWER, "metadata": metadata}
             
-            # Create context from documents
-            context = "\n\n".join([doc.page_content for doc in relevant_docs])
+            prompt = self._build_simple_prompt(question, context_docs)
+            
+            # Get response from LLM
+            with chat_stage_duration.time(stage="answer"), span("answer"):
+                response = await self.llm.ainvoke(prompt)
             
-            # Create prompt
-            prompt = f"""Based on the following context, answer the question. If the answer cannot be found in the context, say so.
+            return {"answer": response.content, "metadata": {**metadata, **self._context_metadata(context_stats)}}
+            
+        except Exception as e:
+            return {"answer": f"I encountered an error: {str(e)}", "metadata": metadata}
+    
+    async def astream_simple_answer(
+        self,
+        question: str,
+        retrieval_mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a simple answer as token events, followed by an end event."""
+        try:
+            relevant_docs, context_docs, context_stats = await self._aretrieve_context(
+                self._retriever(retrieval_mode, filter), question
+            )
+            metadata = {"model": "simple_llm"}
+            
+            if not relevant_docs:
+                yield {"event": "token", "content": NO_DOCUMENTS_ANSWER}
+            else:
+                metadata.update(self._context_metadata(context_stats))
+                prompt = self._build_simple_prompt(question, context_docs)
+                with chat_stage_duration.time(stage="answer"), span("answer"):
+                    async for chunk in self.llm.astream(prompt):
+                        if chunk.content:
+                            yield {"event": "token", "content": chunk.content}
+            
+            yield {"event": "end", "sources": [], "metadata": metadata}
+            
+        except Exception as e:
+            yield {"event": "error", "detail": f"I encountered an error: {str(e)}"}
+    
+    @staticmethod
+    def _build_simple_prompt(question: str, relevant_docs: List[Document]) -> str:
+        """Create the single-turn prompt used by the simple answer path."""
+        # Create context from documents
+        context = "\n\n".join([doc.page_content for doc in relevant_docs])
+        
+        return f"""Based on the following context, answer the question. If the answer cannot be found in the context, say so.
 
 Context:
 {context}
@@ -103,14 +408,6 @@ Context:
 Question: {question}
 
 Answer:"""
-            
-            # Get response from LLM
-            response = self.llm.invoke(prompt)
-            
-            return response.content
-            
-        except Exception as e:
-            return f"I encountered an error: {str(e)}"
 
 # Global QA chain instance
-qa_chain = QAChain() 
\ No newline at end of file
+qa_chain = registry.register("qa_chain", QAChain) 
\ No newline at end of file
@@ -0,0 +1,701 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+from app.utils.config import settings
+
+class VectorBackend(ABC):
+    """Storage and nearest-neighbour search for pre-embedded chunks.
+    
+    VectorStore owns chunking, embedding, caching and versioning; a backend only stores
+    vectors with their text and metadata and searches them. Scores are distances:
+    lower means more similar.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    def upsert(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> None:
+        """Insert chunks, replacing any with the same ID."""
+    
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Delete chunks by ID."""
+    
+    @abstractmethod
+    def search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Return the k nearest chunks matching the metadata filter."""
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks."""
+    
+    @abstractmethod
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[Document]]]:
+        """Yield every stored chunk as batches of (IDs, documents)."""
+    
+    def persist(self) -> None:
+        """Flush pending writes to disk."""
+    
+    def warm_up(self) -> None:
+        """Open the index and page it into memory ahead of the first query."""
+        self.count()
+    
+    def refresh(self) -> bool:
+        """Reopen the index if another process has persisted a new version; True if it changed."""
+        return False
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """Delete all chunks."""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend-specific statistics."""
+        return {"backend": self.name}
+
+class ChromaBackend(VectorBackend):
+    """Chroma collection persisted to a local directory."""
+    
+    name = "chroma"
+    
+    def __init__(self, persist_directory: str, embedding_function: Embeddings):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.store = self._open()
+    
+    def _open(self) -> Chroma:
+        return Chroma(persist_directory=self.persist_directory, embedding_function=self.embedding_function)
+    
+    def upsert(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> None:
+        self.store._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in documents],
+            documents=[doc.page_content for doc in documents]
+        )
+    
+    def delete(self, ids: List[str]) -> None:
+        self.store._collection.delete(ids=ids)
+    
+    def search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        return self.store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+    
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[Document]]]:
+        offset = 0
+        while True:
+            batch = self.store._collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            if not batch["ids"]:
+                return
+            yield batch["ids"], [
+                Document(page_content=content, metadata=metadata or {})
+                for content, metadata in zip(batch["documents"], batch["metadatas"])
+            ]
+            offset += len(batch["ids"])
+    
+    def count(self) -> int:
+        return self.store._collection.count()
+    
+    def warm_up(self) -> None:
+        """Run one query with a stored vector, which makes Chroma load the HNSW index."""
+        sample = self.store._collection.get(limit=1, include=["embeddings"])
+        if sample["ids"]:
+            self.store._collection.query(query_embeddings=sample["embeddings"], n_results=1)
+    
+    def persist(self) -> None:
+        self.store.persist()
+    
+    def clear(self) -> None:
+        self.store.delete_collection()
+        self.store = self._open()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "persist_directory": self.persist_directory}
+
+class ReadWriteLock:
+    """Lets any number of searches run together while writes get exclusive access."""
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+    
+    def acquire_read(self) -> None:
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+    
+    def release_read(self) -> None:
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+    
+    def acquire_write(self) -> None:
+        with self._condition:
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writing = True
+    
+    def release_write(self) -> None:
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+class ChunkStore:
+    """SQLite store of chunk text and metadata for backends that only index vectors.
+    
+    Each chunk gets a fresh integer row ID whenever it is written, which is the ID used
+    in the vector index; a replaced or deleted chunk's old row ID simply stops resolving.
+    Scalar metadata values are also indexed per (key, value), so `select` can resolve a
+    filter to the matching row IDs before any vector is searched.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row_id INTEGER PRIMARY KEY AUTOINCREMENT, chunk_id TEXT UNIQUE NOT NULL, "
+            "content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        # No column type, so values keep their own type and compare like the Python originals
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_fields ("
+            "key TEXT NOT NULL, value, row_id INTEGER NOT NULL, PRIMARY KEY (key, value, row_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_fields_row_id ON chunk_fields(row_id)")
+        self._conn.commit()
+        self._index_existing_fields()
+    
+    def _index_existing_fields(self) -> None:
+        """Index the metadata of chunks written before the field index existed."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM chunk_fields LIMIT 1").fetchone():
+                return
+            rows = self._conn.execute("SELECT row_id, metadata FROM chunks").fetchall()
+            for row_id, metadata in rows:
+                self._insert_fields(row_id, json.loads(metadata))
+            self._conn.commit()
+    
+    def _insert_fields(self, row_id: int, metadata: Dict[str, Any]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO chunk_fields (key, value, row_id) VALUES (?, ?, ?)",
+            [
+                (key, value, row_id) for key, value in metadata.items()
+                if isinstance(value, (str, int, float, bool))
+            ]
+        )
+    
+    def _delete_fields(self, row_ids: List[int]) -> None:
+        for start in range(0, len(row_ids), 500):
+            part = row_ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            self._conn.execute(f"DELETE FROM chunk_fields WHERE row_id IN ({placeholders})", part)
+    
+    def write(self, ids: List[str], documents: List[Document]) -> Tuple[List[int], List[int]]:
+        """Store chunks, returning their new row IDs and the row IDs they replaced."""
+        with self._lock:
+            replaced = self._row_ids(ids)
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            self._delete_fields(replaced)
+            row_ids = []
+            for chunk_id, doc in zip(ids, documents):
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, content, metadata) VALUES (?, ?, ?)",
+                    (chunk_id, doc.page_content, json.dumps(doc.metadata))
+                )
+                row_ids.append(cursor.lastrowid)
+                self._insert_fields(cursor.lastrowid, doc.metadata)
+            self._conn.commit()
+        return row_ids, replaced
+    
+    def remove(self, ids: List[str]) -> List[int]:
+        """Delete chunks, returning their row IDs."""
+        with self._lock:
+            row_ids = self._row_ids(ids)
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            self._delete_fields(row_ids)
+            self._conn.commit()
+        return row_ids
+    
+    def get(self, row_ids: List[int]) -> Dict[int, Document]:
+        """Load the documents of live row IDs."""
+        rows = []
+        with self._lock:
+            for start in range(0, len(row_ids), 500):
+                part = row_ids[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows.extend(self._conn.execute(
+                    f"SELECT row_id, content, metadata FROM chunks WHERE row_id IN ({placeholders})", part
+                ))
+        return {
+            row_id: Document(page_content=content, metadata=json.loads(metadata))
+            for row_id, content, metadata in rows
+        }
+    
+    def iter_chunks(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[Document]]]:
+        """Yield every chunk as batches of (chunk IDs, documents), in row ID order."""
+        last_row_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT row_id, chunk_id, content, metadata FROM chunks WHERE row_id > ? ORDER BY row_id LIMIT ?",
+                    (last_row_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [row[1] for row in rows], [
+                Document(page_content=content, metadata=json.loads(metadata)) for _, _, content, metadata in rows
+            ]
+            last_row_id = rows[-1][0]
+    
+    def select(self, where: Dict[str, Any]) -> List[int]:
+        """Row IDs of the chunks whose metadata matches a Chroma-style `where` filter."""
+        sql, params = _where_sql(where)
+        with self._lock:
+            return [row_id for (row_id,) in self._conn.execute(f"SELECT row_id FROM chunks WHERE {sql}", params)]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM chunk_fields")
+            self._conn.commit()
+    
+    def _row_ids(self, ids: List[str]) -> List[int]:
+        row_ids = []
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            row_ids.extend(
+                row_id for (row_id,) in self._conn.execute(
+                    f"SELECT row_id FROM chunks WHERE chunk_id IN ({placeholders})", part
+                )
+            )
+        return row_ids
+
+def matches_filter(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style `where` filter against chunk metadata.
+    
+    Supports equality, `$eq`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte`, `$in`, `$nin`, and
+    `$and`/`$or` lists, so the same filters work on every backend.
+    """
+    if not where:
+        return True
+    
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if not _compare(value, operator, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+_SQL_OPERATORS = {"$eq": "=", "$ne": "=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Translate a `where` filter into SQL over ChunkStore's field index.
+    
+    Mirrors matches_filter: `$ne` and `$nin` also match chunks without the key.
+    """
+    clauses, params = [], []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_sql(clause) for clause in condition]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")" if parts else "1")
+            params.extend(param for _, part_params in parts for param in part_params)
+            continue
+        
+        for operator, operand in (condition.items() if isinstance(condition, dict) else [("$eq", condition)]):
+            if operator in ("$in", "$nin"):
+                comparison = f"value IN ({','.join('?' * len(operand))})"
+                operands = list(operand)
+            elif operator in _SQL_OPERATORS:
+                comparison = f"value {_SQL_OPERATORS[operator]} ?"
+                operands = [operand]
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            membership = "NOT IN" if operator in ("$ne", "$nin") else "IN"
+            clauses.append(f"row_id {membership} (SELECT row_id FROM chunk_fields WHERE key = ? AND {comparison})")
+            params.extend([key, *operands])
+    return " AND ".join(clauses) or "1", params
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+class FaissBackend(VectorBackend):
+    """FAISS index persisted to disk, with chunk text and metadata in a ChunkStore.
+    
+    `index_type` is `flat` (exact), `ivf` (inverted lists; exact flat search until
+    enough vectors exist to train it) or `hnsw` (graph). With `mmap`, the inverted lists
+    of a persisted flat or IVF index are memory-mapped read-only at startup, so several
+    worker processes share one copy in the page cache; the first write loads a private,
+    writable copy. HNSW graphs are always loaded into process memory, and deleted HNSW
+    vectors cannot be removed from the graph, so they are skipped at search time instead.
+    
+    Without `writer`, the index is only read: writes raise, and `refresh` maps the file
+    the writing process persisted last.
+    """
+    
+    name = "faiss"
+    
+    def __init__(
+        self,
+        directory: str,
+        index_type: str = "flat",
+        mmap: bool = True,
+        ivf_nlist: int = 1024,
+        ivf_nprobe: int = 16,
+        hnsw_m: int = 32,
+        hnsw_ef_search: int = 64,
+        writer: bool = True
+    ):
+        if index_type not in ("flat", "ivf", "hnsw"):
+            raise ValueError(f"Unsupported FAISS index type: {index_type}")
+        
+        import faiss
+        self._faiss = faiss
+        self.directory = directory
+        self.index_type = index_type
+        self.mmap = mmap
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_search = hnsw_ef_search
+        self.writer = writer
+        self.index_path = os.path.join(directory, "index.faiss")
+        self.read_only = False
+        self._loaded: Optional[Tuple[int, int]] = None
+        self._dirty = False
+        self._lock = ReadWriteLock()
+        
+        os.makedirs(directory, exist_ok=True)
+        self.chunks = ChunkStore(os.path.join(directory, "chunks.db"))
+        self.index = self._load()
+    
+    def _load(self):
+        """Load the persisted index, memory-mapped if configured."""
+        self._loaded = file_state(self.index_path)
+        self.read_only = False
+        if self._loaded is None:
+            return None
+        if self.mmap:
+            self.read_only = True
+            index = self._faiss.read_index(self.index_path, self._faiss.IO_FLAG_MMAP)
+        else:
+            index = self._faiss.read_index(self.index_path)
+        self._apply_search_params(index)
+        return index
+    
+    def _new_index(self, dimension: int):
+        faiss = self._faiss
+        if self.index_type == "hnsw":
+            return faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, self.hnsw_m))
+        if self.index_type == "flat":
+            # Exact search stored as a single inverted list: unlike IndexFlat, inverted
+            # lists can be memory-mapped, so workers share the vectors
+            quantizer = faiss.IndexFlatL2(dimension)
+            quantizer.add(np.zeros((1, dimension), dtype=np.float32))
+            index = faiss.IndexIVFFlat(quantizer, dimension, 1)
+            index.is_trained = True
+            return index
+        # IVF starts out as an exact flat index until there is enough data to train on
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+    
+    def _apply_search_params(self, index) -> None:
+        if isinstance(index, self._faiss.IndexIVF):
+            index.nprobe = min(self.ivf_nprobe, index.nlist)
+        elif self.index_type == "hnsw":
+            self._faiss.downcast_index(index.index).hnsw.efSearch = self.hnsw_ef_search
+    
+    def _ensure_writable(self) -> None:
+        """Replace a memory-mapped index with an in-memory copy before modifying it."""
+        if not self.writer:
+            raise RuntimeError(f"The index at {self.directory} is open read-only; writes go through the ingest process")
+        if self.read_only:
+            self.index = self._faiss.read_index(self.index_path)
+            self._apply_search_params(self.index)
+            self.read_only = False
+    
+    def upsert(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        
+        self._lock.acquire_write()
+        try:
+            self._ensure_writable()
+            if self.index is None:
+                self.index = self._new_index(vectors.shape[1])
+                self._apply_search_params(self.index)
+            
+            row_ids, replaced = self.chunks.write(ids, documents)
+            self._remove_vectors(replaced)
+            self.index.add_with_ids(vectors, np.asarray(row_ids, dtype=np.int64))
+            self._maybe_train_ivf()
+            self._dirty = True
+        finally:
+            self._lock.release_write()
+    
+    def delete(self, ids: List[str]) -> None:
+        self._lock.acquire_write()
+        try:
+            self._ensure_writable()
+            self._remove_vectors(self.chunks.remove(ids))
+            self._dirty = True
+        finally:
+            self._lock.release_write()
+    
+    def _remove_vectors(self, row_ids: List[int]) -> None:
+        # HNSW graphs do not support removal; rows missing from the ChunkStore are skipped instead
+        if row_ids and self.index is not None and self.index_type != "hnsw":
+            self.index.remove_ids(np.asarray(row_ids, dtype=np.int64))
+    
+    def _maybe_train_ivf(self) -> None:
+        """Convert the staging flat index to IVF once there are enough training vectors."""
+        faiss = self._faiss
+        if self.index_type != "ivf" or isinstance(self.index, faiss.IndexIVF):
+            return
+        # FAISS recommends at least 39 training points per list
+        if self.index.ntotal < self.ivf_nlist * 39:
+            return
+        
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        row_ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        quantizer = faiss.IndexFlatL2(vectors.shape[1])
+        index = faiss.IndexIVFFlat(quantizer, vectors.shape[1], self.ivf_nlist)
+        index.train(vectors)
+        index.add_with_ids(vectors, row_ids)
+        self._apply_search_params(index)
+        self.index = index
+    
+    def search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        query = np.asarray([embedding], dtype=np.float32)
+        
+        self._lock.acquire_read()
+        try:
+            if self.index is None or self.index.ntotal == 0:
+                return []
+            if filter:
+                return self._filtered_search(query, k, filter)
+            
+            total = self.index.ntotal
+            # Over-fetch when results may be dropped as deleted HNSW vectors
+            fetch = k if self.index_type != "hnsw" else min(total, k * 4)
+            while True:
+                distances, row_ids = self.index.search(query, min(fetch, total))
+                results = self._resolve(row_ids[0], distances[0])
+                if len(results) >= k or fetch >= total:
+                    return results[:k]
+                fetch *= 4
+        finally:
+            self._lock.release_read()
+    
+    def _filtered_search(self, query: np.ndarray, k: int, filter: Dict[str, Any]) -> List[Tuple[Document, float]]:
+        """Search only the vectors whose chunks match the filter.
+        
+        The ChunkStore field index resolves the filter to row IDs, which FAISS then uses as
+        an ID selector, so non-matching vectors are skipped during the scan. Approximate
+        indexes may miss matches of a very selective filter, so IVF probes and the HNSW
+        search breadth are widened until k results are found or the subset is exhausted.
+        """
+        faiss = self._faiss
+        allowed = self.chunks.select(filter)
+        if not allowed:
+            return []
+        
+        selector = faiss.IDSelectorBatch(np.asarray(allowed, dtype=np.int64))
+        wanted = min(k, len(allowed))
+        breadth = 1
+        while True:
+            if isinstance(self.index, faiss.IndexIVF):
+                nprobe = min(self.index.nprobe * breadth, self.index.nlist)
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+                exhausted = nprobe == self.index.nlist
+            elif self.index_type == "hnsw":
+                ef_search = self.hnsw_ef_search * breadth
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+                exhausted = ef_search >= self.index.ntotal
+            else:
+                params = faiss.SearchParameters(sel=selector)
+                exhausted = True
+            
+            distances, row_ids = self.index.search(query, wanted, params=params)
+            results = self._resolve(row_ids[0], distances[0])
+            if len(results) >= wanted or exhausted:
+                return results
+            breadth *= 4
+    
+    def _resolve(self, row_ids: np.ndarray, distances: np.ndarray) -> List[Tuple[Document, float]]:
+        """Load the documents of search hits, dropping empty slots and deleted rows."""
+        found = [(int(row_id), float(distance)) for row_id, distance in zip(row_ids, distances) if row_id != -1]
+        documents = self.chunks.get([row_id for row_id, _ in found])
+        return [(documents[row_id], distance) for row_id, distance in found if row_id in documents]
+    
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[Document]]]:
+        return self.chunks.iter_chunks(batch_size)
+    
+    def count(self) -> int:
+        return self.chunks.count()
+    
+    def warm_up(self) -> None:
+        """Page a memory-mapped index into the page cache and run one search.
+        
+        A search only touches the inverted lists it probes, so the file is read through
+        first; workers mapping the same file share the cached pages.
+        """
+        if self.index is None:
+            return
+        if self.read_only:
+            read_through(self.index_path)
+        self.search([0.0] * self.index.d, 1)
+    
+    def refresh(self) -> bool:
+        if file_state(self.index_path) == self._loaded:
+            return False
+        self._lock.acquire_write()
+        try:
+            # The file is replaced atomically on persist, so mapping it never sees a partial write
+            self.index = self._load()
+        finally:
+            self._lock.release_write()
+        return True
+    
+    def persist(self) -> None:
+        """Write the index atomically, so readers that mapped the old file keep a valid copy.
+        
+        Holds the write lock, so concurrent ingestion jobs never write the temporary file
+        at once or serialize an index that an upsert is changing.
+        """
+        self._lock.acquire_write()
+        try:
+            if not self._dirty or self.index is None:
+                return
+            tmp_path = f"{self.index_path}.tmp"
+            self._faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        finally:
+            self._lock.release_write()
+    
+    def clear(self) -> None:
+        self._lock.acquire_write()
+        try:
+            if not self.writer:
+                raise RuntimeError(f"The index at {self.directory} is open read-only; writes go through the ingest process")
+            self.chunks.clear()
+            self.index = None
+            self.read_only = False
+            self._dirty = False
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+        finally:
+            self._lock.release_write()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        vectors = self.index.ntotal if self.index is not None else 0
+        return {
+            "backend": self.name,
+            "index_type": self.index_type,
+            "trained": self.index_type != "ivf" or isinstance(self.index, self._faiss.IndexIVF),
+            "vectors": vectors,
+            "deleted_vectors": max(0, vectors - self.count()),
+            "memory_mapped": self.read_only,
+            "index_path": self.index_path
+        }
+
+def file_state(path: str) -> Optional[Tuple[int, int]]:
+    """Identity and modification time of a file, which change when it is replaced; None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def read_through(path: str, block_size: int = 1 << 24) -> None:
+    """Read a file end to end so its pages are in the page cache."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb", buffering=0) as f:
+        while f.read(block_size):
+            pass
+
+def create_backend(store_type: str, embedding_function: Embeddings, writer: bool = True) -> VectorBackend:
+    """Build the backend selected by VECTOR_STORE_TYPE; `writer=False` opens a shareable read-only index."""
+    if store_type == "chroma":
+        return ChromaBackend(settings.CHROMA_PERSIST_DIRECTORY, embedding_function)
+    if store_type == "faiss":
+        return FaissBackend(
+            settings.FAISS_INDEX_DIRECTORY,
+            index_type=settings.FAISS_INDEX_TYPE,
+            mmap=settings.FAISS_MMAP,
+            ivf_nlist=settings.FAISS_IVF_NLIST,
+            ivf_nprobe=settings.FAISS_IVF_NPROBE,
+            hnsw_m=settings.FAISS_HNSW_M,
+            hnsw_ef_search=settings.FAISS_HNSW_EF_SEARCH,
+            writer=writer
+        )
+    if store_type == "quantized":
+        from app.ingest.quantized import QuantizedBackend
+        return QuantizedBackend(
+            settings.QUANTIZED_INDEX_DIRECTORY,
+            dtype=settings.QUANTIZED_DTYPE,
+            rescore=settings.QUANTIZED_RESCORE,
+            rescore_factor=settings.QUANTIZED_RESCORE_FACTOR,
+            mmap=settings.QUANTIZED_MMAP,
+            writer=writer
+        )
+    raise ValueError(f"Unsupported VECTOR_STORE_TYPE: {store_type}")
\ No newline at end of file
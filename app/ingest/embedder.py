@@ -1,22 +1,49 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain_openai import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from app.ingest.embedding_cache import EmbeddingCache, CachedEmbeddings
+from app.ingest.embedding_pipeline import EmbeddingPipeline, InstrumentedEmbeddings, RateLimiter, RateLimitedEmbeddings
 from app.utils.config import settings
+from app.utils.metrics import CACHE_COUNTERS, metrics
+from app.utils.registry import registry
 
 class DocumentEmbedder:
     """Handles document embedding and text processing."""
     
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
+        self.base_embeddings = OpenAIEmbeddings(
             openai_api_key=settings.OPENAI_API_KEY,
-            model="text-embedding-ada-002"
+            model=settings.EMBEDDING_MODEL
         )
+        
+        self.rate_limiter = RateLimiter(
+            settings.EMBEDDING_REQUESTS_PER_MINUTE,
+            settings.EMBEDDING_TOKENS_PER_MINUTE
+        )
+        self.embeddings = RateLimitedEmbeddings(InstrumentedEmbeddings(self.base_embeddings), self.rate_limiter)
+        
+        # Serve previously embedded chunks from the persistent cache; only misses hit the API
+        self.cache: Optional[EmbeddingCache] = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+            self.embeddings = CachedEmbeddings(self.embeddings, self.cache, settings.EMBEDDING_MODEL)
+        
+        self.pipeline = EmbeddingPipeline(
+            self.embeddings,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            concurrency=settings.EMBEDDING_CONCURRENCY,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+            retry_backoff=settings.EMBEDDING_RETRY_BACKOFF
+        )
+        
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            # Chunk offsets let the context builder merge overlapping neighbours exactly
+            add_start_index=True
         )
     
     def split_documents(self, documents: List[Document]) -> List[Document]:
@@ -31,6 +58,16 @@ class DocumentEmbedder:
         """Generate embedding for a single text."""
         return self.embeddings.embed_query(text)
     
+    def warm_up(self) -> None:
+        """Open the connection to the embeddings API with one uncached request."""
+        self.base_embeddings.embed_query("warm-up")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get embedding cache statistics."""
+        if not self.cache:
+            return {"status": "disabled"}
+        return self.cache.get_stats()
+    
     def process_documents(self, documents: List[Document]) -> List[Document]:
         """Process documents: split and prepare for vector storage."""
         # Split documents into chunks
@@ -46,4 +83,18 @@ class DocumentEmbedder:
         return split_docs
 
 # Global embedder instance
-embedder = DocumentEmbedder() 
\ No newline at end of file
+embedder = registry.register("embedder", DocumentEmbedder)
+
+metrics.export_stats(
+    "contextagent_cache",
+    lambda: embedder.cache.get_stats() if registry.peek("embedder") and embedder.cache else None,
+    counters=CACHE_COUNTERS,
+    labels={"cache": "embedding"}
+)
+# The persistent cache is shared by every process, so its size is not summed over them
+metrics.export_stats(
+    "contextagent_embedding_cache",
+    lambda: embedder.cache.get_stats() if registry.peek("embedder") and embedder.cache else None,
+    gauges={"entries": "Embeddings in the persistent embedding cache"},
+    aggregate="max"
+) 
\ No newline at end of file
@@ -0,0 +1,191 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Dict, Any, Optional
+from langchain.schema.embeddings import Embeddings
+from app.utils.async_utils import run_sync
+
+class EmbeddingCache:
+    """Persistent, content-addressed embedding store backed by SQLite.
+    
+    Vectors are keyed by a hash of (model name, text), so identical chunks are only
+    embedded once across uploads and restarts. The least recently used entries are
+    evicted once the cache holds more than `max_entries` vectors.
+    """
+    
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for a text embedded with a given model."""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for texts; missing entries are returned as None."""
+        keys = [self.make_key(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = self._decode(blob)
+            
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        
+        return results
+    
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store vectors for texts, evicting the least recently used entries if needed."""
+        now = time.time()
+        rows = [(self.make_key(model, text), self._encode(vector), now) for text, vector in zip(texts, vectors)]
+        
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._count += self._conn.total_changes - before
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self) -> None:
+        """Drop the least recently used entries above max_entries. Caller holds the lock."""
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._count -= excess
+        self.evictions += excess
+    
+    def clear(self) -> None:
+        """Remove all cached vectors."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "path": self.path
+        }
+    
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return array("f", vector).tobytes()
+    
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model."""
+    
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_name = model_name
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, serving previously seen texts from the cache."""
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = self._unique_missing(texts, vectors)
+        
+        if missing:
+            new_vectors = self.underlying.embed_documents(missing)
+            self.cache.put_many(self.model_name, missing, new_vectors)
+            self._fill(texts, vectors, missing, new_vectors)
+        
+        return vectors
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async version of embed_documents."""
+        vectors = await run_sync(self.cache.get_many, self.model_name, texts)
+        missing = self._unique_missing(texts, vectors)
+        
+        if missing:
+            new_vectors = await self.underlying.aembed_documents(missing)
+            await run_sync(self.cache.put_many, self.model_name, missing, new_vectors)
+            self._fill(texts, vectors, missing, new_vectors)
+        
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query. Queries are not persisted."""
+        return self.underlying.embed_query(text)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of embed_query."""
+        return await self.underlying.aembed_query(text)
+    
+    @staticmethod
+    def _unique_missing(texts: List[str], vectors: List[Optional[List[float]]]) -> List[str]:
+        """Texts without a cached vector, deduplicated in order of first appearance."""
+        return list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    
+    @staticmethod
+    def _fill(
+        texts: List[str],
+        vectors: List[Optional[List[float]]],
+        missing: List[str],
+        new_vectors: List[List[float]]
+    ) -> None:
+        """Fill the gaps in `vectors` with freshly embedded ones."""
+        by_text = dict(zip(missing, new_vectors))
+        for i, text in enumerate(texts):
+            if vectors[i] is None:
+                vectors[i] = by_text[text]
\ No newline at end of file
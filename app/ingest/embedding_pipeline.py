@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Optional
+from langchain.schema import Document
+from langchain.schema.embeddings import Embeddings
+from app.utils.metrics import metrics
+from app.utils.tracing import span
+
+embedding_request_duration = metrics.histogram(
+    "contextagent_embedding_request_duration_seconds",
+    "Latency of embedding API calls",
+    ["operation"]
+)
+embedding_rate_limit_wait = metrics.histogram(
+    "contextagent_embedding_rate_limit_wait_seconds",
+    "Time embedding calls waited for the rate limiter",
+    ["operation"]
+)
+embedding_texts = metrics.counter("contextagent_embedding_texts_total", "Texts sent to the embedding API", ["operation"])
+embedding_tokens = metrics.counter(
+    "contextagent_embedding_tokens_total",
+    "Estimated tokens sent to the embedding API",
+    ["operation"]
+)
+embedding_errors = metrics.counter("contextagent_embedding_errors_total", "Failed embedding API calls", ["operation"])
+embedding_requests_in_flight = metrics.gauge("contextagent_embedding_requests_in_flight", "Embedding API calls in progress")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for rate limiting."""
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `capacity` per minute."""
+    
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.refill_rate = capacity / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until `amount` tokens are available, then take them."""
+        # A single request larger than the bucket can never fit; let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+                self.updated_at = now
+                
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                
+                wait = (amount - self.tokens) / self.refill_rate
+            
+            time.sleep(wait)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for an embedding API."""
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+    
+    def acquire(self, tokens: int) -> None:
+        """Block until one request carrying `tokens` tokens is allowed."""
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that waits for the rate limiter before every API call."""
+    
+    def __init__(self, underlying: Embeddings, limiter: RateLimiter):
+        self.underlying = underlying
+        self.limiter = limiter
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents once the limiter allows the request."""
+        with embedding_rate_limit_wait.time(operation="documents"):
+            self.limiter.acquire(sum(estimate_tokens(text) for text in texts))
+        return self.underlying.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query once the limiter allows the request."""
+        with embedding_rate_limit_wait.time(operation="query"):
+            self.limiter.acquire(estimate_tokens(text))
+        return self.underlying.embed_query(text)
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper recording the latency, size and failures of every API call."""
+    
+    def __init__(self, underlying: Embeddings):
+        self.underlying = underlying
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call("documents", texts, lambda: self.underlying.embed_documents(texts))
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._call("query", [text], lambda: self.underlying.embed_query(text))
+    
+    @staticmethod
+    def _call(operation: str, texts: List[str], call: Callable[[], Any]) -> Any:
+        embedding_texts.inc(len(texts), operation=operation)
+        embedding_tokens.inc(sum(estimate_tokens(text) for text in texts), operation=operation)
+        try:
+            with embedding_requests_in_flight.track_in_progress(), embedding_request_duration.time(operation=operation):
+                with span("embedding_api", operation=operation, texts=len(texts)):
+                    return call()
+        except Exception:
+            embedding_errors.inc(operation=operation)
+            raise
+
+class PipelineResult:
+    """Outcome of an embedding pipeline run."""
+    
+    def __init__(self, chunks_total: int = 0):
+        self.ids: List[str] = []
+        self.chunks_total = chunks_total
+        self.chunks_processed = 0
+        self.batches_completed = 0
+        self.failed_batches = 0
+        self.errors: List[str] = []
+        self.cancelled = False
+        self.elapsed = 0.0
+    
+    @property
+    def chunks_per_second(self) -> float:
+        """Average throughput so far."""
+        return self.chunks_processed / self.elapsed if self.elapsed else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the result for API responses."""
+        return {
+            "chunks_total": self.chunks_total,
+            "chunks_processed": self.chunks_processed,
+            "batches_completed": self.batches_completed,
+            "failed_batches": self.failed_batches,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "chunks_per_second": round(self.chunks_per_second, 2)
+        }
+
+class EmbeddingPipeline:
+    """Embeds document chunks in concurrent batches and upserts each batch as soon as it is ready.
+    
+    A failing batch is retried with exponential backoff; if it still fails, the other
+    batches are kept and the failure is reported in the result.
+    """
+    
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        retry_backoff: float = 1.0
+    ):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+    
+    def run(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        upsert: Callable[[List[str], List[Document], List[List[float]]], None],
+        on_progress: Optional[Callable[[PipelineResult], None]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> PipelineResult:
+        """Embed and upsert `documents` (with matching `ids`) batch by batch.
+        
+        Setting `cancel_event` stops batches that have not started yet; batches already
+        in flight finish and stay stored.
+        """
+        result = PipelineResult(chunks_total=len(documents))
+        start = time.perf_counter()
+        
+        batches = [
+            (ids[i:i + self.batch_size], documents[i:i + self.batch_size])
+            for i in range(0, len(documents), self.batch_size)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embedding-batch") as pool:
+            futures = {
+                pool.submit(self._process_batch, batch_ids, batch_docs, upsert): batch_ids
+                for batch_ids, batch_docs in batches
+            }
+            cancel_requested = False
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set() and not cancel_requested:
+                    cancel_requested = True
+                    # Only batches that have not started can be cancelled
+                    result.cancelled = any([pending.cancel() for pending in futures])
+                if future.cancelled():
+                    continue
+                
+                batch_ids = futures[future]
+                try:
+                    future.result()
+                    result.ids.extend(batch_ids)
+                    result.chunks_processed += len(batch_ids)
+                    result.batches_completed += 1
+                except Exception as e:
+                    result.failed_batches += 1
+                    result.errors.append(str(e))
+                result.elapsed = time.perf_counter() - start
+                if on_progress:
+                    on_progress(result)
+        
+        result.elapsed = time.perf_counter() - start
+        return result
+    
+    def _process_batch(
+        self,
+        batch_ids: List[str],
+        batch_docs: List[Document],
+        upsert: Callable[[List[str], List[Document], List[List[float]]], None]
+    ) -> None:
+        """Embed and upsert one batch, retrying with exponential backoff and jitter."""
+        texts = [doc.page_content for doc in batch_docs]
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                upsert(batch_ids, batch_docs, vectors)
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * (2 ** attempt) * (1 + random.random()))
\ No newline at end of file
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+# Tags are stored as one boolean metadata key per tag, since Chroma metadata values must be scalars
+TAG_PREFIX = "tag:"
+
+def normalize_tags(tags: Optional[List[str]]) -> List[str]:
+    """Strip, lower-case and de-duplicate tags, dropping empty ones."""
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags or [] if tag.strip()))
+
+def tag_metadata(tags: Optional[List[str]]) -> Dict[str, bool]:
+    """Chunk metadata marking the given tags."""
+    return {f"{TAG_PREFIX}{tag}": True for tag in normalize_tags(tags)}
+
+def build_where(
+    sources: Optional[List[str]] = None,
+    file_types: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    ingested_after: Optional[datetime] = None,
+    ingested_before: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """Build a Chroma-style `where` filter from retrieval scopes.
+    
+    A chunk matches if its source is any of `sources`, its file type any of `file_types`,
+    it carries any of `tags` and it was ingested within the date range; unset scopes
+    match everything. Returns None when nothing is scoped.
+    """
+    clauses = []
+    if sources:
+        clauses.append({"source": {"$in": list(sources)}})
+    if file_types:
+        extensions = [ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in file_types]
+        clauses.append({"file_type": {"$in": extensions}})
+    tag_clauses = [{key: True} for key in tag_metadata(tags)]
+    if tag_clauses:
+        # Chroma requires at least two clauses in $or
+        clauses.append(tag_clauses[0] if len(tag_clauses) == 1 else {"$or": tag_clauses})
+    if ingested_after:
+        clauses.append({"ingested_at": {"$gte": ingested_after.timestamp()}})
+    if ingested_before:
+        clauses.append({"ingested_at": {"$lte": ingested_before.timestamp()}})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
\ No newline at end of file
@@ -0,0 +1,201 @@
+import os
+import threading
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from langchain.schema import Document
+from app.ingest.embedding_pipeline import PipelineResult
+from app.ingest.manifest import IngestManifest, ingest_manifest, hash_file
+from app.ingest.vector_store import VectorStore, IngestionCancelled, vector_store
+from app.utils.document_loader import DocumentLoader, document_loader
+from app.utils.registry import registry
+
+class DirectorySyncResult:
+    """Summary of one incremental directory sync."""
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.added: List[str] = []
+        self.updated: List[str] = []
+        self.unchanged: List[str] = []
+        self.removed: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.documents_loaded = 0
+        self.chunks_added = 0
+        self.chunks_removed = 0
+        self.files_total = 0
+        # Chunks of the file currently being embedded
+        self.chunks_in_flight = 0
+    
+    @property
+    def chunks_processed(self) -> int:
+        """Chunks stored so far, including the partially embedded current file."""
+        return self.chunks_added + self.chunks_in_flight
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the result for API responses."""
+        return {
+            "directory": self.directory,
+            "files_added": len(self.added),
+            "files_updated": len(self.updated),
+            "files_unchanged": len(self.unchanged),
+            "files_removed": len(self.removed),
+            "files_failed": self.failed,
+            "document_count": self.documents_loaded,
+            "chunks_added": self.chunks_added,
+            "chunks_removed": self.chunks_removed
+        }
+
+class IncrementalIngestor:
+    """Keeps the vector store in sync with a directory, doing work proportional to what changed.
+    
+    Files whose size and mtime match the manifest are skipped without being read; files
+    whose content hash matches are skipped without being parsed. Changed files are
+    re-indexed and their stale chunks removed, and chunks of deleted files are dropped.
+    """
+    
+    def __init__(self, store: VectorStore, manifest: IngestManifest, loader: DocumentLoader):
+        self.store = store
+        self.manifest = manifest
+        self.loader = loader
+    
+    def sync_directory(
+        self,
+        directory_path: str,
+        on_progress: Optional[Callable[[DirectorySyncResult], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> DirectorySyncResult:
+        """Bring the vector store up to date with the supported files in a directory.
+        
+        Changed files are parsed on the loader's process pool and each one is embedded as
+        soon as it is parsed. `on_progress` is called after every stored batch and every
+        file. Setting `cancel_event` raises IngestionCancelled; files finished so far stay
+        indexed.
+        """
+        directory = os.path.abspath(directory_path)
+        result = DirectorySyncResult(directory)
+        
+        file_paths = self.loader.list_supported_files(directory, recursive, include, exclude)
+        result.files_total = len(file_paths)
+        
+        changed = {}
+        for file_path in file_paths:
+            try:
+                change = self._detect_change(file_path, result)
+                if change:
+                    changed[file_path] = change
+            except Exception as e:
+                result.failed[file_path] = str(e)
+        
+        parsed = self.loader.parse_files(list(changed))
+        try:
+            for file_path, documents, error in parsed:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise IngestionCancelled(f"Directory sync cancelled after {result.chunks_added} chunks")
+                
+                if error:
+                    result.failed[file_path] = error
+                else:
+                    try:
+                        self._index_file(file_path, documents, changed[file_path], result, on_progress, cancel_event)
+                    except IngestionCancelled:
+                        raise
+                    except Exception as e:
+                        result.failed[file_path] = str(e)
+                    finally:
+                        result.chunks_in_flight = 0
+                
+                if on_progress:
+                    on_progress(result)
+        finally:
+            parsed.close()
+        
+        seen = set(file_paths)
+        for file_path in self.manifest.paths_under(directory):
+            # Only drop files that were in scope of this sync: direct children unless recursive,
+            # and matching the globs, so a narrower sync leaves other indexed files alone
+            in_scope = recursive or os.path.dirname(file_path) == directory
+            if (
+                file_path not in seen
+                and in_scope
+                and self.loader.is_selected(file_path, directory, include, exclude)
+            ):
+                self.remove_file(file_path, result)
+        
+        return result
+    
+    def _detect_change(self, file_path: str, result: DirectorySyncResult) -> Optional[Tuple]:
+        """Return `(stat, manifest entry, content hash)` if a file needs re-indexing."""
+        stat = os.stat(file_path)
+        entry = self.manifest.get(file_path)
+        
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            result.unchanged.append(file_path)
+            return None
+        
+        content_hash = hash_file(file_path)
+        if entry and entry["content_hash"] == content_hash:
+            self.manifest.touch(file_path, stat.st_size, stat.st_mtime)
+            result.unchanged.append(file_path)
+            return None
+        
+        return stat, entry, content_hash
+    
+    def _index_file(
+        self,
+        file_path: str,
+        documents: List[Document],
+        change: Tuple,
+        result: DirectorySyncResult,
+        on_progress: Optional[Callable[[DirectorySyncResult], None]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> None:
+        """Store the parsed documents of a changed file and replace its old chunks.
+        
+        If storing fails or is cancelled partway, the chunks already written that the
+        manifest does not list are deleted again, so they cannot outlive the file.
+        """
+        stat, entry, content_hash = change
+        written: List[str] = []
+        
+        def report(pipeline_result: PipelineResult) -> None:
+            written[:] = pipeline_result.ids
+            result.chunks_in_flight = pipeline_result.chunks_processed
+            if on_progress:
+                on_progress(result)
+        
+        try:
+            chunk_ids = self.store.add_documents(documents, on_progress=report, cancel_event=cancel_event)
+        except Exception:
+            # Chunk IDs are derived from content, so ones the old version also had are still its own
+            self.store.delete_documents(list(set(written) - set(entry["chunk_ids"] if entry else [])))
+            raise
+        result.documents_loaded += len(documents)
+        result.chunks_added += len(chunk_ids)
+        
+        # Upsert the new chunks first, then drop the ones the new version no longer has
+        if entry:
+            stale_ids = list(set(entry["chunk_ids"]) - set(chunk_ids))
+            self.store.delete_documents(stale_ids)
+            result.chunks_removed += len(stale_ids)
+            result.updated.append(file_path)
+        else:
+            result.added.append(file_path)
+        
+        self.manifest.record(file_path, stat.st_size, stat.st_mtime, content_hash, chunk_ids)
+    
+    def remove_file(self, file_path: str, result: DirectorySyncResult) -> None:
+        """Drop the chunks of a file that no longer exists."""
+        entry = self.manifest.get(file_path)
+        if entry:
+            self.store.delete_documents(entry["chunk_ids"])
+            result.chunks_removed += len(entry["chunk_ids"])
+        self.manifest.remove(file_path)
+        result.removed.append(file_path)
+
+# Global incremental ingestor instance
+incremental_ingestor = registry.register(
+    "incremental_ingestor",
+    lambda: IncrementalIngestor(vector_store, ingest_manifest, document_loader)
+)
\ No newline at end of file
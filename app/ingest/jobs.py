@@ -0,0 +1,534 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Any, Optional
+from app.ingest.embedding_pipeline import PipelineResult
+from app.ingest.filters import tag_metadata
+from app.ingest.incremental import DirectorySyncResult, incremental_ingestor
+from app.ingest.manifest import hash_file, ingest_manifest
+from app.ingest.vector_store import IngestionCancelled, vector_store
+from app.utils.config import settings
+from app.utils.document_loader import document_loader
+from app.utils.metrics import metrics
+from app.utils.registry import registry
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = {QUEUED, RUNNING}
+
+jobs_finished = metrics.counter("contextagent_ingest_jobs_total", "Ingestion jobs finished, by kind and status", ["kind", "status"])
+job_duration = metrics.histogram(
+    "contextagent_ingest_job_duration_seconds",
+    "Run time of finished ingestion jobs",
+    ["kind", "status"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+)
+documents_ingested = metrics.counter("contextagent_ingest_documents_total", "Documents loaded by finished ingestion jobs")
+
+def upload_manifest_path(content_hash: str, document_id: Optional[str] = None) -> str:
+    """Manifest key of an upload: its document ID if the caller gave one, else its content."""
+    return f"upload://id/{document_id}" if document_id else f"upload://sha256/{content_hash}"
+
+class JobQueueFullError(Exception):
+    """Raised when too many ingestion jobs are already pending."""
+
+class IngestJob:
+    """State of one background ingestion job."""
+    
+    def __init__(self, kind: str, params: Dict[str, Any], job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.chunks_total = 0
+        self.chunks_processed = 0
+        self.documents = 0
+        self.errors: List[str] = []
+        self.result: Dict[str, Any] = {}
+        self.attempts = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+    
+    @property
+    def throughput(self) -> float:
+        """Chunks stored per second since the job started."""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.chunks_processed / elapsed if elapsed > 0 else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the job for persistence and API responses."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "stage": self.stage,
+            "chunks_total": self.chunks_total,
+            "chunks_processed": self.chunks_processed,
+            "documents": self.documents,
+            "throughput": round(self.throughput, 2),
+            "errors": self.errors,
+            "result": self.result,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IngestJob":
+        """Restore a job from its persisted form."""
+        job = cls(data["kind"], data["params"], job_id=data["job_id"])
+        for field in ("status", "stage", "chunks_total", "chunks_processed", "documents",
+                      "errors", "result", "attempts", "created_at", "started_at", "finished_at"):
+            setattr(job, field, data[field])
+        return job
+
+class JobManager:
+    """Runs ingestion jobs on a bounded worker pool and persists their state.
+    
+    Jobs that were queued or running when the process stopped are resumed on startup.
+    Re-running a job is safe: chunk IDs are deterministic, so stored chunks are upserted
+    again rather than duplicated, and the embedding cache serves vectors already paid for.
+    
+    `role` serializes writes across processes: with `submit` (API workers) jobs and
+    cancellation requests are only recorded in the shared database, and the one `worker`
+    process polls it and runs them. `local` runs this process's own jobs.
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        spool_directory: str,
+        workers: int,
+        max_pending: int,
+        role: str = "local",
+        poll_interval: float = 0.5
+    ):
+        if role not in ("local", "submit", "worker"):
+            raise ValueError(f"Unsupported INGEST_ROLE: {role}")
+        
+        self.spool_directory = spool_directory
+        self.workers = workers
+        self.max_pending = max_pending
+        self.role = role
+        self.poll_interval = poll_interval
+        self.jobs: Dict[str, IngestJob] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._poller: Optional[threading.Thread] = None
+        self._shutting_down = False
+        self._lock = threading.Lock()
+        
+        os.makedirs(spool_directory, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cancel_requests (id TEXT PRIMARY KEY)")
+        self._conn.commit()
+    
+    def start(self) -> None:
+        """Start the worker pool and resume jobs interrupted by the last shutdown."""
+        if self.role == "submit":
+            return
+        self._shutting_down = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-job")
+        
+        self._apply_cancel_requests()
+        resumed = self._claim((QUEUED, RUNNING))
+        if resumed:
+            print(f"🔁 Resumed {resumed} pending ingestion job(s)")
+        
+        if self.role == "worker":
+            self._poller = threading.Thread(target=self._poll, name="ingest-poller", daemon=True)
+            self._poller.start()
+    
+    def shutdown(self) -> None:
+        """Stop accepting work; running jobs stop early and are resumed on the next start."""
+        self._shutting_down = True
+        with self._lock:
+            for job in self.jobs.values():
+                if job.status in ACTIVE_STATUSES:
+                    job.cancel_event.set()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._poller:
+            self._poller.join()
+    
+    def _claim(self, statuses: tuple) -> int:
+        """Queue the persisted jobs in `statuses` that this process is not running yet."""
+        placeholders = ",".join("?" * len(statuses))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM jobs WHERE status IN ({placeholders}) ORDER BY created_at", statuses
+            ).fetchall()
+        claimed = 0
+        for (data,) in rows:
+            job = IngestJob.from_dict(json.loads(data))
+            with self._lock:
+                # A cancellation may have finished the job since the rows were read
+                row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job.id,)).fetchone()
+                if job.id in self.jobs or row is None or row[0] not in statuses:
+                    continue
+                self.jobs[job.id] = job
+                job.status = QUEUED
+                job.stage = QUEUED
+                self._write(job)
+            self._executor.submit(self._run, job)
+            claimed += 1
+        return claimed
+    
+    def _apply_cancel_requests(self) -> None:
+        """Cancel the jobs other processes asked to cancel."""
+        with self._lock:
+            requests = [job_id for (job_id,) in self._conn.execute("SELECT id FROM cancel_requests")]
+        for job_id in requests:
+            self.cancel(job_id)
+            with self._lock:
+                self._conn.execute("DELETE FROM cancel_requests WHERE id = ?", (job_id,))
+                self._conn.commit()
+    
+    def _poll(self) -> None:
+        """Run the jobs and cancellations other processes recorded, until shutdown."""
+        while not self._shutting_down:
+            try:
+                self._apply_cancel_requests()
+                self._claim((QUEUED,))
+            except Exception as e:
+                print(f"⚠️  Polling for ingestion jobs failed: {e}")
+            time.sleep(self.poll_interval)
+    
+    def spool_path(self, job_id: str, filename: str) -> str:
+        """Path where an uploaded file is kept until its job finishes."""
+        directory = os.path.join(self.spool_directory, job_id)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, os.path.basename(filename))
+    
+    def new_job_id(self) -> str:
+        """Reserve an ID for a job whose input still has to be spooled."""
+        return uuid.uuid4().hex
+    
+    def submit_upload(
+        self,
+        job_id: str,
+        file_path: str,
+        filename: str,
+        content_hash: str,
+        tags: Optional[List[str]] = None,
+        document_id: Optional[str] = None
+    ) -> IngestJob:
+        """Queue ingestion of a spooled upload, tagging its chunks with `tags`.
+        
+        With a `document_id`, the upload replaces the chunks of the document previously
+        uploaded under that ID.
+        """
+        params = {
+            "file_path": file_path,
+            "filename": filename,
+            "content_hash": content_hash,
+            "tags": tags or [],
+            "document_id": document_id
+        }
+        return self._submit(IngestJob("upload", params, job_id=job_id))
+    
+    def submit_directory(
+        self,
+        directory_path: str,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> IngestJob:
+        """Queue an incremental sync of a directory."""
+        params = {
+            "directory_path": os.path.abspath(directory_path),
+            "recursive": recursive,
+            "include": include,
+            "exclude": exclude
+        }
+        return self._submit(IngestJob("directory", params))
+    
+    def submit_clear(self) -> IngestJob:
+        """Queue removal of every stored document."""
+        return self._submit(IngestJob("clear", {}))
+    
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        """Get a job by ID, including finished jobs from earlier runs."""
+        job = self.jobs.get(job_id)
+        if job:
+            return job
+        with self._lock:
+            return self._read(job_id)
+    
+    def _read(self, job_id: str) -> Optional[IngestJob]:
+        row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return IngestJob.from_dict(json.loads(row[0])) if row else None
+    
+    def list_jobs(self, limit: int = 50) -> List[IngestJob]:
+        """List the most recent jobs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [job for job in (self.get(job_id) for (job_id,) in rows) if job]
+    
+    def find_active_upload(self, content_hash: str) -> Optional[IngestJob]:
+        """Get a queued or running upload job for the same content, if any."""
+        with self._lock:
+            if self.role == "submit":
+                jobs = [
+                    IngestJob.from_dict(json.loads(data)) for (data,) in self._conn.execute(
+                        "SELECT data FROM jobs WHERE status IN (?, ?)", tuple(ACTIVE_STATUSES)
+                    )
+                ]
+            else:
+                jobs = list(self.jobs.values())
+        for job in jobs:
+            if job.kind == "upload" and job.params.get("content_hash") == content_hash:
+                return job
+        return None
+    
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        """Cancel a queued or running job. Running jobs stop after their in-flight batches.
+        
+        The status is checked under the manager's lock, and a queued job is only finished
+        if it is still queued then, so a worker thread starting it meanwhile keeps it.
+        """
+        if self.role == "submit":
+            # The ingest process picks the request up on its next poll
+            job = self.get(job_id)
+            if job and job.status in ACTIVE_STATUSES:
+                with self._lock:
+                    self._conn.execute("INSERT OR IGNORE INTO cancel_requests (id) VALUES (?)", (job_id,))
+                    self._conn.commit()
+            return job
+        
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                # Not picked up by this process, e.g. queued by an API worker since the last
+                # poll; claiming it keeps the poller from starting it meanwhile
+                job = self._read(job_id)
+                if job is None or job.status not in ACTIVE_STATUSES:
+                    return job
+                self.jobs[job.id] = job
+                expected = ACTIVE_STATUSES
+            elif job.status not in ACTIVE_STATUSES:
+                return job
+            else:
+                expected = (QUEUED,)
+            job.cancel_event.set()
+        
+        self._finish(job, CANCELLED, expected)
+        return job
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Count jobs by status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": sum(count for status, count in rows if status in ACTIVE_STATUSES),
+            "jobs": dict(rows)
+        }
+    
+    def _submit(self, job: IngestJob) -> IngestJob:
+        if self._executor is None and self.role != "submit":
+            self.start()
+        
+        with self._lock:
+            # Counted in the database, which also holds the jobs submitted by other processes
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", tuple(ACTIVE_STATUSES)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise JobQueueFullError(f"Too many pending ingestion jobs ({pending}); try again later")
+            if self.role != "submit":
+                self.jobs[job.id] = job
+        self._persist(job)
+        if self.role != "submit":
+            self._executor.submit(self._run, job)
+        return job
+    
+    def _run(self, job: IngestJob) -> None:
+        """Execute a job on a worker thread."""
+        with self._lock:
+            # Cancelled while it waited for a worker
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.attempts += 1
+            job.started_at = time.time()
+            job.finished_at = None
+            self._write(job)
+        
+        try:
+            if job.kind == "upload":
+                self._run_upload(job)
+            elif job.kind == "clear":
+                self._run_clear(job)
+            else:
+                self._run_directory(job)
+            self._finish(job, COMPLETED)
+        except IngestionCancelled:
+            if self._shutting_down:
+                # Leave the job active so the next start resumes it
+                with self._lock:
+                    job.status = QUEUED
+                    job.stage = "interrupted"
+                    self._write(job)
+            else:
+                self._finish(job, CANCELLED)
+        except Exception as e:
+            job.errors.append(str(e))
+            self._finish(job, FAILED)
+    
+    def _run_upload(self, job: IngestJob) -> None:
+        """Ingest a spooled upload under its manifest key.
+        
+        The key (content hash or document ID) stands in for the spool path, which is new
+        for every job, so chunk IDs are the same whenever the same content is ingested
+        again. Chunks stored before a failure or cancellation that the manifest does not
+        list are deleted again.
+        """
+        # Unrelated files sharing a name never replace each other: only an upload under an
+        # existing document ID replaces that document's old chunks
+        content_hash = job.params.get("content_hash") or hash_file(job.params["file_path"])
+        manifest_path = upload_manifest_path(content_hash, job.params.get("document_id"))
+        
+        job.stage = "loading"
+        self._persist(job)
+        documents = document_loader.load_document(job.params["file_path"])
+        for doc in documents:
+            doc.metadata["file_path"] = manifest_path
+            doc.metadata.update(tag_metadata(job.params.get("tags")))
+        job.documents = len(documents)
+        
+        job.stage = "embedding"
+        self._persist(job)
+        written: List[str] = []
+        
+        def report(progress: PipelineResult) -> None:
+            written[:] = progress.ids
+            self._on_pipeline_progress(job, progress)
+        
+        try:
+            chunk_ids = vector_store.add_documents(documents, on_progress=report, cancel_event=job.cancel_event)
+        except Exception:
+            previous = ingest_manifest.get(manifest_path)
+            vector_store.delete_documents(list(set(written) - set(previous["chunk_ids"] if previous else [])))
+            raise
+        job.chunks_processed = len(chunk_ids)
+        
+        previous = ingest_manifest.get(manifest_path)
+        stale_ids = list(set(previous["chunk_ids"]) - set(chunk_ids)) if previous else []
+        vector_store.delete_documents(stale_ids)
+        ingest_manifest.record(manifest_path, os.path.getsize(job.params["file_path"]), 0.0, content_hash, chunk_ids)
+        job.result = {
+            "filename": job.params["filename"],
+            "document_id": job.params.get("document_id"),
+            "document_count": len(documents),
+            "chunk_count": len(chunk_ids),
+            "chunks_replaced": len(stale_ids)
+        }
+    
+    def _run_directory(self, job: IngestJob) -> None:
+        job.stage = "syncing"
+        self._persist(job)
+        result = incremental_ingestor.sync_directory(
+            job.params["directory_path"],
+            on_progress=lambda progress: self._on_sync_progress(job, progress),
+            cancel_event=job.cancel_event,
+            recursive=job.params.get("recursive", False),
+            include=job.params.get("include"),
+            exclude=job.params.get("exclude")
+        )
+        job.documents = result.documents_loaded
+        job.chunks_processed = result.chunks_added
+        job.errors.extend(f"{path}: {error}" for path, error in result.failed.items())
+        job.result = result.to_dict()
+    
+    def _run_clear(self, job: IngestJob) -> None:
+        job.stage = "clearing"
+        self._persist(job)
+        vector_store.delete_collection()
+        ingest_manifest.clear()
+    
+    def _on_pipeline_progress(self, job: IngestJob, progress: PipelineResult) -> None:
+        job.chunks_total = progress.chunks_total
+        job.chunks_processed = progress.chunks_processed
+        job.errors = list(progress.errors)
+        self._persist(job)
+    
+    def _on_sync_progress(self, job: IngestJob, progress: DirectorySyncResult) -> None:
+        job.chunks_processed = progress.chunks_processed
+        job.documents = progress.documents_loaded
+        job.result = progress.to_dict()
+        self._persist(job)
+    
+    def _finish(self, job: IngestJob, status: str, expected: Iterable[str] = ACTIVE_STATUSES) -> None:
+        """Move a job to a final status, unless another thread moved it out of `expected` first."""
+        with self._lock:
+            if job.status not in expected:
+                return
+            job.status = status
+            job.stage = "done"
+            job.finished_at = time.time()
+            self._write(job)
+            self.jobs.pop(job.id, None)
+        jobs_finished.inc(kind=job.kind, status=status)
+        if job.started_at:
+            job_duration.observe(job.finished_at - job.started_at, kind=job.kind, status=status)
+        documents_ingested.inc(job.documents)
+        
+        # Spooled uploads are only needed until the job can no longer be resumed
+        if job.kind == "upload":
+            shutil.rmtree(os.path.dirname(job.params["file_path"]), ignore_errors=True)
+    
+    def _persist(self, job: IngestJob) -> None:
+        with self._lock:
+            self._write(job)
+    
+    def _write(self, job: IngestJob) -> None:
+        """Save a job; the caller holds the lock."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, status, created_at, data) VALUES (?, ?, ?, ?)",
+            (job.id, job.status, job.created_at, json.dumps(job.to_dict()))
+        )
+        self._conn.commit()
+
+# Global job manager instance
+job_manager = registry.register("job_manager", lambda: JobManager(
+    settings.INGEST_JOBS_PATH,
+    settings.INGEST_SPOOL_DIRECTORY,
+    settings.INGEST_WORKERS,
+    settings.INGEST_MAX_PENDING_JOBS,
+    role=settings.INGEST_ROLE,
+    poll_interval=settings.INGEST_POLL_INTERVAL
+))
+
+# Job counts come from the jobs database every process shares, so they are not summed over processes
+metrics.export_stats(
+    "contextagent_ingest_jobs",
+    lambda: job_manager.get_stats() if registry.peek("job_manager") else None,
+    gauges={"pending": "Ingestion jobs queued or running"},
+    aggregate="max"
+)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from langchain.schema import Document
+from app.ingest.backends import matches_filter
+from app.utils.config import settings
+from app.utils.registry import registry
+
+# Same token boundaries as the FTS5 tokenizer below: runs of letters, digits and underscores
+TOKEN_PATTERN = re.compile(r"\w+")
+
+class LexicalIndex:
+    """BM25 keyword index over chunk text, kept next to the vector index.
+    
+    Backed by an SQLite FTS5 inverted index, so exact identifiers, error codes and part
+    numbers can be found without an embedding call. Scores are FTS5 BM25 ranks, which
+    are negative: like vector distances, lower means more relevant.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+            "content, metadata UNINDEXED, tokenize = \"unicode61 remove_diacritics 2 tokenchars '_'\")"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_rows (chunk_id TEXT PRIMARY KEY, row_id INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def upsert(self, ids: List[str], documents: List[Document]) -> None:
+        """Index chunks, replacing any with the same ID."""
+        with self._lock:
+            self._delete_rows(ids)
+            for chunk_id, doc in zip(ids, documents):
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks_fts (content, metadata) VALUES (?, ?)",
+                    (doc.page_content, json.dumps(doc.metadata))
+                )
+                self._conn.execute(
+                    "INSERT INTO chunk_rows (chunk_id, row_id) VALUES (?, ?)", (chunk_id, cursor.lastrowid)
+                )
+            self._conn.commit()
+    
+    def delete(self, ids: List[str]) -> None:
+        """Remove chunks by ID."""
+        with self._lock:
+            self._delete_rows(ids)
+            self._conn.commit()
+    
+    def _delete_rows(self, ids: List[str]) -> None:
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            self._conn.execute(
+                f"DELETE FROM chunks_fts WHERE rowid IN "
+                f"(SELECT row_id FROM chunk_rows WHERE chunk_id IN ({placeholders}))", part
+            )
+            self._conn.execute(f"DELETE FROM chunk_rows WHERE chunk_id IN ({placeholders})", part)
+    
+    def search(
+        self,
+        query: str,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Return the k best BM25 matches for any of the query's terms."""
+        terms = list(dict.fromkeys(TOKEN_PATTERN.findall(query.lower())))
+        if not terms:
+            return []
+        
+        # Quote each term so FTS5 operators and punctuation in the query are taken literally
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        fetch = k * 4 if filter else k
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT content, metadata, rank FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (match, fetch)
+                ).fetchall()
+            
+            results = []
+            for content, metadata, rank in rows:
+                metadata = json.loads(metadata)
+                if matches_filter(metadata, filter):
+                    results.append((Document(page_content=content, metadata=metadata), rank))
+                    if len(results) == k:
+                        return results
+            if len(rows) < fetch:
+                return results
+            fetch *= 4
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunk_rows").fetchone()[0]
+    
+    def clear(self) -> None:
+        """Remove every chunk."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks_fts")
+            self._conn.execute("DELETE FROM chunk_rows")
+            self._conn.commit()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"chunks": self.count(), "path": self.path}
+
+# Global lexical index instance
+lexical_index = registry.register("lexical_index", lambda: LexicalIndex(settings.LEXICAL_INDEX_PATH))
\ No newline at end of file
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+from app.utils.config import settings
+from app.utils.registry import registry
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IngestManifest:
+    """Persistent record of ingested files and the chunk IDs each one produced."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+            "content_hash TEXT NOT NULL, chunk_ids TEXT NOT NULL, chunk_count INTEGER NOT NULL, "
+            "ingested_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files(content_hash)")
+        self._conn.commit()
+    
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Get the manifest entry for a file, if it has been ingested."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return self._to_entry(row) if row else None
+    
+    def find_by_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Get any manifest entry whose content has the given hash."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM files WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return self._to_entry(row) if row else None
+    
+    def record(self, path: str, size: int, mtime: float, content_hash: str, chunk_ids: List[str]) -> None:
+        """Insert or replace the entry for a file."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, size, mtime, content_hash, chunk_ids, chunk_count, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime, content_hash, json.dumps(chunk_ids), len(chunk_ids), time.time())
+            )
+            self._conn.commit()
+    
+    def touch(self, path: str, size: int, mtime: float) -> None:
+        """Update the stat information of a file whose content did not change."""
+        with self._lock:
+            self._conn.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?", (size, mtime, path))
+            self._conn.commit()
+    
+    def remove(self, path: str) -> None:
+        """Forget a file."""
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._conn.commit()
+    
+    def paths_under(self, directory: str) -> List[str]:
+        """List recorded files located under a directory."""
+        prefix = os.path.join(directory, "")
+        # Range scan on the primary key: every path starting with prefix sorts before upper_bound
+        upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (prefix, upper_bound)
+            ).fetchall()
+        return [row["path"] for row in rows]
+    
+    def clear(self) -> None:
+        """Forget all files."""
+        with self._lock:
+            self._conn.execute("DELETE FROM files")
+            self._conn.commit()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of tracked files and chunks."""
+        with self._lock:
+            files, chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunk_count), 0) FROM files"
+            ).fetchone()
+        return {"files": files, "chunks": chunks, "path": self.path}
+    
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["chunk_ids"] = json.loads(entry["chunk_ids"])
+        return entry
+
+# Global manifest instance
+ingest_manifest = registry.register("ingest_manifest", lambda: IngestManifest(settings.INGEST_MANIFEST_PATH))
\ No newline at end of file
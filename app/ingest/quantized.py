@@ -0,0 +1,435 @@
+import json
+import os
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+from app.ingest.backends import ChunkStore, ReadWriteLock, VectorBackend, file_state, read_through
+
+ARRAY_NAMES = ("codes", "scales", "norms", "row_ids", "alive")
+
+class QuantizedBackend(VectorBackend):
+    """In-process NumPy vector index with compact float16 or int8 storage.
+    
+    Vectors are kept in memory as float16 (2 bytes per dimension) or as int8 codes
+    with one float32 scale per vector (1 byte per dimension), and searched by
+    brute-force batched dot products, block by block. The original float32 vectors
+    are appended to a file on disk; with `rescore`, the top `k * rescore_factor`
+    candidates of the quantized search are re-ranked by their exact distances read
+    from that file, which recovers nearly all of the recall lost to quantization.
+    
+    Scores are squared L2 distances, like the other backends. Persisted arrays are
+    memory-mapped at startup when `mmap` is set, so workers share them in the page cache.
+    Without `writer`, writes raise and `refresh` loads what the writing process persisted.
+    """
+    
+    name = "quantized"
+    
+    def __init__(
+        self,
+        directory: str,
+        dtype: str = "int8",
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        mmap: bool = True,
+        block_size: int = 65536,
+        writer: bool = True
+    ):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported quantized dtype: {dtype}")
+        
+        self.directory = directory
+        self.dtype = dtype
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.mmap = mmap
+        self.block_size = block_size
+        self.writer = writer
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "index.json")
+        self.read_only = False
+        self.dimension: Optional[int] = None
+        self._size = 0
+        # Parallel arrays; only the first `_size` rows are used, the rest is spare capacity
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._row_ids: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self._full: Optional[np.memmap] = None
+        self._dirty = False
+        self._loaded: Optional[Tuple[int, int]] = None
+        self._lock = ReadWriteLock()
+        
+        os.makedirs(directory, exist_ok=True)
+        self.chunks = ChunkStore(os.path.join(directory, "chunks.db"))
+        self._load()
+    
+    def _array_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.npy")
+    
+    def _load(self) -> None:
+        """Load persisted arrays; the writer also drops vectors appended after the last persist."""
+        state = file_state(self.meta_path)
+        if state is None:
+            self.dimension = None
+            self._size = 0
+            self._codes = self._scales = self._norms = self._row_ids = self._alive = None
+            self.read_only = False
+            self._loaded = None
+            self._open_full()
+            return
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta["dtype"] != self.dtype:
+            raise ValueError(f"Index at {self.directory} was built with {meta['dtype']}, not {self.dtype}")
+        
+        mode = "r" if self.mmap else None
+        arrays = {name: np.load(self._array_path(name), mmap_mode=mode) for name in ARRAY_NAMES}
+        # The metadata is replaced last, so a reader can catch the writer between files
+        if not self.writer and any(len(array) != meta["size"] for array in arrays.values()):
+            raise ValueError(f"Index at {self.directory} is being persisted")
+        
+        self.dimension = meta["dimension"]
+        self._codes = arrays["codes"]
+        self._scales = arrays["scales"]
+        self._norms = arrays["norms"]
+        self._row_ids = arrays["row_ids"]
+        self._alive = arrays["alive"]
+        self._size = len(self._row_ids)
+        self.read_only = self.mmap
+        self._loaded = state
+        
+        if self.writer:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self._size * self.dimension * 4)
+        self._open_full()
+    
+    def _open_full(self) -> None:
+        if self._size and os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path):
+            self._full = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._size, self.dimension))
+        else:
+            self._full = None
+    
+    def _ensure_writable(self) -> None:
+        """Copy memory-mapped arrays into private memory before modifying them."""
+        if not self.writer:
+            raise RuntimeError(f"The index at {self.directory} is open read-only; writes go through the ingest process")
+        if self.read_only:
+            self._codes = np.array(self._codes)
+            self._scales = np.array(self._scales)
+            self._norms = np.array(self._norms)
+            self._row_ids = np.array(self._row_ids)
+            self._alive = np.array(self._alive)
+            self.read_only = False
+    
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        # Symmetric per-vector scalar quantization to [-127, 127]
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    
+    def _reserve(self, extra: int) -> None:
+        """Grow the arrays geometrically so appends stay amortized O(1)."""
+        needed = self._size + extra
+        capacity = len(self._row_ids) if self._row_ids is not None else 0
+        if needed <= capacity:
+            return
+        
+        capacity = max(needed, capacity * 2, 1024)
+        
+        def grow(array: Optional[np.ndarray], shape: tuple, dtype) -> np.ndarray:
+            grown = np.zeros(shape, dtype=dtype)
+            if array is not None:
+                grown[:self._size] = array[:self._size]
+            return grown
+        
+        code_dtype = np.float16 if self.dtype == "float16" else np.int8
+        self._codes = grow(self._codes, (capacity, self.dimension), code_dtype)
+        self._scales = grow(self._scales, (capacity,), np.float32)
+        self._norms = grow(self._norms, (capacity,), np.float32)
+        self._row_ids = grow(self._row_ids, (capacity,), np.int64)
+        self._alive = grow(self._alive, (capacity,), bool)
+    
+    def upsert(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        
+        self._lock.acquire_write()
+        try:
+            self._ensure_writable()
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+            
+            row_ids, replaced = self.chunks.write(ids, documents)
+            self._mark_deleted(replaced)
+            self._reserve(len(vectors))
+            
+            codes, scales = self._quantize(vectors)
+            end = self._size + len(vectors)
+            self._codes[self._size:end] = codes
+            self._scales[self._size:end] = scales
+            self._norms[self._size:end] = np.einsum("ij,ij->i", vectors, vectors)
+            self._row_ids[self._size:end] = row_ids
+            self._alive[self._size:end] = True
+            
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            self._size = end
+            self._open_full()
+            self._dirty = True
+        finally:
+            self._lock.release_write()
+    
+    def delete(self, ids: List[str]) -> None:
+        self._lock.acquire_write()
+        try:
+            self._ensure_writable()
+            self._mark_deleted(self.chunks.remove(ids))
+            self._dirty = True
+        finally:
+            self._lock.release_write()
+    
+    def _mark_deleted(self, row_ids: List[int]) -> None:
+        if row_ids and self._size:
+            self._alive[:self._size][np.isin(self._row_ids[:self._size], row_ids)] = False
+    
+    def search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        return self.search_many([embedding], k, filter)[0]
+    
+    def search_many(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search several queries with one pass over the stored vectors.
+        
+        A filter is resolved to row IDs through the ChunkStore field index first, and only
+        the vectors of matching chunks are scored.
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        
+        self._lock.acquire_read()
+        try:
+            if not self._size:
+                return [[] for _ in embeddings]
+            
+            subset = None
+            if filter:
+                allowed = np.asarray(self.chunks.select(filter), dtype=np.int64)
+                subset = np.flatnonzero(self._alive[:self._size] & np.isin(self._row_ids[:self._size], allowed))
+            live = len(subset) if subset is not None else int(self._alive[:self._size].sum())
+            if not live:
+                return [[] for _ in embeddings]
+            
+            fetch = k * self.rescore_factor if self.rescore else k
+            while True:
+                fetch = min(fetch, live)
+                candidates = self._candidates(queries, fetch, subset)
+                results = [self._finish(query, positions, k) for query, positions in zip(queries, candidates)]
+                if fetch >= live or all(len(result) >= k for result in results):
+                    return results
+                fetch *= 4
+        finally:
+            self._lock.release_read()
+    
+    def _candidates(self, queries: np.ndarray, fetch: int, subset: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """Positions of the `fetch` nearest live vectors per query by approximate distance.
+        
+        With `subset`, only the vectors at those positions are scored.
+        """
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        best_positions = [[] for _ in queries]
+        best_distances = [[] for _ in queries]
+        
+        total = self._size if subset is None else len(subset)
+        for start in range(0, total, self.block_size):
+            end = min(start + self.block_size, total)
+            # Contiguous slices are views; a subset needs a gather
+            rows = slice(start, end) if subset is None else subset[start:end]
+            positions = np.arange(start, end) if subset is None else rows
+            block = self._codes[rows].astype(np.float32)
+            dots = (block @ queries.T) * self._scales[rows, None]
+            # Squared L2 distance from the dot product: |x|^2 - 2x.q + |q|^2
+            distances = self._norms[rows, None] - 2 * dots + query_norms[None, :]
+            distances[~self._alive[rows]] = np.inf
+            
+            take = min(fetch, end - start)
+            for i in range(len(queries)):
+                column = distances[:, i]
+                top = np.argpartition(column, take - 1)[:take] if take < len(column) else np.arange(len(column))
+                best_positions[i].append(positions[top])
+                best_distances[i].append(column[top])
+        
+        candidates = []
+        for positions, distances in zip(best_positions, best_distances):
+            positions = np.concatenate(positions)
+            distances = np.concatenate(distances)
+            order = np.argsort(distances)[:fetch]
+            candidates.append(positions[order[np.isfinite(distances[order])]])
+        return candidates
+    
+    def _finish(
+        self,
+        query: np.ndarray,
+        positions: np.ndarray,
+        k: int
+    ) -> List[Tuple[Document, float]]:
+        """Re-rank candidates by exact distance if enabled, then resolve their documents."""
+        if self.rescore and self._full is not None and len(positions):
+            # Sorted positions turn the reads into one forward pass over the file
+            positions = np.sort(positions)
+            differences = np.asarray(self._full[positions]) - query
+            distances = np.einsum("ij,ij->i", differences, differences)
+        else:
+            distances = (
+                self._norms[positions]
+                - 2 * (self._codes[positions].astype(np.float32) @ query) * self._scales[positions]
+                + query @ query
+            )
+        order = np.argsort(distances)
+        positions = positions[order]
+        distances = distances[order]
+        
+        row_ids = [int(row_id) for row_id in self._row_ids[positions]]
+        documents = self.chunks.get(row_ids)
+        results = []
+        for row_id, distance in zip(row_ids, distances):
+            document = documents.get(row_id)
+            if document is not None:
+                results.append((document, float(distance)))
+                if len(results) == k:
+                    break
+        return results
+    
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[Document]]]:
+        return self.chunks.iter_chunks(batch_size)
+    
+    def count(self) -> int:
+        return self.chunks.count()
+    
+    def warm_up(self) -> None:
+        """Page the memory-mapped arrays and full-precision vectors in, then run one search."""
+        if self.dimension is None:
+            return
+        if self.read_only:
+            for name in ARRAY_NAMES:
+                read_through(self._array_path(name))
+        if self.rescore:
+            read_through(self.vectors_path)
+        self.search([0.0] * self.dimension, 1)
+    
+    def refresh(self) -> bool:
+        if file_state(self.meta_path) == self._loaded:
+            return False
+        self._lock.acquire_write()
+        try:
+            self._load()
+        except (ValueError, OSError):
+            # Caught mid-persist; the arrays loaded before are kept and the next refresh retries
+            return False
+        finally:
+            self._lock.release_write()
+        return True
+    
+    def persist(self) -> None:
+        """Write the arrays atomically, compacting deleted vectors away when there are many.
+        
+        Every file is written under a temporary name first, then renamed into place with
+        the metadata last: readers only reload once the metadata changes, and one that
+        catches the renames of the next persist sees sizes that disagree and retries.
+        """
+        self._lock.acquire_write()
+        try:
+            if not self._dirty or self.dimension is None:
+                return
+            compacted = False
+            if self._size and (~self._alive[:self._size]).sum() > self._size * 0.2:
+                self._compact()
+                compacted = True
+            
+            arrays = {
+                "codes": self._codes,
+                "scales": self._scales,
+                "norms": self._norms,
+                "row_ids": self._row_ids,
+                "alive": self._alive
+            }
+            renames = []
+            for name, array in arrays.items():
+                path = self._array_path(name)
+                with open(f"{path}.tmp", "wb") as f:
+                    np.save(f, array[:self._size])
+                renames.append(path)
+            if compacted:
+                renames.append(self.vectors_path)
+            with open(f"{self.meta_path}.tmp", "w") as f:
+                json.dump({"dtype": self.dtype, "dimension": self.dimension, "size": self._size}, f)
+            renames.append(self.meta_path)
+            
+            for path in renames:
+                os.replace(f"{path}.tmp", path)
+            if compacted:
+                self._open_full()
+            self._dirty = False
+        finally:
+            self._lock.release_write()
+    
+    def _compact(self) -> None:
+        """Drop deleted vectors from memory, writing the remaining full-precision ones to a temporary file.
+        
+        `persist` renames the file into place along with the arrays and maps it again;
+        the old mapping no longer matches the compacted positions, so it is dropped.
+        """
+        keep = np.flatnonzero(self._alive[:self._size])
+        with open(f"{self.vectors_path}.tmp", "wb") as f:
+            for start in range(0, len(keep), self.block_size):
+                f.write(np.asarray(self._full[keep[start:start + self.block_size]]).tobytes())
+        
+        self._codes = self._codes[keep]
+        self._scales = self._scales[keep]
+        self._norms = self._norms[keep]
+        self._row_ids = self._row_ids[keep]
+        self._alive = self._alive[keep]
+        self._size = len(keep)
+        self._full = None
+    
+    def clear(self) -> None:
+        self._lock.acquire_write()
+        try:
+            self._ensure_writable()
+            self.chunks.clear()
+            self.dimension = None
+            self._size = 0
+            self._codes = self._scales = self._norms = self._row_ids = self._alive = None
+            self._full = None
+            self.read_only = False
+            self._dirty = False
+            for path in [self.vectors_path, self.meta_path] + [self._array_path(name) for name in ARRAY_NAMES]:
+                if os.path.exists(path):
+                    os.remove(path)
+        finally:
+            self._lock.release_write()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        code_bytes = 2 if self.dtype == "float16" else 1
+        # Codes plus scale, norm, row ID and alive flag per vector
+        bytes_per_vector = (self.dimension or 0) * code_bytes + 4 + 4 + 8 + 1
+        return {
+            "backend": self.name,
+            "dtype": self.dtype,
+            "rescore": self.rescore,
+            "dimension": self.dimension,
+            "vectors": self._size,
+            "deleted_vectors": int((~self._alive[:self._size]).sum()) if self._size else 0,
+            "bytes_per_vector": bytes_per_vector,
+            "float32_bytes_per_vector": (self.dimension or 0) * 4,
+            "memory_mapped": self.read_only
+        }
\ No newline at end of file
@@ -1,84 +1,473 @@
-import os
-from typing import List, Dict, Any, Optional
-from langchain.schema import Document
-from langchain_community.vectorstores import Chroma
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from array import array
+from typing import List, Dict, Any, Optional, Callable
+from langchain.callbacks.manager import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+from app.ingest.backends import VectorBackend, create_backend
 from app.ingest.embedder import embedder
+from app.ingest.embedding_pipeline import PipelineResult
+from app.ingest.lexical_index import lexical_index
+from app.ingest.query_cache import LRUCache
+from app.utils.async_utils import run_sync
 from app.utils.config import settings
+from app.utils.metrics import CACHE_COUNTERS, CACHE_GAUGES, metrics
+from app.utils.registry import registry
+from app.utils.tracing import annotate, span
+
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical")
+
+retrieval_duration = metrics.histogram(
+    "contextagent_retrieval_duration_seconds",
+    "Latency of document retrieval, including query embedding and cache hits",
+    ["mode"]
+)
+index_search_duration = metrics.histogram(
+    "contextagent_index_search_duration_seconds",
+    "Latency of searches that reach an index, by vector store type or lexical",
+    ["index"]
+)
+ingested_chunks = metrics.counter("contextagent_ingest_chunks_total", "Chunks embedded and stored")
+deleted_chunks = metrics.counter("contextagent_ingest_chunks_deleted_total", "Chunks deleted from the index")
+
+class IngestionCancelled(Exception):
+    """Raised when an ingestion is cancelled before all chunks are stored."""
 
 class VectorStore:
-    """Manages document storage and retrieval using ChromaDB."""
+    """Manages document storage and retrieval on the backend selected by VECTOR_STORE_TYPE.
+    
+    With INGEST_ROLE=submit the process only reads: the index is opened read-only, and
+    a background thread started by `start()` checks every INDEX_REFRESH_INTERVAL seconds
+    whether the ingest process has persisted a new version, reopening it and bumping the
+    collection version if so.
+    """
     
     def __init__(self):
-        self.persist_directory = settings.CHROMA_PERSIST_DIRECTORY
+        self.store_type = settings.VECTOR_STORE_TYPE
         self.embedding_function = embedder.embeddings
-        self.vector_store = None
+        self.backend: Optional[VectorBackend] = None
+        self.writer = settings.INGEST_ROLE != "submit"
+        # Bumped on every write so caches of retrieval results and answers can tell they are stale
+        self._collection_version = 0
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self.query_embedding_cache = LRUCache(
+            settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+            settings.QUERY_EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            settings.QUERY_EMBEDDING_CACHE_TTL
+        )
+        self.search_result_cache = LRUCache(
+            settings.SEARCH_RESULT_CACHE_MAX_ENTRIES,
+            settings.SEARCH_RESULT_CACHE_MAX_MB * 1024 * 1024,
+            settings.SEARCH_RESULT_CACHE_TTL
+        )
+        self._write_lock = threading.Lock()
         self._initialize_vector_store()
     
     def _initialize_vector_store(self):
-        """Initialize or load the vector store."""
-        if os.path.exists(self.persist_directory):
-            # Load existing vector store
-            self.vector_store = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embedding_function
-            )
-        else:
-            # Create new vector store
-            self.vector_store = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embedding_function
-            )
+        """Initialize or load the vector store backend."""
+        self.backend = create_backend(self.store_type, self.embedding_function, writer=self.writer)
+        if self.writer:
+            self._backfill_lexical_index()
     
-    def add_documents(self, documents: List[Document]) -> None:
-        """Add documents to the vector store."""
-        if not documents:
+    def _backfill_lexical_index(self) -> None:
+        """Index the text of chunks stored before the lexical index existed."""
+        if lexical_index.count() or not self.backend.count():
             return
+        for ids, documents in self.backend.iter_documents():
+            lexical_index.upsert(ids, documents)
+    
+    def add_documents(
+        self,
+        documents: List[Document],
+        on_progress: Optional[Callable[[PipelineResult], None]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> List[str]:
+        """Add documents to the vector store and return the IDs of the stored chunks.
+        
+        Chunks are embedded in concurrent batches and each batch is upserted as soon as
+        it is ready, so a failing batch does not lose the others. Every chunk is stamped
+        with an `ingested_at` timestamp for date-range filters. Raises
+        IngestionCancelled if `cancel_event` is set before all batches are stored.
+        """
+        if not documents:
+            return []
         
         # Process documents through embedder
         processed_docs = embedder.process_documents(documents)
+        ids = self._make_chunk_ids(processed_docs)
+        ingested_at = time.time()
+        for doc in processed_docs:
+            doc.metadata["ingested_at"] = ingested_at
         
-        # Add to vector store
-        self.vector_store.add_documents(processed_docs)
-        self.vector_store.persist()
+        # Embed and add to vector store batch by batch
+        try:
+            result = embedder.pipeline.run(processed_docs, ids, self._upsert_batch, on_progress, cancel_event)
+        finally:
+            # Batches stored before a failure or cancellation changed the collection too
+            self._bump_version()
+        self.backend.persist()
+        
+        if result.cancelled:
+            raise IngestionCancelled(f"Ingestion cancelled after {result.chunks_processed} chunks")
+        
+        if result.failed_batches:
+            raise RuntimeError(
+                f"{result.failed_batches} embedding batch(es) failed, "
+                f"{result.chunks_processed} chunks stored: {result.errors[0]}"
+            )
+        
+        return result.ids
+    
+    def _upsert_batch(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> None:
+        """Write one batch of pre-embedded chunks to the backend."""
+        with self._write_lock:
+            self.backend.upsert(ids, documents, embeddings)
+            lexical_index.upsert(ids, documents)
+        ingested_chunks.inc(len(ids))
+    
+    def delete_documents(self, ids: List[str]) -> None:
+        """Delete chunks by ID."""
+        if not ids:
+            return
+        
+        with self._write_lock:
+            self.backend.delete(ids)
+            self.backend.persist()
+            lexical_index.delete(ids)
+        deleted_chunks.inc(len(ids))
+        self._bump_version()
+    
+    def _bump_version(self) -> None:
+        with self._write_lock:
+            self._collection_version += 1
     
-    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+    @property
+    def collection_version(self) -> int:
+        """Version of the collection, bumped on every write seen by this process."""
+        return self._collection_version
+    
+    def start(self) -> None:
+        """Start the background thread picking up indexes persisted by the ingest process."""
+        if self.writer or (self._refresher and self._refresher.is_alive()):
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="index-refresh", daemon=True)
+        self._refresher.start()
+    
+    def shutdown(self) -> None:
+        """Stop the refresh thread."""
+        self._stop.set()
+        if self._refresher:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+    
+    def _refresh_loop(self) -> None:
+        # Reopening or remapping the index can take a while, so it never runs on a request path
+        while not self._stop.wait(settings.INDEX_REFRESH_INTERVAL):
+            try:
+                if self.backend.refresh():
+                    self._bump_version()
+            except Exception as e:
+                print(f"⚠️  Index refresh failed, retrying: {e}")
+    
+    @staticmethod
+    def _make_chunk_ids(documents: List[Document]) -> List[str]:
+        """Build deterministic chunk IDs from origin file, position and content.
+        
+        Re-ingesting the same file upserts over its previous chunks instead of duplicating them.
+        """
+        ids = []
+        positions: Dict[str, int] = {}
+        for doc in documents:
+            origin = doc.metadata.get("file_path") or doc.metadata.get("source", "unknown")
+            position = positions.get(origin, 0)
+            positions[origin] = position + 1
+            key = f"{origin}\0{position}\0{doc.page_content}"
+            ids.append(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+        return ids
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing the embedding of an earlier identical query."""
+        key = " ".join(query.split())
+        with span("embed_query"):
+            embedding = self.query_embedding_cache.get(key)
+            annotate(cached=embedding is not None)
+            if embedding is None:
+                embedding = self.embedding_function.embed_query(query)
+                # A list of Python floats costs ~32 bytes per element
+                self.query_embedding_cache.put(key, embedding, len(embedding) * 32 + len(key))
+        return embedding
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several search queries, with one embedding call for all uncached ones.
+        
+        The embeddings are stored in the query embedding cache, so searches for the same
+        queries right after do not embed them again.
+        """
+        keys = [" ".join(query.split()) for query in queries]
+        with span("embed_queries", queries=len(keys)):
+            embeddings = {key: self.query_embedding_cache.get(key) for key in set(keys)}
+            missing = [key for key, embedding in embeddings.items() if embedding is None]
+            annotate(embedded=len(missing))
+            if missing:
+                for key, embedding in zip(missing, self.embedding_function.embed_documents(missing)):
+                    embeddings[key] = embedding
+                    self.query_embedding_cache.put(key, embedding, len(embedding) * 32 + len(key))
+        return [embeddings[key] for key in keys]
+    
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[Document]:
         """Search for similar documents."""
-        if not self.vector_store:
-            return []
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter, mode)]
+    
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[tuple]:
+        """Search for similar documents with scores; lower scores are better.
+        
+        `mode` (default RETRIEVAL_MODE) selects the retrieval strategy:
+        - vector: nearest neighbours of the query embedding; scores are distances
+        - lexical: BM25 keyword search, without an embedding call; scores are negated BM25
+        - hybrid: reciprocal rank fusion of both; scores are negated fusion scores
         
-        return self.vector_store.similarity_search(query, k=k)
+        Results are cached per (query, k, filter, mode, collection version), so any
+        write to the collection makes earlier results unreachable.
+        """
+        mode = mode or settings.RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode: {mode}")
+        with retrieval_duration.time(mode=mode), span("search", mode=mode, k=k):
+            return self._search_with_score(query, k, filter, mode)
     
-    def similarity_search_with_score(self, query: str, k: int = 4) -> List[tuple]:
-        """Search for similar documents with similarity scores."""
-        if not self.vector_store:
-            return []
+    def _search_with_score(self, query: str, k: int, filter: Optional[Dict[str, Any]], mode: str) -> List[tuple]:
+        if mode == "lexical":
+            embedding = None
+            query_key = " ".join(query.split())
+        else:
+            embedding = self.embed_query(query)
+            query_key = hashlib.sha1(array("f", embedding).tobytes()).hexdigest()
+            if mode == "hybrid":
+                query_key += "\0" + " ".join(query.split())
         
-        return self.vector_store.similarity_search_with_score(query, k=k)
+        key = (mode, query_key, k, json.dumps(filter, sort_keys=True, default=str), self.collection_version)
+        results = self.search_result_cache.get(key)
+        annotate(cached=results is not None)
+        if results is None:
+            if mode == "vector":
+                results = self._vector_search(embedding, k, filter)
+            elif mode == "lexical":
+                results = self._lexical_search(query, k, filter)
+            else:
+                results = self._hybrid_search(query, embedding, k, filter)
+            size = sum(len(doc.page_content) + len(str(doc.metadata)) for doc, _ in results)
+            self.search_result_cache.put(key, results, size)
+        
+        # Hand out copies so callers cannot modify the cached documents
+        return [(Document(page_content=doc.page_content, metadata=dict(doc.metadata)), score) for doc, score in results]
     
-    def get_relevant_documents(self, query: str, k: int = 4) -> List[Document]:
+    def _hybrid_search(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]]
+    ) -> List[tuple]:
+        """Fuse vector and BM25 rankings with reciprocal rank fusion.
+        
+        Each list contributes 1 / (HYBRID_RRF_K + rank) per document, so a chunk ranked
+        well by either signal surfaces, and one ranked well by both comes first.
+        """
+        candidates = max(k, settings.HYBRID_CANDIDATES)
+        fused: Dict[tuple, list] = {}
+        for ranking in (self._vector_search(embedding, candidates, filter), self._lexical_search(query, candidates, filter)):
+            for rank, (doc, _) in enumerate(ranking, start=1):
+                doc_key = (doc.page_content, json.dumps(doc.metadata, sort_keys=True, default=str))
+                entry = fused.setdefault(doc_key, [doc, 0.0])
+                entry[1] += 1.0 / (settings.HYBRID_RRF_K + rank)
+        
+        ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)[:k]
+        return [(doc, -score) for doc, score in ranked]
+    
+    def _vector_search(self, embedding: List[float], k: int, filter: Optional[Dict[str, Any]]) -> List[tuple]:
+        with index_search_duration.time(index=self.store_type), span("vector_search", index=self.store_type, k=k):
+            return self.backend.search(embedding, k, filter)
+    
+    @staticmethod
+    def _lexical_search(query: str, k: int, filter: Optional[Dict[str, Any]]) -> List[tuple]:
+        with index_search_duration.time(index="lexical"), span("lexical_search", k=k):
+            return lexical_index.search(query, k, filter)
+    
+    def get_relevant_documents(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[Document]:
         """Get relevant documents for a query (alias for similarity_search)."""
-        return self.similarity_search(query, k)
+        return self.similarity_search(query, k, filter, mode)
+    
+    def as_retriever(
+        self,
+        k: int = 4,
+        mode: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> "CachedRetriever":
+        """Get a LangChain retriever that searches through this store and its caches."""
+        return CachedRetriever(store=self, k=k, mode=mode, filter=filter)
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """Async version of embed_query."""
+        return await run_sync(self.embed_query, query)
+    
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Async version of embed_queries."""
+        return await run_sync(self.embed_queries, queries)
+    
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[Document]:
+        """Async version of similarity_search; Chroma is synchronous so it runs in the thread pool."""
+        return await run_sync(self.similarity_search, query, k, filter, mode)
+    
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[tuple]:
+        """Async version of similarity_search_with_score."""
+        return await run_sync(self.similarity_search_with_score, query, k, filter, mode)
+    
+    async def aget_relevant_documents(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[Document]:
+        """Async version of get_relevant_documents."""
+        return await self.asimilarity_search(query, k, filter, mode)
+    
+    async def aadd_documents(
+        self,
+        documents: List[Document],
+        on_progress: Optional[Callable[[PipelineResult], None]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> List[str]:
+        """Async version of add_documents."""
+        return await run_sync(self.add_documents, documents, on_progress, cancel_event)
+    
+    def warm_up(self) -> None:
+        """Page the vector and lexical indexes into memory ahead of the first query."""
+        self.backend.warm_up()
+        lexical_index.count()
     
     def delete_collection(self) -> None:
         """Delete the entire collection."""
-        if self.vector_store:
-            self.vector_store.delete_collection()
-            self.vector_store = None
+        with self._write_lock:
+            self.backend.clear()
+            lexical_index.clear()
+        self._bump_version()
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store."""
-        if not self.vector_store:
-            return {"count": 0, "status": "not_initialized"}
-        
+        cache_stats = {
+            "query_embedding_cache": self.query_embedding_cache.get_stats(),
+            "search_result_cache": self.search_result_cache.get_stats()
+        }
         try:
-            count = self.vector_store._collection.count()
+            count = self.backend.count()
             return {
                 "count": count,
                 "status": "active",
-                "persist_directory": self.persist_directory
+                **self.backend.get_stats(),
+                "collection_version": self.collection_version,
+                "lexical_index": lexical_index.get_stats(),
+                **cache_stats
             }
         except Exception as e:
-            return {"count": 0, "status": f"error: {str(e)}"}
+            return {"count": 0, "status": f"error: {str(e)}", **cache_stats}
+
+class CachedRetriever(BaseRetriever):
+    """Retriever over VectorStore, so chains share its query embedding and result caches."""
+    
+    store: Any
+    k: int = 4
+    mode: Optional[str] = None
+    filter: Optional[Dict[str, Any]] = None
+    
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.store.similarity_search(query, self.k, self.filter, self.mode)
+    
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await self.store.asimilarity_search(query, self.k, self.filter, self.mode)
+
+class SharedRetriever(CachedRetriever):
+    """CachedRetriever that runs each distinct query once for its whole lifetime.
+    
+    Concurrent and later calls with the same query await the first call's result, so a
+    batch of overlapping questions shares retrieval even before the search result cache
+    is filled. Meant to live for one batch of requests.
+    """
+    
+    results: Dict[str, Any] = {}
+    
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        key = " ".join(query.split())
+        if key not in self.results:
+            self.results[key] = asyncio.ensure_future(self.store.asimilarity_search(query, self.k, self.filter, self.mode))
+        return list(await asyncio.shield(self.results[key]))
 
 # Global vector store instance
-vector_store = VectorStore() 
\ No newline at end of file
+vector_store = registry.register("vector_store", VectorStore)
+
+metrics.export_stats(
+    "contextagent_cache",
+    lambda: vector_store.query_embedding_cache.get_stats() if registry.peek("vector_store") else None,
+    counters=CACHE_COUNTERS,
+    gauges=CACHE_GAUGES,
+    labels={"cache": "query_embedding"}
+)
+metrics.export_stats(
+    "contextagent_cache",
+    lambda: vector_store.search_result_cache.get_stats() if registry.peek("vector_store") else None,
+    counters=CACHE_COUNTERS,
+    gauges=CACHE_GAUGES,
+    labels={"cache": "search_result"}
+)
+# Every process reads the same index, so its size is not summed over them
+metrics.export_stats(
+    "contextagent_index",
+    lambda: {"chunks": vector_store.backend.count()} if registry.peek("vector_store") else None,
+    gauges={"chunks": "Chunks in the vector index"},
+    aggregate="max"
+) 
\ No newline at end of file
@@ -1,21 +1,67 @@
+import asyncio
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 from contextlib import asynccontextmanager
 
 from app.routes.chat import router as chat_router
-from app.routes.ingest import router as ingest_router
+from app.routes.ingest import UploadSizeLimitMiddleware, router as ingest_router
+from app.routes.debug import router as debug_router
+from app.ingest.embedder import embedder
+from app.ingest.jobs import job_manager
+from app.ingest.vector_store import vector_store
+from app.memory.session_memory import memory_manager
+from app.utils.async_utils import run_sync
 from app.utils.config import settings
+from app.utils.metrics import MetricsMiddleware, metrics
+from app.utils.registry import registry
 from app.schemas.request_model import HealthResponse
 
-# Validate settings on startup
-try:
-    settings.validate()
-except ValueError as e:
-    print(f"Configuration error: {e}")
-    print("Please check your .env file and ensure OPENAI_API_KEY is set.")
-    exit(1)
+def start_components() -> None:
+    """Build every component, warm them up if configured, then report readiness.
+    
+    Runs in a worker thread after the server has started, so `/health` answers while
+    the index is opened; `/ready` reports 503 until this finishes.
+    """
+    try:
+        settings.validate()
+    except ValueError as e:
+        registry.errors["settings"] = str(e)
+        print(f"Configuration error: {e}")
+        print("Please check your .env file and ensure OPENAI_API_KEY is set.")
+        return
+    
+    registry.build_all()
+    try:
+        with registry.measure("start:job_manager"):
+            job_manager.start()
+        with registry.measure("start:memory_manager"):
+            memory_manager.start()
+        with registry.measure("start:vector_store"):
+            vector_store.start()
+        if settings.STARTUP_WARMUP:
+            with registry.measure("warm_up:vector_store"):
+                vector_store.warm_up()
+    except Exception as e:
+        registry.errors["startup"] = str(e)
+        print(f"❌ Startup failed: {e}")
+        return
+    
+    if settings.STARTUP_WARMUP:
+        # A failed probe only costs the first request its connection setup
+        try:
+            with registry.measure("warm_up:embeddings"):
+                embedder.warm_up()
+        except Exception as e:
+            print(f"⚠️  Embeddings warm-up failed: {e}")
+    
+    print("⏱️  Startup breakdown:")
+    for step, ms in registry.timings.items():
+        print(f"   {step}: {ms:.1f} ms")
+    registry.ready = not registry.errors
+    if registry.ready:
+        print(f"✅ Ready in {sum(registry.timings.values()):.1f} ms")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,11 +71,24 @@ async def lifespan(app: FastAPI):
     print(f"📊 Model: {settings.OPENAI_MODEL}")
     print(f"🗄️  Vector Store: {settings.VECTOR_STORE_TYPE}")
     print(f"🌐 Server: {settings.HOST}:{settings.PORT}")
+    if settings.METRICS_ENABLED:
+        metrics.start()
+    registry.starting = True
+    startup = asyncio.create_task(run_sync(start_components))
+    startup.add_done_callback(lambda _: setattr(registry, "starting", False))
     
     yield
     
     # Shutdown
     print("🛑 Shutting down ContextAgent...")
+    # The startup thread cannot be interrupted; let it finish before stopping what it started
+    await startup
+    registry.ready = False
+    for name in ("vector_store", "job_manager", "memory_manager"):
+        component = registry.peek(name)
+        if component is not None:
+            component.shutdown()
+    metrics.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -48,9 +107,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(UploadSizeLimitMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(chat_router)
 app.include_router(ingest_router)
+app.include_router(debug_router)
 
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -78,6 +143,21 @@ async def health_check():
         }
     )
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 503 until every component is built (and warmed up, if enabled)."""
+    status = registry.get_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus metrics: per-stage latency histograms, token and cache counters, in-flight gauges."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    # Collectors read other components' stats, and may read other processes' snapshots
+    content = await run_sync(metrics.render)
+    return Response(content=content, media_type="text/plain; version=0.0.4")
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler."""
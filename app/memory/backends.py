@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
+from app.utils.config import settings
+
+class StoredSession(NamedTuple):
+    """A session as loaded from a backend.
+    
+    Each message advances the session's version by one, so the last of `messages` is at
+    `version` and the one before it at `version - 1`. `summary` covers every message up
+    to and including `summary_version`.
+    """
+    version: int
+    messages: List[Tuple[str, str]]
+    summary: str = ""
+    summary_version: int = 0
+
+class SessionBackend(ABC):
+    """Shared, persistent storage for session messages.
+    
+    MemoryManager keeps hot sessions cached in-process and writes every message through
+    to the backend, so all workers see the same history and it survives restarts. Each
+    session has a version that changes whenever messages are added, which lets a worker
+    revalidate its cached copy with one key lookup. The operations map directly onto a
+    Redis-like store: `append` is RPUSH + INCR, `load` is GET + LRANGE, `version` is GET,
+    `save_summary` is SET, and TTL and message caps are EXPIRE and LTRIM.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Add a message to the end of a session."""
+    
+    @abstractmethod
+    def load(self, session_id: str, limit: Optional[int] = None) -> StoredSession:
+        """Return a session with its last `limit` (role, content) messages, oldest first."""
+    
+    @abstractmethod
+    def save_summary(self, session_id: str, summary: str, version: int) -> None:
+        """Store a session's rolling summary of the messages up to `version`."""
+    
+    @abstractmethod
+    def version(self, session_id: str) -> int:
+        """Return a session's version; 0 for a session without messages."""
+    
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session's messages."""
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every session."""
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored sessions, including emptied ones not yet expired."""
+    
+    def start(self) -> None:
+        """Start any background work."""
+    
+    def shutdown(self) -> None:
+        """Stop background work and make every write durable."""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "sessions": self.count()}
+
+class SQLiteSessionBackend(SessionBackend):
+    """Session messages in an SQLite database in WAL mode, shared by every worker.
+    
+    Writes are buffered and committed in batches: when `batch_size` messages are pending,
+    every `flush_interval` seconds on a background thread, and before this process reads
+    a session. Other workers therefore see a message at most `flush_interval` later.
+    Messages beyond `max_messages` per session are trimmed, and sessions idle for longer
+    than `session_ttl` are deleted, as part of the flush.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.05,
+        batch_size: int = 64,
+        max_messages: int = 0,
+        session_ttl: float = 0
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_messages = max_messages
+        self.session_ttl = session_ttl
+        self._pending: List[Tuple[str, str, str, float]] = []
+        self._pending_counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_expiry = 0.0
+        self._stats = {"flushes": 0, "messages_written": 0, "sessions_expired": 0}
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL with NORMAL sync is durable across process crashes; only an OS crash can lose the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_used ON sessions(last_used)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, version INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="session-flush", daemon=True)
+        self._thread.start()
+    
+    def shutdown(self) -> None:
+        """Stop the flush thread and commit any pending writes."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+    
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"⚠️  Session flush failed, retrying: {e}")
+    
+    def append(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            self._pending.append((session_id, role, content, time.time()))
+            self._pending_counts[session_id] += 1
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+    
+    def flush(self) -> None:
+        """Commit pending writes in one transaction."""
+        with self._lock:
+            self._flush()
+    
+    def _flush(self) -> None:
+        try:
+            self._write_pending()
+        except sqlite3.Error:
+            # Keep the pending writes for the next attempt instead of committing half of them
+            self._conn.rollback()
+            raise
+    
+    def _write_pending(self) -> None:
+        now = time.time()
+        if self._pending:
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)", self._pending
+            )
+            self._conn.executemany(
+                "INSERT INTO sessions (session_id, version, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "version = version + excluded.version, last_used = excluded.last_used",
+                [(session_id, count, now) for session_id, count in self._pending_counts.items()]
+            )
+            if self.max_messages:
+                # Delete everything older than the session's max_messages-th newest message
+                self._conn.executemany(
+                    "DELETE FROM messages WHERE session_id = ? AND id <= "
+                    "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    [(session_id, session_id, self.max_messages) for session_id in self._pending_counts]
+                )
+        
+        if self.session_ttl and now - self._last_expiry >= min(self.session_ttl, 60):
+            self._last_expiry = now
+            cutoff = now - self.session_ttl
+            for table in ("messages", "summaries"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE session_id IN (SELECT session_id FROM sessions WHERE last_used < ?)",
+                    (cutoff,)
+                )
+            expired = self._conn.execute("DELETE FROM sessions WHERE last_used < ?", (cutoff,)).rowcount
+            self._stats["sessions_expired"] += expired
+        self._conn.commit()
+        
+        if self._pending:
+            self._stats["messages_written"] += len(self._pending)
+            self._stats["flushes"] += 1
+            self._pending = []
+            self._pending_counts.clear()
+    
+    def load(self, session_id: str, limit: Optional[int] = None) -> StoredSession:
+        with self._lock:
+            if self._pending_counts.get(session_id):
+                self._flush()
+            row = self._conn.execute(
+                "SELECT s.version, m.summary, m.version FROM sessions s "
+                "LEFT JOIN summaries m ON m.session_id = s.session_id WHERE s.session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if not row:
+                return StoredSession(0, [])
+            rows = self._conn.execute(
+                "SELECT role, content FROM "
+                "(SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?) "
+                "ORDER BY id",
+                (session_id, limit or -1)
+            ).fetchall()
+            return StoredSession(row[0], rows, row[1] or "", row[2] or 0)
+    
+    def save_summary(self, session_id: str, summary: str, version: int) -> None:
+        with self._lock:
+            # Never replace a summary with an older one written late by another worker
+            self._conn.execute(
+                "INSERT INTO summaries (session_id, summary, version) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, version = excluded.version "
+                "WHERE excluded.version > summaries.version",
+                (session_id, summary, version)
+            )
+            self._conn.commit()
+    
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            return (row[0] if row else 0) + self._pending_counts.get(session_id, 0)
+    
+    def delete(self, session_id: str) -> None:
+        """Remove a session's messages; the emptied session expires with the TTL."""
+        with self._lock:
+            self._flush()
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+            # Keep the row with a new version rather than restarting at 0, so a copy cached
+            # by another worker can never match a recreated session's version
+            self._conn.execute("UPDATE sessions SET version = version + 1 WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._pending = []
+            self._pending_counts.clear()
+            self._conn.execute("DELETE FROM messages")
+            self._conn.execute("DELETE FROM summaries")
+            self._conn.execute("UPDATE sessions SET version = version + 1")
+            self._conn.commit()
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            **super().get_stats(),
+            "path": self.path,
+            "pending_writes": pending,
+            **self._stats
+        }
+
+def create_session_backend(backend_type: str) -> Optional[SessionBackend]:
+    """Build the backend selected by SESSION_BACKEND; None keeps sessions in process memory only."""
+    if backend_type == "memory":
+        return None
+    if backend_type == "sqlite":
+        return SQLiteSessionBackend(
+            settings.SESSION_DB_PATH,
+            flush_interval=settings.SESSION_FLUSH_INTERVAL,
+            batch_size=settings.SESSION_WRITE_BATCH_SIZE,
+            max_messages=settings.SESSION_MAX_MESSAGES,
+            session_ttl=settings.SESSION_TTL
+        )
+    raise ValueError(f"Unsupported SESSION_BACKEND: {backend_type}") 
\ No newline at end of file
@@ -1,69 +1,393 @@
-from typing import List, Dict, Any
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from app.memory.backends import SessionBackend, StoredSession, create_session_backend
 from app.schemas.request_model import Message
+from app.utils.config import settings
+from app.utils.metrics import metrics
+from app.utils.registry import registry
+from app.utils.tokens import count_tokens
+
+class MessageRecord:
+    """A compact stored chat message; LangChain message objects are built only when read."""
+    
+    __slots__ = ("role", "content", "size", "tokens")
+    
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+        # Approximate resident size: the string itself plus this record
+        self.size = sys.getsizeof(content) + sys.getsizeof(self)
+        self.tokens = count_tokens(content)
+    
+    def to_message(self) -> BaseMessage:
+        if self.role == "user":
+            return HumanMessage(content=self.content)
+        return AIMessage(content=self.content)
 
 class SessionMemory:
-    """Manages conversational memory for chat sessions."""
+    """Manages conversational memory for chat sessions.
     
-    def __init__(self, session_id: str = "default"):
+    Keeps at most `max_messages` records, dropping the oldest first. Size changes are
+    reported to the owning MemoryManager so it can enforce its total-bytes cap, and new
+    messages are written through to the session backend, if any.
+    
+    With `window_tokens`, only the most recent messages that fit in that many tokens
+    form the verbatim window; older ones are folded into a rolling `summary` by the
+    conversation summarizer in the background and dropped. Until then they stay in
+    the history verbatim, so nothing is lost while a summary is being written.
+    """
+    
+    def __init__(
+        self,
+        session_id: str = "default",
+        max_messages: Optional[int] = None,
+        manager: Optional["MemoryManager"] = None,
+        backend: Optional[SessionBackend] = None,
+        window_tokens: int = 0
+    ):
         self.session_id = session_id
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="output"
-        )
+        self.messages = deque(maxlen=max_messages or None)
+        self.window_tokens = window_tokens
+        self.summary = ""
+        self.summary_tokens = 0
+        self.size = 0
+        self.version = 0
+        # Bumped whenever the messages are replaced wholesale, to discard stale summaries
+        self.epoch = 0
+        self.last_used = time.monotonic()
+        self._manager = manager
+        self._backend = backend
+        # Writes run on pool threads; sharing the manager's lock also orders them with its bookkeeping
+        self._lock = manager._lock if manager else threading.RLock()
+    
+    @property
+    def detached(self) -> bool:
+        """Whether the session was evicted or removed from its manager's store."""
+        return self._manager is None
     
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the conversation memory."""
-        if role == "user":
-            self.memory.chat_memory.add_user_message(content)
-        elif role == "agent":
-            self.memory.chat_memory.add_ai_message(content)
+        if role not in ("user", "agent"):
+            return
+        
+        record = MessageRecord(role, content)
+        with self._lock:
+            dropped = 0
+            if self.messages.maxlen is not None and len(self.messages) == self.messages.maxlen:
+                dropped = self.messages[0].size
+            self.messages.append(record)
+            self.size += record.size - dropped
+            self.last_used = time.monotonic()
+            self.version += 1
+            if self._backend:
+                self._backend.append(self.session_id, role, content)
+            if self._manager:
+                self._manager._account(self, record.size - dropped, trimmed=1 if dropped else 0)
+    
+    def add_messages(self, messages: Iterable[Tuple[str, str]]) -> None:
+        """Add `(role, content)` messages in order."""
+        for role, content in messages:
+            self.add_message(role, content)
     
     def get_messages(self) -> List[BaseMessage]:
-        """Get all messages from memory."""
-        return self.memory.chat_memory.messages
+        """Get all messages from memory, preceded by the summary of older ones, if any."""
+        messages = [record.to_message() for record in list(self.messages)]
+        if self.summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        return messages
     
     def get_messages_as_dict(self) -> List[Message]:
         """Get messages in the format expected by the API."""
-        messages = []
-        for msg in self.memory.chat_memory.messages:
-            if isinstance(msg, HumanMessage):
-                messages.append(Message(role="user", content=msg.content))
-            elif isinstance(msg, AIMessage):
-                messages.append(Message(role="agent", content=msg.content))
-        return messages
+        return [Message(role=record.role, content=record.content) for record in list(self.messages)]
+    
+    def pending_summary(self) -> List[MessageRecord]:
+        """The oldest messages that no longer fit in the token window, in order."""
+        if not self.window_tokens:
+            return []
+        records = list(self.messages)
+        tokens = 0
+        # Walk back from the newest message; the latest one always stays in the window
+        for index in range(len(records) - 1, -1, -1):
+            tokens += records[index].tokens
+            if tokens > self.window_tokens and index < len(records) - 1:
+                return records[:index + 1]
+        return []
+    
+    def apply_summary(self, summary: str, records: List[MessageRecord], epoch: int) -> None:
+        """Replace the summary with one that also covers `records`, and drop them.
+        
+        Ignored if the session was cleared or reloaded since `epoch`, as the records and
+        the summary they were folded into are no longer this session's.
+        """
+        summary_tokens = count_tokens(summary)
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            previous = self.size
+            for record in records:
+                # Some may already have been dropped by the message cap
+                if self.messages and self.messages[0] is record:
+                    self.messages.popleft()
+            self.summary = summary
+            self.summary_tokens = summary_tokens
+            delta = self._resize() - previous
+            
+            # Every message advances the version, so the remaining ones end at `version`
+            covered = self.version - len(self.messages)
+            if self._backend:
+                self._backend.save_summary(self.session_id, summary, covered)
+            if self._manager:
+                self._manager._account(self, delta)
+    
+    def get_token_counts(self) -> Dict[str, int]:
+        """Tokens held verbatim in the window, awaiting summary, and in the summary."""
+        messages = sum(record.tokens for record in list(self.messages))
+        pending = sum(record.tokens for record in self.pending_summary())
+        return {
+            "window": messages - pending,
+            "pending_summary": pending,
+            "summary": self.summary_tokens,
+            "total": messages + self.summary_tokens
+        }
+    
+    def replace(self, stored: StoredSession) -> int:
+        """Replace the cached messages with ones loaded from the backend, returning the size change."""
+        previous = self.size
+        # The last message is at `stored.version`; skip those the summary already covers
+        first_version = stored.version - len(stored.messages) + 1
+        skip = max(0, stored.summary_version - first_version + 1)
+        self.messages.clear()
+        self.messages.extend(MessageRecord(role, content) for role, content in stored.messages[skip:])
+        self.summary = stored.summary
+        self.summary_tokens = count_tokens(stored.summary)
+        self.version = stored.version
+        self.epoch += 1
+        return self._resize() - previous
+    
+    def _resize(self) -> int:
+        """Recompute the size from the records and summary, returning it."""
+        self.size = sum(record.size for record in self.messages) + (sys.getsizeof(self.summary) if self.summary else 0)
+        return self.size
+    
+    def trim_oldest(self) -> int:
+        """Drop the oldest message, returning the bytes freed."""
+        if not self.messages:
+            return 0
+        freed = self.messages.popleft().size
+        self.size -= freed
+        return freed
     
     def clear(self) -> None:
         """Clear the conversation memory."""
-        self.memory.clear()
+        with self._lock:
+            self.messages.clear()
+            self.summary = ""
+            self.summary_tokens = 0
+            self.size = 0
+            self.epoch += 1
     
     def get_memory_variables(self) -> Dict[str, Any]:
         """Get memory variables for LangChain."""
-        return self.memory.load_memory_variables({})
+        return {"chat_history": self.get_messages()}
 
 class MemoryManager:
-    """Manages multiple session memories."""
+    """Manages multiple session memories in a bounded, least-recently-used store.
+    
+    Sessions idle for longer than `session_ttl` seconds expire, and when there are more
+    than `max_sessions` sessions or they hold more than `max_bytes` in total, the least
+    recently used ones are evicted. A value of 0 disables the corresponding limit.
+    
+    With a `backend`, this store is a write-through cache of hot sessions: a cached
+    session is revalidated against the backend's version on every `get_session` and
+    reloaded with one indexed query when another worker has changed it. Evicting it
+    from the cache then loses nothing.
+    """
+    
+    def __init__(
+        self,
+        max_sessions: int = 0,
+        session_ttl: float = 0,
+        max_messages: int = 0,
+        max_bytes: int = 0,
+        backend: Optional[SessionBackend] = None,
+        window_tokens: int = 0
+    ):
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.window_tokens = window_tokens
+        self.sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self.total_bytes = 0
+        # Throwaway sessions kept out of the backend until they are cleared
+        self._ephemeral: Set[str] = set()
+        self._lock = threading.RLock()
+        self._stats = {
+            "created": 0, "evicted": 0, "expired": 0, "evicted_for_bytes": 0, "messages_trimmed": 0,
+            "cache_hits": 0, "cache_reloads": 0
+        }
+    
+    def start(self) -> None:
+        """Start the session backend's background work."""
+        if self.backend:
+            self.backend.start()
+    
+    def shutdown(self) -> None:
+        """Make every session write durable."""
+        if self.backend:
+            self.backend.shutdown()
     
-    def __init__(self):
-        self.sessions: Dict[str, SessionMemory] = {}
+    def mark_ephemeral(self, session_id: str) -> None:
+        """Keep a throwaway session, such as a batch item's, in process memory only.
+        
+        Nothing of it is written to the backend, so clearing it leaves no row behind. Takes
+        no lock, so it can be called on the event loop.
+        """
+        self._ephemeral.add(session_id)
     
     def get_session(self, session_id: str = "default") -> SessionMemory:
-        """Get or create a session memory."""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = SessionMemory(session_id)
-        return self.sessions[session_id]
+        """Get or create a session memory, marking it as most recently used."""
+        with self._lock:
+            self._expire()
+            session = self.sessions.get(session_id)
+            if session is None:
+                backend = None if session_id in self._ephemeral else self.backend
+                session = SessionMemory(
+                    session_id, self.max_messages, manager=self, backend=backend, window_tokens=self.window_tokens
+                )
+                self.sessions[session_id] = session
+                self._stats["created"] += 1
+                if backend:
+                    self._load(session)
+                while self.max_sessions and len(self.sessions) > self.max_sessions:
+                    self._evict_oldest("evicted")
+            else:
+                self.sessions.move_to_end(session_id)
+                if session._backend:
+                    if self.backend.version(session_id) == session.version:
+                        self._stats["cache_hits"] += 1
+                    else:
+                        self._load(session)
+                        self._stats["cache_reloads"] += 1
+            session.last_used = time.monotonic()
+            return session
+    
+    def _load(self, session: SessionMemory) -> None:
+        stored = self.backend.load(session.session_id, self.max_messages or None)
+        self.total_bytes += session.replace(stored)
     
     def clear_session(self, session_id: str) -> None:
-        """Clear a specific session."""
-        if session_id in self.sessions:
-            self.sessions[session_id].clear()
+        """Clear a specific session, removing it from the store."""
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            if session:
+                self._release(session)
+            if session_id in self._ephemeral:
+                self._ephemeral.discard(session_id)
+            elif self.backend:
+                self.backend.delete(session_id)
     
     def clear_all_sessions(self) -> None:
         """Clear all sessions."""
-        for session in self.sessions.values():
-            session.clear()
+        with self._lock:
+            for session in self.sessions.values():
+                session._manager = None
+            self.sessions.clear()
+            self.total_bytes = 0
+            if self.backend:
+                self.backend.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self.sessions),
+                "messages": sum(len(session.messages) for session in self.sessions.values()),
+                "tokens": sum(
+                    sum(record.tokens for record in session.messages) + session.summary_tokens
+                    for session in self.sessions.values()
+                ),
+                "bytes": self.total_bytes,
+                "memory_mode": "summary" if self.window_tokens else "buffer",
+                "window_tokens": self.window_tokens,
+                "max_sessions": self.max_sessions,
+                "max_messages": self.max_messages,
+                "max_bytes": self.max_bytes,
+                "session_ttl": self.session_ttl,
+                **self._stats,
+                "backend": self.backend.get_stats() if self.backend else {"backend": "memory"}
+            }
+    
+    def _account(self, session: SessionMemory, delta: int, trimmed: int = 0) -> None:
+        """Track a session's size change and enforce the total-bytes cap."""
+        with self._lock:
+            if self.sessions.get(session.session_id) is not session:
+                # Evicted while a request was still writing to it
+                session._manager = None
+                return
+            self.sessions.move_to_end(session.session_id)
+            self.total_bytes += delta
+            self._stats["messages_trimmed"] += trimmed
+            if not self.max_bytes:
+                return
+            
+            # Evict other sessions first, then trim the active one's oldest messages
+            while self.total_bytes > self.max_bytes and len(self.sessions) > 1:
+                self._evict_oldest("evicted_for_bytes")
+            while self.total_bytes > self.max_bytes and len(session.messages) > 1:
+                self.total_bytes -= session.trim_oldest()
+                self._stats["messages_trimmed"] += 1
+    
+    def _expire(self) -> None:
+        """Drop sessions idle for longer than the TTL; the least recently used come first."""
+        if not self.session_ttl:
+            return
+        cutoff = time.monotonic() - self.session_ttl
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._evict_oldest("expired")
+    
+    def _evict_oldest(self, reason: str) -> None:
+        _, session = self.sessions.popitem(last=False)
+        self._release(session)
+        self._stats[reason] += 1
+    
+    def _release(self, session: SessionMemory) -> None:
+        self.total_bytes -= session.size
+        session._manager = None
 
 # Global memory manager
-memory_manager = MemoryManager() 
\ No newline at end of file
+memory_manager = registry.register("memory_manager", lambda: MemoryManager(
+    max_sessions=settings.SESSION_MAX_SESSIONS,
+    session_ttl=settings.SESSION_TTL,
+    max_messages=settings.SESSION_MAX_MESSAGES,
+    max_bytes=int(settings.SESSION_MAX_MB * 1024 * 1024),
+    backend=create_session_backend(settings.SESSION_BACKEND),
+    window_tokens=settings.SESSION_WINDOW_TOKENS if settings.SESSION_MEMORY_MODE == "summary" else 0
+))
+
+metrics.export_stats(
+    "contextagent_sessions",
+    lambda: memory_manager.get_stats() if registry.peek("memory_manager") else None,
+    counters={
+        "created": "Sessions created in this process's session cache",
+        "evicted": "Sessions evicted to stay within SESSION_MAX_SESSIONS",
+        "evicted_for_bytes": "Sessions evicted to stay within SESSION_MAX_MB",
+        "expired": "Sessions dropped after SESSION_TTL idle seconds",
+        "messages_trimmed": "Messages trimmed from sessions beyond SESSION_MAX_MESSAGES or SESSION_MAX_MB",
+        "cache_hits": "Session reads served from this process's session cache",
+        "cache_reloads": "Session reads reloaded from the session backend after another process wrote"
+    },
+    gauges={
+        "sessions": "Sessions held in memory",
+        "messages": "Messages held in memory",
+        "tokens": "Tokens of the messages and summaries held in memory",
+        "bytes": "Approximate memory used by the sessions held"
+    }
+)
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+from typing import Dict, Any, Set
+from langchain_openai import ChatOpenAI
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+from langchain.memory.prompt import SUMMARY_PROMPT
+from app.chains.llm_metrics import llm_metrics
+from app.memory.session_memory import SessionMemory
+from app.utils.async_utils import run_sync
+from app.utils.config import settings
+from app.utils.metrics import metrics
+from app.utils.registry import registry
+
+class ConversationSummarizer:
+    """Folds messages that leave a session's token window into its rolling summary.
+    
+    Summaries are written by background tasks scheduled after a turn is stored, so the
+    extra LLM call never delays a response. At most one task runs per session; it keeps
+    going until nothing is left outside the window.
+    """
+    
+    def __init__(self):
+        self.llm = ChatOpenAI(
+            openai_api_key=settings.OPENAI_API_KEY,
+            model_name=settings.OPENAI_MODEL,
+            temperature=0,
+            callbacks=[llm_metrics]
+        )
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"summaries": 0, "messages_summarized": 0, "failures": 0}
+    
+    def schedule(self, session: SessionMemory) -> None:
+        """Start summarizing a session in the background if it has messages outside its window."""
+        if not session.window_tokens or session.session_id in self._running or not session.pending_summary():
+            return
+        self._running.add(session.session_id)
+        task = asyncio.get_running_loop().create_task(self._summarize(session))
+        # Keep a reference so the task is not garbage collected while it runs
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _summarize(self, session: SessionMemory) -> None:
+        try:
+            while True:
+                records = session.pending_summary()
+                # A removed session, e.g. a batch item's, needs no summary; an evicted one is reloaded later
+                if not records or session.detached:
+                    return
+                epoch = session.epoch
+                response = await self.llm.ainvoke(SUMMARY_PROMPT.format(
+                    summary=session.summary,
+                    new_lines=_get_chat_history([record.to_message() for record in records]).strip()
+                ))
+                await run_sync(session.apply_summary, response.content.strip(), records, epoch)
+                self._stats["summaries"] += 1
+                self._stats["messages_summarized"] += len(records)
+        except Exception as e:
+            # The messages stay verbatim in the history and are retried after the next turn
+            self._stats["failures"] += 1
+            print(f"⚠️  Summary update failed for session {session.session_id}: {e}")
+        finally:
+            self._running.discard(session.session_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"running": len(self._running), **self._stats}
+
+# Global conversation summarizer instance
+conversation_summarizer = registry.register("conversation_summarizer", ConversationSummarizer)
+
+metrics.export_stats(
+    "contextagent_summarizer",
+    lambda: conversation_summarizer.get_stats() if registry.peek("conversation_summarizer") else None,
+    counters={
+        "summaries": "Rolling summary updates written",
+        "messages_summarized": "Messages folded into rolling summaries",
+        "failures": "Failed rolling summary updates"
+    },
+    gauges={"running": "Sessions being summarized"}
+) 
\ No newline at end of file
@@ -1,12 +1,40 @@
+import asyncio
+import json
+import time
+import uuid
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional
-from app.schemas.request_model import ChatRequest, ChatResponse
+from fastapi.responses import StreamingResponse
+from typing import Optional, Dict, Any, AsyncIterator, List
+from app.schemas.request_model import ChatBatchRequest, ChatRequest, ChatResponse
+from app.routes.dependencies import require_components
+from app.ingest.filters import build_where
 from app.chains.qa_chain import qa_chain
+from app.chains.answer_cache import answer_cache
 from app.chains.agent_chain import agent_chain
 from app.memory.session_memory import memory_manager
-from app.ingest.vector_store import vector_store
+from app.memory.summary import conversation_summarizer
+from app.ingest.vector_store import SharedRetriever, vector_store
+from app.utils.async_utils import run_sync
+from app.utils.config import settings
+from app.utils.metrics import metrics
+from app.utils.single_flight import SingleFlight
+from app.utils.tracing import span, trace, trace_buffer
 
-router = APIRouter(prefix="/chat", tags=["chat"])
+router = APIRouter(prefix="/chat", tags=["chat"], dependencies=[Depends(require_components)])
+
+# Identical chat requests in flight at the same time share one answer
+chat_flights = SingleFlight()
+metrics.export_stats(
+    "contextagent_chat_coalescing",
+    chat_flights.get_stats,
+    counters={
+        "calls": "Chat answers computed",
+        "coalesced": "Chat requests answered by joining an identical request in flight",
+        "streams": "Chat streams started",
+        "streams_coalesced": "Chat streams that joined an identical stream in flight"
+    },
+    gauges={"in_flight": "Distinct chat answers and streams in flight"}
+)
 
 @router.post("/", response_model=ChatResponse)
 async def chat(request: ChatRequest):
@@ -15,55 +43,343 @@ async def chat(request: ChatRequest):
     
     - **use_rag**: Use RAG pipeline for document-based answers
     - **use_agent**: Use LangChain agent with tools for complex reasoning
+    - **retrieval_mode**: `vector`, `hybrid` or `lexical` document retrieval
+    - **filters**: Restrict retrieval by source, file type, upload tags or ingestion date
+    - **trace**: Return the span tree and timings of this request in `metadata.trace`
+    
+    Concurrent requests asking the same question the same way share one answer.
     """
     try:
         question = request.question.strip()
         if not question:
             raise HTTPException(status_code=400, detail="Question cannot be empty")
         
-        # Update session memory with provided history
-        session_memory = memory_manager.get_session("default")
-        for message in request.history:
-            session_memory.add_message(message.role, message.content)
-        
-        # Choose chain based on request
-        if request.use_agent:
-            # Use agent with tools
-            result = agent_chain.get_answer(question)
-            return ChatResponse(
-                answer=result["answer"],
-                reasoning=result.get("reasoning"),
-                metadata=result.get("metadata", {})
-            )
-        elif request.use_rag:
-            # Use RAG pipeline
-            result = qa_chain.get_answer(question)
-            return ChatResponse(
-                answer=result["answer"],
-                sources=result.get("sources", []),
-                metadata=result.get("metadata", {})
-            )
-        else:
-            # Simple LLM response without RAG
-            result = qa_chain.get_simple_answer(question)
-            return ChatResponse(
-                answer=result,
-                metadata={"model": "simple_llm"}
-            )
+        # A traced request is being debugged, so it always does its own work
+        if not settings.CHAT_COALESCING or request.trace:
+            return await _answer(request, question)
+        response, shared = await chat_flights.do(_flight_key(request, question), lambda: _answer(request, question))
+        if shared:
+            response = response.copy(update={"metadata": {**(response.metadata or {}), "coalesced": True}})
+        return response
             
+    except HTTPException:
+        # Client errors keep their status, including for requests sharing a coalesced answer
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+async def _answer(
+    request: ChatRequest,
+    question: str,
+    session_id: str = "default",
+    retriever: Optional[SharedRetriever] = None
+) -> ChatResponse:
+    """Answer a chat request with the chain it asks for, tracing it if asked to."""
+    if not request.trace:
+        return await _run_chain(request, question, session_id, retriever)
+    
+    with trace("chat", chain=_chain_name(request), session_id=session_id) as root:
+        response = await _run_chain(request, question, session_id, retriever)
+    return response.copy(update={"metadata": {**(response.metadata or {}), "trace": trace_buffer.record(root)}})
+
+async def _run_chain(
+    request: ChatRequest,
+    question: str,
+    session_id: str,
+    retriever: Optional[SharedRetriever]
+) -> ChatResponse:
+    await _apply_history(request, session_id)
+    
+    # Choose chain based on request
+    if request.use_agent:
+        # Use agent with tools
+        result = await agent_chain.aget_answer(question)
+        return ChatResponse(
+            answer=result["answer"],
+            reasoning=result.get("reasoning"),
+            metadata=result.get("metadata", {})
+        )
+    elif request.use_rag:
+        # Use RAG pipeline
+        result = await qa_chain.aget_answer(
+            question,
+            session_id,
+            retrieval_mode=request.retrieval_mode,
+            filter=_request_filter(request),
+            retriever=retriever
+        )
+        return ChatResponse(
+            answer=result["answer"],
+            sources=result.get("sources", []),
+            cached=result.get("cached", False),
+            metadata=result.get("metadata", {})
+        )
+    else:
+        # Simple LLM response without RAG
+        result = await qa_chain.aget_simple_result(
+            question, request.retrieval_mode, _request_filter(request), retriever=retriever
+        )
+        return ChatResponse(
+            answer=result["answer"],
+            metadata=result["metadata"]
+        )
+
+@router.post("/batch")
+async def chat_batch(batch: ChatBatchRequest):
+    """
+    Answer many chat requests in one call, streamed back as NDJSON.
+    
+    Requests are answered concurrently, at most `concurrency` at a time, each in its
+    own throwaway session seeded with its `history`. Question embeddings are computed
+    in one embedding call per EMBEDDING_BATCH_SIZE requests, and requests with the
+    same retrieval query, mode and filters share one retrieval. One JSON line is sent
+    per request as soon as it finishes, with its `index` in the batch and `queued_ms`
+    and `elapsed_ms` in its metadata.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if len(batch.requests) > settings.CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: at most {settings.CHAT_BATCH_MAX_ITEMS} requests"
+        )
+    
+    return StreamingResponse(_batch_stream(batch), media_type="application/x-ndjson")
+
+async def _batch_stream(batch: ChatBatchRequest) -> AsyncIterator[str]:
+    """Run a batch and yield one NDJSON line per request, in completion order."""
+    concurrency = min(batch.concurrency or settings.CHAT_BATCH_CONCURRENCY, settings.CHAT_BATCH_CONCURRENCY)
+    window = settings.EMBEDDING_BATCH_SIZE
+    batch_id = uuid.uuid4().hex[:12]
+    started = time.perf_counter()
+    results: asyncio.Queue = asyncio.Queue()
+    workers = asyncio.Semaphore(concurrency)
+    # Keeps embedding at most two windows ahead of answering, so the prepared
+    # embeddings are still in the query embedding cache when they are needed
+    ahead = asyncio.Semaphore(2 * window)
+    retrievers: Dict[str, SharedRetriever] = {}
+    tasks: List[asyncio.Task] = []
+    
+    async def run(index: int, request: ChatRequest) -> None:
+        try:
+            async with workers:
+                line = await _batch_item(index, request, batch_id, started, retrievers)
+        finally:
+            ahead.release()
+        await results.put(line)
+    
+    async def produce() -> None:
+        for offset in range(0, len(batch.requests), window):
+            items = list(enumerate(batch.requests[offset:offset + window], start=offset))
+            for _ in items:
+                await ahead.acquire()
+            await _prepare_embeddings([request for _, request in items])
+            tasks.extend(asyncio.create_task(run(index, request)) for index, request in items)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        for _ in batch.requests:
+            yield json.dumps(await results.get()) + "\n"
+    finally:
+        # The client may disconnect before the batch is done
+        for task in [producer, *tasks]:
+            task.cancel()
+
+async def _prepare_embeddings(requests: List[ChatRequest]) -> None:
+    """Embed the questions of a window of requests with one embedding call.
+    
+    Only questions that are embedded as they are asked are included: requests with
+    history are condensed into a different question first, agent requests do not
+    retrieve, and lexical retrieval needs no embedding.
+    """
+    questions = [
+        request.question.strip() for request in requests
+        if request.question.strip()
+        and not request.use_agent
+        and not request.history
+        and (request.retrieval_mode or settings.RETRIEVAL_MODE) != "lexical"
+    ]
+    if not questions:
+        return
+    try:
+        await vector_store.aembed_queries(questions)
+    except Exception:
+        # Each request falls back to embedding its own question
+        pass
+
+async def _batch_item(
+    index: int,
+    request: ChatRequest,
+    batch_id: str,
+    started: float,
+    retrievers: Dict[str, SharedRetriever]
+) -> Dict[str, Any]:
+    """Answer one batch request and build its NDJSON line."""
+    item_started = time.perf_counter()
+    session_id = f"batch-{batch_id}-{index}"
+    memory_manager.mark_ephemeral(session_id)
+    try:
+        question = request.question.strip()
+        if not question:
+            raise HTTPException(status_code=400, detail="Question cannot be empty")
+        
+        where = _request_filter(request)
+        key = json.dumps([request.retrieval_mode or settings.RETRIEVAL_MODE, where], sort_keys=True, default=str)
+        if key not in retrievers:
+            retrievers[key] = SharedRetriever(
+                store=vector_store,
+                k=qa_chain.chain.retriever.k,
+                mode=request.retrieval_mode,
+                filter=where,
+                results={}
+            )
+        
+        response = await _answer(request, question, session_id, retrievers[key])
+        line = {"index": index, "status": "error" if (response.metadata or {}).get("error") else "ok", **response.dict()}
+    except HTTPException as e:
+        line = {"index": index, "status": "error", "status_code": e.status_code, "detail": e.detail, "metadata": {}}
+    except Exception as e:
+        line = {"index": index, "status": "error", "detail": str(e), "metadata": {}}
+    finally:
+        await run_sync(memory_manager.clear_session, session_id)
+    
+    line["metadata"] = {
+        **(line["metadata"] or {}),
+        "queued_ms": round((item_started - started) * 1000, 1),
+        "elapsed_ms": round((time.perf_counter() - item_started) * 1000, 1)
+    }
+    return line
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint using Server-Sent Events.
+    
+    Sends a `token` event for each piece of the answer as it is generated, then a
+    final `end` event carrying `sources`, `reasoning` and `metadata`. Failures are
+    reported as an `error` event. Concurrent requests asking the same question the
+    same way share one token stream; traced requests, whose `end` event carries the
+    trace, never do.
+    """
+    question = request.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    if settings.CHAT_COALESCING and not request.trace:
+        events, shared = chat_flights.stream(_flight_key(request, question), lambda: _stream_events(request, question))
+        if shared:
+            events = _mark_coalesced(events)
+    else:
+        events = _stream_events(request, question)
+    
+    return StreamingResponse(
+        _sse_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _apply_history(request: ChatRequest, session_id: str = "default") -> None:
+    """Update session memory with the history provided in the request.
+    
+    Runs in the thread pool, since a persistent session backend reads and writes SQLite.
+    """
+    if not request.history:
+        return
+    with span("memory_save", session_id=session_id, messages=len(request.history)):
+        session_memory = await run_sync(memory_manager.get_session, session_id)
+        await run_sync(session_memory.add_messages, [(message.role, message.content) for message in request.history])
+
+def _request_filter(request: ChatRequest) -> Optional[Dict[str, Any]]:
+    """Translate the request's retrieval filters into a vector store `where` filter."""
+    if not request.filters:
+        return None
+    return build_where(
+        sources=request.filters.sources,
+        file_types=request.filters.file_types,
+        tags=request.filters.tags,
+        ingested_after=request.filters.ingested_after,
+        ingested_before=request.filters.ingested_before
+    )
+
+async def _stream_events(request: ChatRequest, question: str) -> AsyncIterator[Dict[str, Any]]:
+    """Answer a chat request with the chain it asks for, as a stream of events, traced if asked to."""
+    if not request.trace:
+        async for event in _chain_events(request, question):
+            yield event
+        return
+    
+    # The end event is held back until the trace is complete
+    end = None
+    with trace("chat_stream", chain=_chain_name(request)) as root:
+        async for event in _chain_events(request, question):
+            if event.get("event") == "end":
+                end = event
+            else:
+                yield event
+    if end is not None:
+        yield {**end, "metadata": {**(end.get("metadata") or {}), "trace": trace_buffer.record(root)}}
+
+async def _chain_events(request: ChatRequest, question: str) -> AsyncIterator[Dict[str, Any]]:
+    await _apply_history(request)
+    
+    if request.use_agent:
+        events = agent_chain.astream_answer(question)
+    elif request.use_rag:
+        events = qa_chain.astream_answer(
+            question, retrieval_mode=request.retrieval_mode, filter=_request_filter(request)
+        )
+    else:
+        events = qa_chain.astream_simple_answer(question, request.retrieval_mode, _request_filter(request))
+    
+    async for event in events:
+        yield event
+
+def _chain_name(request: ChatRequest) -> str:
+    return "agent" if request.use_agent else "rag" if request.use_rag else "simple"
+
+def _flight_key(request: ChatRequest, question: str) -> str:
+    """Key under which identical chat requests are coalesced.
+    
+    Covers everything the answer depends on: the whitespace-normalized question, how
+    it is answered, the supplied history and the collection version, so a request
+    never shares an answer computed against different documents.
+    """
+    return json.dumps([
+        " ".join(question.split()),
+        request.use_rag,
+        request.use_agent,
+        request.retrieval_mode or settings.RETRIEVAL_MODE,
+        _request_filter(request),
+        [(message.role, message.content) for message in request.history or []],
+        vector_store.collection_version
+    ], sort_keys=True, default=str)
+
+async def _mark_coalesced(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Flag the end event of a shared stream as coalesced."""
+    async for event in events:
+        if event.get("event") == "end":
+            event = {**event, "metadata": {**(event.get("metadata") or {}), "coalesced": True}}
+        yield event
+
+async def _sse_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Format chain events as Server-Sent Events."""
+    async for event in events:
+        # Events may be shared by coalesced streams, so they are not modified
+        data = {key: value for key, value in event.items() if key != "event"}
+        yield f"event: {event['event']}\ndata: {json.dumps(data)}\n\n"
+
 @router.get("/memory/{session_id}")
 async def get_memory(session_id: str = "default"):
     """Get conversation memory for a session."""
     try:
-        session_memory = memory_manager.get_session(session_id)
+        session_memory = await run_sync(memory_manager.get_session, session_id)
         messages = session_memory.get_messages_as_dict()
         return {
             "session_id": session_id,
             "messages": messages,
-            "message_count": len(messages)
+            "message_count": len(messages),
+            "summary": session_memory.summary,
+            "tokens": session_memory.get_token_counts()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving memory: {str(e)}")
@@ -72,7 +388,7 @@ async def get_memory(session_id: str = "default"):
 async def clear_memory(session_id: str = "default"):
     """Clear conversation memory for a session."""
     try:
-        memory_manager.clear_session(session_id)
+        await run_sync(memory_manager.clear_session, session_id)
         return {"message": f"Memory cleared for session: {session_id}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing memory: {str(e)}")
@@ -96,7 +412,11 @@ async def get_chat_stats():
         vector_stats = vector_store.get_collection_stats()
         return {
             "vector_store": vector_stats,
+            "answer_cache": answer_cache.get_stats(),
             "memory_sessions": len(memory_manager.sessions),
+            "memory": await run_sync(memory_manager.get_stats),
+            "summarizer": conversation_summarizer.get_stats(),
+            "coalescing": chat_flights.get_stats(),
             "available_tools": len(agent_chain.tools)
         }
     except Exception as e:
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.utils.tracing import trace_buffer
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+@router.get("/traces")
+async def list_traces(limit: int = Query(default=50, ge=1, le=1000)):
+    """
+    List the most recent traced chat requests of this worker process, newest first.
+    
+    Requests are traced when they set `trace: true`; keep up to TRACE_BUFFER_SIZE of them.
+    """
+    return {"traces": trace_buffer.recent(limit)}
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Get the full span tree and timings of a traced chat request."""
+    entry = trace_buffer.get(trace_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=f"Trace not found: {trace_id}")
+    return entry 
\ No newline at end of file
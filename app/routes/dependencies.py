@@ -0,0 +1,19 @@
+from fastapi import HTTPException
+from app.utils.async_utils import run_sync
+from app.utils.registry import registry
+
+async def require_components() -> None:
+    """Make sure the components a route uses are built, without building them on the event loop.
+    
+    While the startup thread is still building them, answer 503 like `/ready` instead of
+    blocking every request (`/health` and `/ready` included) behind the build. After a
+    startup that failed to build some, retry those in the thread pool.
+    """
+    if registry.built:
+        return
+    if registry.starting:
+        raise HTTPException(status_code=503, detail="Starting up, retry shortly", headers={"Retry-After": "1"})
+    try:
+        await run_sync(registry.build_missing)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Components unavailable: {str(e)}") 
\ No newline at end of file
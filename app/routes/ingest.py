@@ -1,59 +1,49 @@
+import hashlib
 import os
-import tempfile
-from fastapi import APIRouter, HTTPException, UploadFile, File
+import shutil
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from fastapi.responses import JSONResponse
-from typing import List
-from app.schemas.request_model import DocumentUploadResponse
-from app.utils.document_loader import document_loader
+from typing import Any, Callable, Dict, List, Optional
+from app.schemas.request_model import DocumentUploadResponse, IngestJobResponse
+from app.routes.dependencies import require_components
 from app.ingest.vector_store import vector_store
+from app.ingest.embedder import embedder
+from app.ingest.filters import normalize_tags
+from app.ingest.jobs import JobQueueFullError, job_manager, upload_manifest_path
+from app.ingest.manifest import ingest_manifest
+from app.utils.document_loader import document_loader
+from app.utils.async_utils import run_sync
 from app.utils.config import settings
 
-router = APIRouter(prefix="/ingest", tags=["ingest"])
+router = APIRouter(prefix="/ingest", tags=["ingest"], dependencies=[Depends(require_components)])
 
-@router.post("/upload", response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile = File(...)):
+@router.post("/upload", response_model=DocumentUploadResponse, status_code=202)
+async def upload_document(
+    file: UploadFile = File(...),
+    tags: Optional[List[str]] = Query(default=None),
+    document_id: Optional[str] = Query(default=None),
+    replace: bool = False
+):
     """
-    Upload and process a document for the RAG system.
+    Upload a document for the RAG system.
+    
+    The file is streamed to disk and queued as a background ingestion job; poll
+    `GET /ingest/jobs/{job_id}` for progress. Content that was already ingested is
+    reported as a duplicate instead of being embedded again. `tags` are attached to
+    every chunk of the document, for use in chat retrieval filters.
+    
+    Uploads are told apart by content, so files that only share a name never replace
+    each other. To update a document, upload it under a `document_id`; uploading again
+    under that ID with `replace=true` replaces its chunks (409 without it).
     
     Supported formats: PDF, TXT, MD, DOCX
     """
     try:
-        # Validate file
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No filename provided")
-        
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        if file_extension not in {".pdf", ".txt", ".md", ".docx"}:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {file_extension}. Supported: PDF, TXT, MD, DOCX"
-            )
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Load document
-            documents = document_loader.load_document(temp_file_path)
-            
-            # Add to vector store
-            vector_store.add_documents(documents)
-            
-            return DocumentUploadResponse(
-                filename=file.filename,
-                status="success",
-                message=f"Successfully processed {len(documents)} document chunks",
-                document_count=len(documents)
-            )
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-                
+        return await _ingest_upload(file, tags, document_id, replace)
+    except HTTPException:
+        raise
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         return DocumentUploadResponse(
             filename=file.filename if file.filename else "unknown",
@@ -62,43 +52,223 @@ async def upload_document(file: UploadFile = File(...)):
             document_count=0
         )
 
-@router.post("/directory")
-async def ingest_directory(directory_path: str):
+@router.post("/upload/batch", response_model=List[DocumentUploadResponse], status_code=202)
+async def upload_documents(files: List[UploadFile] = File(...), tags: Optional[List[str]] = Query(default=None)):
     """
-    Ingest all supported documents from a directory.
+    Upload several documents in one request.
+    
+    Each file is validated, deduplicated and queued on its own; a rejected file does
+    not affect the others. A file that finds the job queue full is reported with
+    status `queue_full`, so the client knows to retry it later. `tags` apply to every file.
     """
+    responses = []
+    for file in files:
+        try:
+            responses.append(await _ingest_upload(file, tags))
+        except JobQueueFullError as e:
+            responses.append(DocumentUploadResponse(
+                filename=file.filename,
+                status="queue_full",
+                message=str(e),
+                document_count=0
+            ))
+        except Exception as e:
+            responses.append(DocumentUploadResponse(
+                filename=file.filename if file.filename else "unknown",
+                status="error",
+                message=e.detail if isinstance(e, HTTPException) else f"Error processing document: {str(e)}",
+                document_count=0
+            ))
+    return responses
+
+async def _ingest_upload(
+    file: UploadFile,
+    tags: Optional[List[str]] = None,
+    document_id: Optional[str] = None,
+    replace: bool = False
+) -> DocumentUploadResponse:
+    """Validate, spool and queue a single uploaded file."""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+    if document_id and not replace and ingest_manifest.get(upload_manifest_path("", document_id)):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Document already exists: {document_id}. Pass replace=true to replace it"
+        )
+    
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in settings.SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported file type: {file_extension}. Supported: PDF, TXT, MD, DOCX"
+        )
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise _file_too_large(file.filename)
+    
+    # Keep the upload on disk until its job finishes, so it can be resumed after a restart
+    job_id = job_manager.new_job_id()
+    spool_path = job_manager.spool_path(job_id, file.filename)
     try:
-        if not os.path.exists(directory_path):
-            raise HTTPException(status_code=404, detail=f"Directory not found: {directory_path}")
-        
-        # Load documents from directory
-        documents = document_loader.load_documents_from_directory(directory_path)
+        content_hash = await _spool_upload(file, spool_path)
+        if not document_loader.validate_file(spool_path):
+            raise HTTPException(status_code=400, detail=f"Invalid file: {file.filename}")
         
-        if not documents:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "message": "No supported documents found in directory",
-                    "directory": directory_path,
-                    "document_count": 0
-                }
+        duplicate = ingest_manifest.find_by_hash(content_hash)
+        duplicate_job = job_manager.find_active_upload(content_hash)
+        if duplicate or duplicate_job:
+            shutil.rmtree(os.path.dirname(spool_path), ignore_errors=True)
+            return DocumentUploadResponse(
+                filename=file.filename,
+                status="duplicate",
+                message="Identical content was already ingested" if duplicate else "Identical content is already queued",
+                document_count=0,
+                job_id=duplicate_job.id if duplicate_job else None
             )
         
-        # Add to vector store
-        vector_store.add_documents(documents)
+        job = job_manager.submit_upload(job_id, spool_path, file.filename, content_hash, normalize_tags(tags), document_id)
+    except Exception:
+        shutil.rmtree(os.path.dirname(spool_path), ignore_errors=True)
+        raise
+    
+    return DocumentUploadResponse(
+        filename=file.filename,
+        status=job.status,
+        message="Document queued for ingestion",
+        job_id=job.id
+    )
+
+async def _spool_upload(file: UploadFile, path: str) -> str:
+    """Copy an upload to the spool in fixed-size chunks, returning its SHA-256.
+    
+    UploadSizeLimitMiddleware has already cut off request bodies over their limit. A batch
+    may still carry one file over MAX_FILE_SIZE within MAX_BATCH_UPLOAD_SIZE, which is
+    caught here.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > settings.MAX_FILE_SIZE:
+                raise _file_too_large(file.filename)
+            digest.update(chunk)
+            await run_sync(f.write, chunk)
+    return digest.hexdigest()
+
+def _file_too_large(filename: str) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large: {filename}. Maximum size is {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"
+    )
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware rejecting upload requests with 413 once their body exceeds its limit.
+    
+    `POST /ingest/upload` is limited to MAX_FILE_SIZE and `POST /ingest/upload/batch` to
+    MAX_BATCH_UPLOAD_SIZE. Starlette receives and spools the whole multipart body before
+    the route runs, so the limit is enforced here: from Content-Length before any of the
+    body is read, and while it streams in for requests without one.
+    """
+    
+    # Multipart boundaries, part headers and the form fields around the files
+    OVERHEAD = 64 * 1024
+    
+    def __init__(self, app: Callable, prefix: str = "/ingest"):
+        self.app = app
+        self.prefix = prefix
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        max_size = self._max_size(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if max_size is None:
+            await self.app(scope, receive, send)
+            return
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": f"Successfully processed {len(documents)} documents",
-                "directory": directory_path,
-                "document_count": len(documents)
-            }
-        )
+        limit = max_size + self.OVERHEAD
+        detail = f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            await response(scope, receive, send)
+            return
         
+        received = 0
+        
+        async def limited_receive() -> Dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the body parser, which passes HTTPExceptions on to the handlers
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+    
+    def _max_size(self, path: str) -> Optional[int]:
+        """Body size limit for `path`, or None if it is not an upload route."""
+        if path == f"{self.prefix}/upload":
+            return settings.MAX_FILE_SIZE
+        if path == f"{self.prefix}/upload/batch":
+            return settings.MAX_BATCH_UPLOAD_SIZE
+        return None
+
+@router.post("/directory", status_code=202)
+async def ingest_directory(
+    directory_path: str,
+    recursive: bool = False,
+    include: Optional[List[str]] = Query(default=None),
+    exclude: Optional[List[str]] = Query(default=None)
+):
+    """
+    Ingest all supported documents from a directory.
+    
+    Runs as a background job. Ingestion is incremental: unchanged files are skipped,
+    changed files are re-indexed in place and chunks of deleted files are removed.
+    Set `recursive` to include subdirectories; `include`/`exclude` take glob patterns
+    (repeatable) matched against paths relative to the directory.
+    """
+    if not os.path.isdir(directory_path):
+        raise HTTPException(status_code=404, detail=f"Directory not found: {directory_path}")
+    
+    try:
+        job = job_manager.submit_directory(directory_path, recursive, include, exclude)
+        return {
+            "message": "Directory queued for ingestion",
+            "directory": directory_path,
+            "recursive": recursive,
+            "job_id": job.id,
+            "status": job.status
+        }
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error ingesting directory: {str(e)}")
 
+@router.get("/jobs", response_model=List[IngestJobResponse])
+async def list_ingest_jobs(limit: int = 50):
+    """List the most recent ingestion jobs."""
+    return [job.to_dict() for job in job_manager.list_jobs(limit)]
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(job_id: str):
+    """Get the stage, progress, throughput and errors of an ingestion job."""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestJobResponse)
+async def cancel_ingest_job(job_id: str):
+    """Cancel a queued or running ingestion job. Chunks already stored are kept."""
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
 @router.get("/stats")
 async def get_ingestion_stats():
     """Get statistics about ingested documents."""
@@ -106,6 +276,9 @@ async def get_ingestion_stats():
         vector_stats = vector_store.get_collection_stats()
         return {
             "vector_store": vector_stats,
+            "embedding_cache": embedder.get_cache_stats(),
+            "manifest": ingest_manifest.get_stats(),
+            "jobs": job_manager.get_stats(),
             "supported_formats": list({".pdf", ".txt", ".md", ".docx"}),
             "max_file_size_mb": settings.MAX_FILE_SIZE // (1024 * 1024)
         }
@@ -116,7 +289,14 @@ async def get_ingestion_stats():
 async def clear_documents():
     """Clear all ingested documents from the vector store."""
     try:
+        if job_manager.role == "submit":
+            # Only the ingest process writes; the clear runs there as a job
+            job = job_manager.submit_clear()
+            return {"message": "Clearing all documents from vector store", "job_id": job.id, "status": job.status}
         vector_store.delete_collection()
+        ingest_manifest.clear()
         return {"message": "All documents cleared from vector store"}
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing documents: {str(e)}") 
\ No newline at end of file
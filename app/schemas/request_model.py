@@ -1,4 +1,5 @@
-from typing import List, Optional, Dict, Any
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
 
 class Message(BaseModel):
@@ -6,18 +7,45 @@ class Message(BaseModel):
     role: str = Field(..., description="Role of the message sender (user/agent)")
     content: str = Field(..., description="Content of the message")
 
+class RetrievalFilters(BaseModel):
+    """Scopes restricting which chunks retrieval searches; unset fields match everything."""
+    sources: Optional[List[str]] = Field(default=None, description="Source file names to search")
+    file_types: Optional[List[str]] = Field(default=None, description="File extensions to search, e.g. .pdf")
+    tags: Optional[List[str]] = Field(default=None, description="Search chunks carrying any of these upload tags")
+    ingested_after: Optional[datetime] = Field(default=None, description="Only chunks ingested at or after this time")
+    ingested_before: Optional[datetime] = Field(default=None, description="Only chunks ingested at or before this time")
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     question: str = Field(..., description="User's question or query")
     history: Optional[List[Message]] = Field(default=[], description="Conversation history")
     use_rag: bool = Field(default=True, description="Whether to use RAG pipeline")
     use_agent: bool = Field(default=False, description="Whether to use LangChain agent")
+    retrieval_mode: Optional[Literal["vector", "hybrid", "lexical"]] = Field(
+        default=None,
+        description="Retrieval strategy for RAG and simple answers; defaults to RETRIEVAL_MODE"
+    )
+    filters: Optional[RetrievalFilters] = Field(default=None, description="Restrict retrieval to matching chunks")
+    trace: bool = Field(
+        default=False,
+        description="Return the timed stages of this request as a span tree in metadata.trace; never coalesced"
+    )
+
+class ChatBatchRequest(BaseModel):
+    """Request model for the batch chat endpoint."""
+    requests: List[ChatRequest] = Field(..., description="Chat requests to answer")
+    concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Requests answered at once; capped by CHAT_BATCH_CONCURRENCY"
+    )
 
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     answer: str = Field(..., description="AI assistant's response")
     sources: Optional[List[str]] = Field(default=[], description="Source documents used")
     reasoning: Optional[str] = Field(default=None, description="Agent's reasoning process")
+    cached: bool = Field(default=False, description="Whether the answer was served from the answer cache")
     metadata: Optional[Dict[str, Any]] = Field(default={}, description="Additional metadata")
 
 class DocumentUploadResponse(BaseModel):
@@ -26,6 +54,25 @@ class DocumentUploadResponse(BaseModel):
     status: str = Field(..., description="Upload status")
     message: str = Field(..., description="Status message")
     document_count: Optional[int] = Field(default=None, description="Number of documents processed")
+    job_id: Optional[str] = Field(default=None, description="ID of the background ingestion job")
+
+class IngestJobResponse(BaseModel):
+    """Status of a background ingestion job."""
+    job_id: str = Field(..., description="Job ID")
+    kind: str = Field(..., description="Job type (upload/directory/clear)")
+    params: Dict[str, Any] = Field(default={}, description="Job input")
+    status: str = Field(..., description="queued, running, completed, failed or cancelled")
+    stage: str = Field(..., description="Current processing stage")
+    chunks_total: int = Field(default=0, description="Chunks to embed, when known")
+    chunks_processed: int = Field(default=0, description="Chunks embedded and stored so far")
+    documents: int = Field(default=0, description="Documents loaded so far")
+    throughput: float = Field(default=0.0, description="Chunks stored per second")
+    errors: List[str] = Field(default=[], description="Errors encountered")
+    result: Dict[str, Any] = Field(default={}, description="Job result summary")
+    attempts: int = Field(default=0, description="Times the job has been started")
+    created_at: float = Field(..., description="Creation time (Unix seconds)")
+    started_at: Optional[float] = Field(default=None, description="Start time of the latest attempt")
+    finished_at: Optional[float] = Field(default=None, description="Completion time")
 
 class HealthResponse(BaseModel):
     """Health check response."""
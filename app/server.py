@@ -0,0 +1,155 @@
+"""
+Production server for ContextAgent.
+
+Serves the API from several worker processes and runs all ingestion in one separate
+process, so the index has a single writer:
+
+    python -m app.server --workers 4
+
+Workers are gunicorn processes running uvicorn event loops. The app is imported once
+in the master and forked (`preload_app`), so the imported code is shared copy-on-write;
+components are built by each worker's lifespan after the fork. Workers open the vector
+index read-only (FAISS or quantized files memory-mapped from the page cache, so adding
+workers does not add copies) and reopen it when the ingest process persists a new
+version. Ingestion requests are queued in the shared jobs database for the ingest
+process to run. Chroma cannot be shared that way, so with it one worker serves the API
+and ingests. Every process writes its metrics to METRICS_DIRECTORY (a temporary
+directory unless set), so `/metrics` on any worker reports all of them; the master
+folds the snapshots of exited workers into one file of totals.
+
+`kill -HUP <master pid>` replaces the workers one by one, letting each finish its
+in-flight requests within SERVER_GRACEFUL_TIMEOUT seconds.
+"""
+
+import argparse
+import os
+import signal
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+
+from app.utils.config import settings
+from app.utils.metrics import metrics
+
+class ProductionServer(BaseApplication):
+    """Gunicorn application serving app.main:app with uvicorn workers."""
+    
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+    
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+    
+    def load(self):
+        from app.main import app
+        return app
+
+def retire_worker_metrics(server, worker) -> None:
+    """Gunicorn `child_exit` hook: fold an exited worker's metrics snapshots into the totals."""
+    metrics.retire(worker.pid)
+
+def run_ingest_worker() -> None:
+    """Run the ingestion jobs queued by the API workers until SIGTERM or SIGINT."""
+    settings.INGEST_ROLE = "worker"
+    settings.validate()
+    from app.ingest.jobs import job_manager
+    from app.ingest.vector_store import vector_store
+    
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    
+    print(f"🛠️  Ingest worker {os.getpid()} writing to the {vector_store.store_type} index")
+    if settings.METRICS_ENABLED:
+        metrics.start()
+    job_manager.start()
+    stop.wait()
+    # Interrupted jobs persist what they stored and are resumed on the next start
+    job_manager.shutdown()
+    metrics.shutdown()
+
+def serve(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    workers: Optional[int] = None,
+    ingest: bool = True
+) -> None:
+    """Run the API workers, plus the ingest process unless `ingest` is False.
+    
+    Chroma keeps a private copy of the index in every process, so a worker would never
+    see documents ingested by another one; with Chroma a single worker serves the API
+    and runs ingestion itself.
+    """
+    workers = workers or settings.SERVER_WORKERS
+    role = "submit"
+    if settings.VECTOR_STORE_TYPE == "chroma":
+        if workers > 1 or ingest:
+            print("⚠️  Chroma cannot share its index between processes: serving from one worker that "
+                  "also runs ingestion; use VECTOR_STORE_TYPE=faiss or quantized for several workers")
+        workers, ingest, role = 1, False, "local"
+    
+    # Every process writes its metrics to a shared directory so any worker can serve all of them
+    metrics_directory = None
+    if settings.METRICS_ENABLED and not settings.METRICS_DIRECTORY:
+        metrics_directory = tempfile.mkdtemp(prefix="contextagent_metrics_")
+        os.environ["METRICS_DIRECTORY"] = settings.METRICS_DIRECTORY = metrics.directory = metrics_directory
+    elif settings.METRICS_ENABLED:
+        os.makedirs(settings.METRICS_DIRECTORY, exist_ok=True)
+        metrics.clear_snapshots()
+    
+    ingest_process = None
+    if ingest:
+        ingest_process = subprocess.Popen(
+            [sys.executable, "-m", "app.server", "--ingest-only"],
+            env={**os.environ, "INGEST_ROLE": "worker"}
+        )
+    
+    # Set before the app is preloaded so every worker inherits it
+    os.environ["INGEST_ROLE"] = settings.INGEST_ROLE = role
+    options = {
+        "bind": f"{host or settings.HOST}:{port or settings.PORT}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        # Spread recycling out so workers do not all restart at once
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS // 10
+    }
+    if settings.METRICS_ENABLED:
+        options["child_exit"] = retire_worker_metrics
+    try:
+        ProductionServer(options).run()
+    finally:
+        if ingest_process:
+            ingest_process.terminate()
+            ingest_process.wait()
+            metrics.retire(ingest_process.pid)
+        if metrics_directory:
+            shutil.rmtree(metrics_directory, ignore_errors=True)
+
+def main():
+    """Parse arguments and start the production server."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=None, help="Bind address (default HOST)")
+    parser.add_argument("--port", type=int, default=None, help="Port (default PORT)")
+    parser.add_argument("--workers", type=int, default=None, help="API worker processes (default SERVER_WORKERS)")
+    parser.add_argument("--no-ingest", action="store_true", help="Do not start the ingest process; it runs elsewhere")
+    parser.add_argument("--ingest-only", action="store_true", help="Run only the ingest process")
+    args = parser.parse_args()
+    
+    if args.ingest_only:
+        run_ingest_worker()
+    else:
+        serve(args.host, args.port, args.workers, ingest=not args.no_ingest)
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file
@@ -39,7 +39,7 @@ class CalculatorTool(BaseTool):
         except Exception as e:
             return f"Error calculating '{expression}': {str(e)}"
     
-    def _arun(self, expression: str) -> str:
+    async def _arun(self, expression: str) -> str:
         """Async version of the calculator tool."""
         return self._run(expression)
 
@@ -2,6 +2,7 @@ from typing import Any, Optional
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from serpapi import GoogleSearch
+from app.utils.async_utils import run_sync
 from app.utils.config import settings
 
 class SearchInput(BaseModel):
@@ -47,9 +48,9 @@ class GoogleSearchTool(BaseTool):
         except Exception as e:
             return f"Error performing search for '{query}': {str(e)}"
     
-    def _arun(self, query: str) -> str:
-        """Async version of the search tool."""
-        return self._run(query)
+    async def _arun(self, query: str) -> str:
+        """Async version of the search tool; SerpAPI is synchronous so it runs in the thread pool."""
+        return await run_sync(self._run, query)
 
 # Global search tool instance (only created if API key is available)
 search_tool = None
@@ -0,0 +1,45 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, TypeVar
+from app.utils.config import settings
+
+T = TypeVar("T")
+
+# Shared pool for work that can only run synchronously (Chroma, SerpAPI, file IO)
+_executor = ThreadPoolExecutor(
+    max_workers=settings.SYNC_WORKER_THREADS,
+    thread_name_prefix="contextagent-sync"
+)
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable in the shared thread pool without blocking the event loop.
+    
+    The callable runs in a copy of the caller's context, so it adds to the caller's trace.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion from synchronous code.
+    
+    Background tasks the coroutine started, such as rolling summary updates, are awaited
+    too, since closing the loop would cancel them. Raises RuntimeError inside a running
+    event loop, which this would block; await the async variant there instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_complete(coro))
+    coro.close()
+    raise RuntimeError("run_async() cannot be called from a running event loop; await the coroutine instead")
+
+async def _complete(coro: Coroutine[Any, Any, T]) -> T:
+    result = await coro
+    while True:
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        if not pending:
+            return result
+        await asyncio.gather(*pending, return_exceptions=True)
\ No newline at end of file
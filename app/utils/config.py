@@ -11,14 +11,90 @@ class Settings:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
     
     # Vector Store Configuration
     VECTOR_STORE_TYPE: str = os.getenv("VECTOR_STORE_TYPE", "chroma")
     CHROMA_PERSIST_DIRECTORY: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+    FAISS_INDEX_DIRECTORY: str = os.getenv("FAISS_INDEX_DIRECTORY", "./faiss_index")
+    FAISS_INDEX_TYPE: str = os.getenv("FAISS_INDEX_TYPE", "flat")
+    FAISS_MMAP: bool = os.getenv("FAISS_MMAP", "true").lower() == "true"
+    FAISS_IVF_NLIST: int = int(os.getenv("FAISS_IVF_NLIST", "1024"))
+    FAISS_IVF_NPROBE: int = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+    FAISS_HNSW_M: int = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_HNSW_EF_SEARCH: int = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+    QUANTIZED_INDEX_DIRECTORY: str = os.getenv("QUANTIZED_INDEX_DIRECTORY", "./quantized_index")
+    QUANTIZED_DTYPE: str = os.getenv("QUANTIZED_DTYPE", "int8")
+    QUANTIZED_RESCORE: bool = os.getenv("QUANTIZED_RESCORE", "true").lower() == "true"
+    QUANTIZED_RESCORE_FACTOR: int = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "4"))
+    QUANTIZED_MMAP: bool = os.getenv("QUANTIZED_MMAP", "true").lower() == "true"
+    
+    # Embedding Cache Configuration
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.db")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+    
+    # Query Cache Configuration
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "1000"))
+    QUERY_EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_MB", "64"))
+    QUERY_EMBEDDING_CACHE_TTL: float = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+    SEARCH_RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_RESULT_CACHE_MAX_ENTRIES", "1000"))
+    SEARCH_RESULT_CACHE_MAX_MB: int = int(os.getenv("SEARCH_RESULT_CACHE_MAX_MB", "64"))
+    SEARCH_RESULT_CACHE_TTL: float = float(os.getenv("SEARCH_RESULT_CACHE_TTL", "300"))
+    
+    # Retrieval Configuration
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "vector")
+    LEXICAL_INDEX_PATH: str = os.getenv("LEXICAL_INDEX_PATH", "./ingest_state/lexical.db")
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+    
+    # Answer Cache Configuration
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    
+    # Embedding Pipeline Configuration
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    EMBEDDING_CONCURRENCY: int = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+    EMBEDDING_REQUESTS_PER_MINUTE: int = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))
+    EMBEDDING_TOKENS_PER_MINUTE: int = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+    EMBEDDING_RETRY_BACKOFF: float = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "1.0"))
     
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "false").lower() == "true"
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+    SERVER_TIMEOUT: int = int(os.getenv("SERVER_TIMEOUT", "120"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "0"))  # 0 = never recycle workers
+    
+    # Concurrency Configuration
+    SYNC_WORKER_THREADS: int = int(os.getenv("SYNC_WORKER_THREADS", "16"))
+    CHAT_BATCH_MAX_ITEMS: int = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "1000"))
+    CHAT_BATCH_CONCURRENCY: int = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+    CHAT_COALESCING: bool = os.getenv("CHAT_COALESCING", "true").lower() == "true"
+    
+    # Session Memory (0 disables a limit)
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    SESSION_TTL: float = float(os.getenv("SESSION_TTL", "86400"))
+    SESSION_MAX_MESSAGES: int = int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+    SESSION_MAX_MB: float = float(os.getenv("SESSION_MAX_MB", "256"))
+    SESSION_MEMORY_MODE: str = os.getenv("SESSION_MEMORY_MODE", "buffer")  # buffer or summary
+    SESSION_WINDOW_TOKENS: int = int(os.getenv("SESSION_WINDOW_TOKENS", "1000"))
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")  # memory or sqlite
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", "./session_state/sessions.db")
+    SESSION_FLUSH_INTERVAL: float = float(os.getenv("SESSION_FLUSH_INTERVAL", "0.05"))
+    SESSION_WRITE_BATCH_SIZE: int = int(os.getenv("SESSION_WRITE_BATCH_SIZE", "64"))
+    
+    # Metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIRECTORY: str = os.getenv("METRICS_DIRECTORY", "")  # shared by processes; the production server sets one
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "5.0"))
+    TRACE_BUFFER_SIZE: int = int(os.getenv("TRACE_BUFFER_SIZE", "100"))  # 0 = traces are only returned
     
     # Optional APIs
     SERP_API_KEY: Optional[str] = os.getenv("SERP_API_KEY")
@@ -27,9 +103,23 @@ class Settings:
     LANGCHAIN_TRACING_V2: bool = os.getenv("LANGCHAIN_TRACING_V2", "false").lower() == "true"
     LANGCHAIN_API_KEY: Optional[str] = os.getenv("LANGCHAIN_API_KEY")
     
+    # Ingestion State
+    INGEST_MANIFEST_PATH: str = os.getenv("INGEST_MANIFEST_PATH", "./ingest_state/manifest.db")
+    INGEST_JOBS_PATH: str = os.getenv("INGEST_JOBS_PATH", "./ingest_state/jobs.db")
+    INGEST_SPOOL_DIRECTORY: str = os.getenv("INGEST_SPOOL_DIRECTORY", "./ingest_state/uploads")
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_MAX_PENDING_JOBS: int = int(os.getenv("INGEST_MAX_PENDING_JOBS", "100"))
+    INGEST_ROLE: str = os.getenv("INGEST_ROLE", "local")  # local, submit or worker
+    INGEST_POLL_INTERVAL: float = float(os.getenv("INGEST_POLL_INTERVAL", "0.5"))
+    INDEX_REFRESH_INTERVAL: float = float(os.getenv("INDEX_REFRESH_INTERVAL", "1.0"))
+    
     # Document Processing
     SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md", ".docx"}
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    MAX_BATCH_UPLOAD_SIZE: int = int(os.getenv("MAX_BATCH_UPLOAD_SIZE", str(10 * MAX_FILE_SIZE)))
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+    PARSE_TIMEOUT: float = float(os.getenv("PARSE_TIMEOUT", "120"))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
     
     @classmethod
     def validate(cls) -> bool:
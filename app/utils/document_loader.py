@@ -1,5 +1,9 @@
+import fnmatch
+import multiprocessing
 import os
-from typing import List, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain.schema import Document
 from langchain_community.document_loaders import (
     PyPDFLoader,
@@ -49,27 +53,134 @@ class DocumentLoader:
             raise Exception(f"Error loading document {file_path}: {str(e)}")
     
     @staticmethod
-    def load_documents_from_directory(directory_path: str) -> List[Document]:
-        """Load all supported documents from a directory."""
+    def load_documents_from_directory(
+        directory_path: str,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> List[Document]:
+        """Load all supported documents from a directory, parsing files in parallel."""
+        documents = []
+        file_paths = DocumentLoader.list_supported_files(directory_path, recursive, include, exclude)
+        
+        for file_path, docs, error in DocumentLoader.parse_files(file_paths):
+            if error:
+                print(f"Warning: Could not load {os.path.basename(file_path)}: {error}")
+            else:
+                documents.extend(docs)
+        
+        return documents
+    
+    @staticmethod
+    def list_supported_files(
+        directory_path: str,
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> List[str]:
+        """List the paths of all supported files in a directory.
+        
+        `include` and `exclude` are glob patterns matched against each file's path
+        relative to the directory (and against its name), e.g. `*.pdf` or `drafts/*`.
+        """
         if not os.path.exists(directory_path):
             raise FileNotFoundError(f"Directory not found: {directory_path}")
         
-        documents = []
-        
-        for filename in os.listdir(directory_path):
-            file_path = os.path.join(directory_path, filename)
+        file_paths = []
+        for root, dirs, filenames in os.walk(directory_path):
+            if not recursive:
+                dirs.clear()
+            dirs.sort()
             
-            if os.path.isfile(file_path):
-                file_extension = os.path.splitext(filename)[1].lower()
+            for filename in sorted(filenames):
+                file_path = os.path.join(root, filename)
+                if os.path.isfile(file_path) and DocumentLoader.is_selected(file_path, directory_path, include, exclude):
+                    file_paths.append(file_path)
+        
+        return file_paths
+    
+    @staticmethod
+    def is_selected(
+        file_path: str,
+        directory_path: str,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ) -> bool:
+        """Check whether a file is supported and passes the include/exclude globs."""
+        if os.path.splitext(file_path)[1].lower() not in settings.SUPPORTED_EXTENSIONS:
+            return False
+        
+        relative_path = os.path.relpath(file_path, directory_path).replace(os.sep, "/")
+        
+        def matches(patterns: List[str]) -> bool:
+            return any(
+                fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(os.path.basename(file_path), pattern)
+                for pattern in patterns
+            )
+        
+        if include and not matches(include):
+            return False
+        return not (exclude and matches(exclude))
+    
+    @staticmethod
+    def parse_files(
+        file_paths: List[str],
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Iterator[Tuple[str, List[Document], Optional[str]]]:
+        """Parse files on a process pool, yielding `(file_path, documents, error)` as each finishes.
+        
+        PDF/DOCX parsing is CPU-bound, so files are spread over worker processes instead of
+        threads. At most one file per worker is in flight, which makes the submission time a
+        good proxy for the start time: a file still running `timeout` seconds later is
+        reported as failed and the pool is replaced, so a broken file cannot stall the rest.
+        With fewer than two workers or files, parsing happens in the calling process.
+        """
+        workers = min(workers or settings.PARSE_WORKERS, len(file_paths))
+        timeout = timeout or settings.PARSE_TIMEOUT
+        
+        if workers < 2:
+            for file_path in file_paths:
+                try:
+                    yield file_path, DocumentLoader.load_document(file_path), None
+                except Exception as e:
+                    yield file_path, [], str(e)
+            return
+        
+        pending = list(reversed(file_paths))
+        # Future -> (file path, deadline)
+        in_flight: Dict = {}
+        executor = _new_parse_pool(workers)
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < workers:
+                    file_path = pending.pop()
+                    in_flight[executor.submit(_parse_file, file_path)] = (file_path, time.monotonic() + timeout)
                 
-                if file_extension in settings.SUPPORTED_EXTENSIONS:
+                next_deadline = min(deadline for _, deadline in in_flight.values())
+                done, _ = wait(in_flight, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    file_path, _ = in_flight.pop(future)
                     try:
-                        docs = DocumentLoader.load_document(file_path)
-                        documents.extend(docs)
+                        yield file_path, future.result(), None
                     except Exception as e:
-                        print(f"Warning: Could not load {filename}: {e}")
-        
-        return documents
+                        yield file_path, [], str(e)
+                
+                now = time.monotonic()
+                expired = [future for future, (_, deadline) in in_flight.items() if deadline <= now and not future.done()]
+                if expired:
+                    # A worker process cannot be interrupted, so replace the whole pool and
+                    # requeue the files that were sharing it
+                    for future in expired:
+                        file_path, _ = in_flight.pop(future)
+                        yield file_path, [], f"Parsing timed out after {timeout}s"
+                    pending.extend(file_path for file_path, _ in in_flight.values())
+                    in_flight.clear()
+                    _terminate_parse_pool(executor)
+                    executor = _new_parse_pool(workers)
+        finally:
+            _terminate_parse_pool(executor)
     
     @staticmethod
     def validate_file(file_path: str) -> bool:
@@ -88,5 +199,18 @@ class DocumentLoader:
         
         return True
 
+def _parse_file(file_path: str) -> List[Document]:
+    """Process pool entry point."""
+    return DocumentLoader.load_document(file_path)
+
+def _new_parse_pool(workers: int) -> ProcessPoolExecutor:
+    # Spawned workers do not inherit the server's threads and locks, unlike forked ones
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _terminate_parse_pool(executor: ProcessPoolExecutor) -> None:
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
 # Global document loader instance
 document_loader = DocumentLoader() 
\ No newline at end of file
@@ -0,0 +1,425 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.utils.config import settings
+
+# Latency buckets in seconds, from cache hits to slow LLM answers
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Metric:
+    """A named metric with one value per combination of label values."""
+    
+    type = ""
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), aggregate: str = "sum"):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        # How processes' values are combined: "sum", or "max" for values read from shared state
+        self.aggregate = aggregate
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+    
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        """(name suffix, label pairs, value) for every sample of this metric."""
+        with self._lock:
+            return [("", tuple(zip(self.label_names, key)), value) for key, value in self._values.items()]
+
+class Counter(_Metric):
+    """A value that only goes up."""
+    
+    type = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def set_total(self, value: float, **labels: Any) -> None:
+        """Mirror a counter kept elsewhere, e.g. a cache's hit count, at collection time."""
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+    
+    type = "gauge"
+    
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+    
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    @contextmanager
+    def track_in_progress(self, **labels: Any) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(1.0, **labels)
+        try:
+            yield
+        finally:
+            self.inc(-1.0, **labels)
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets, with their sum and count."""
+    
+    type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+    
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe how long the block takes, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        with self._lock:
+            entries = [(key, list(entry)) for key, entry in self._values.items()]
+        samples = []
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        for key, entry in entries:
+            labels = tuple(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(bounds, entry[:-1]):
+                cumulative += count
+                samples.append(("_bucket", labels + (("le", bound),), cumulative))
+            samples.append(("_sum", labels, entry[-1]))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered in the Prometheus text format at `/metrics`.
+    
+    Hot paths only update in-memory values under a per-metric lock. Values already
+    tracked elsewhere (cache hit counts, session counts, ...) are read by collectors
+    at scrape time instead of being updated twice.
+    
+    With METRICS_DIRECTORY set, as the production server does, every process writes a
+    snapshot of its metrics there every METRICS_FLUSH_INTERVAL seconds, and a scrape of
+    any worker merges them: counters and histograms are summed over all processes,
+    including exited ones so totals never go down, and gauges over the live ones.
+    Snapshots are named by pid and a random instance ID, since pids are reused; the
+    server folds those of exited workers into one file of retired totals.
+    """
+    
+    def __init__(self, directory: str = "", flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._instance: Optional[Tuple[int, str]] = None
+    
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = (), aggregate: str = "sum") -> Counter:
+        return self._register(Counter(name, documentation, labels, aggregate))
+    
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), aggregate: str = "sum") -> Gauge:
+        return self._register(Gauge(name, documentation, labels, aggregate))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+    
+    def _register(self, metric: _Metric) -> Any:
+        """Register a metric, or return the one already registered under its name."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if existing.type != metric.type or existing.label_names != metric.label_names:
+            raise ValueError(f"Metric {metric.name} is already registered differently")
+        return existing
+    
+    def collector(self, function: Callable[[], None]) -> Callable[[], None]:
+        """Register a function that updates metrics from other components' stats before each collection."""
+        self._collectors.append(function)
+        return function
+    
+    def export_stats(
+        self,
+        prefix: str,
+        get_stats: Callable[[], Optional[Dict[str, Any]]],
+        counters: Optional[Dict[str, str]] = None,
+        gauges: Optional[Dict[str, str]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        aggregate: str = "sum"
+    ) -> None:
+        """Expose entries of a component's stats as `<prefix>_<key>` metrics, read at collection time.
+        
+        `counters` and `gauges` map stats keys to their help text; counters get a `_total`
+        suffix. `get_stats` returns None while the component is not built. Components
+        exporting under the same prefix are told apart by their constant `labels`.
+        """
+        labels = labels or {}
+        exported = [
+            (key, self.counter(f"{prefix}_{key}_total", documentation, list(labels), aggregate).set_total)
+            for key, documentation in (counters or {}).items()
+        ] + [
+            (key, self.gauge(f"{prefix}_{key}", documentation, list(labels), aggregate).set)
+            for key, documentation in (gauges or {}).items()
+        ]
+        
+        def collect() -> None:
+            stats = get_stats()
+            if stats is None:
+                return
+            for key, update in exported:
+                if key in stats:
+                    update(stats[key], **labels)
+        
+        self.collector(collect)
+    
+    def collect(self) -> Dict[str, Any]:
+        """Snapshot every metric of this process."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                # A failing component must not take the whole scrape down
+                pass
+        return {
+            "pid": os.getpid(),
+            "instance": self._instance_id(),
+            "metrics": {
+                metric.name: {
+                    "type": metric.type,
+                    "help": metric.documentation,
+                    "aggregate": metric.aggregate,
+                    "samples": metric.samples()
+                }
+                for metric in list(self._metrics.values())
+            }
+        }
+    
+    def render(self) -> str:
+        """Render the metrics of this process, or of all processes, in the Prometheus text format."""
+        snapshot = self.collect()
+        if self.directory:
+            self._write(snapshot)
+            snapshot = self._merge(self._read_all())
+        
+        lines = []
+        for name, metric in sorted(snapshot["metrics"].items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for suffix, labels, value in metric["samples"]:
+                if labels:
+                    label_text = ",".join(f'{label}="{_escape(label_value)}"' for label, label_value in labels)
+                    lines.append(f"{name}{suffix}{{{label_text}}} {_format(value)}")
+                else:
+                    lines.append(f"{name}{suffix} {_format(value)}")
+        return "\n".join(lines) + "\n"
+    
+    def start(self) -> None:
+        """Start writing this process's snapshots when metrics are shared between processes."""
+        if not self.directory or self._flusher is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+    
+    def shutdown(self) -> None:
+        """Stop the flusher after writing a final snapshot."""
+        if self._flusher is None:
+            return
+        self._stop.set()
+        self._flusher.join()
+        self._flusher = None
+        self._write(self.collect())
+    
+    def clear_snapshots(self) -> None:
+        """Remove the snapshots of an earlier run, so its totals are not added to this one's."""
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json*")):
+            os.remove(path)
+    
+    def retire(self, pid: int) -> None:
+        """Fold the snapshots of an exited process into the retired totals, then remove them.
+        
+        The server's master calls this whenever a worker exits, so the directory holds
+        one snapshot per live process however often workers are recycled.
+        """
+        if not self.directory:
+            return
+        paths = glob.glob(os.path.join(self.directory, f"metrics_{pid}_*.json"))
+        if not paths:
+            return
+        retired_path = os.path.join(self.directory, "metrics_retired.json")
+        snapshots = [snapshot for snapshot in map(self._read, [retired_path] + paths) if snapshot]
+        for snapshot in snapshots:
+            # Gauges of exited processes describe state that is gone
+            snapshot["metrics"] = {
+                name: metric for name, metric in snapshot["metrics"].items() if metric["type"] != "gauge"
+            }
+        self._write(dict(self._merge(snapshots), instance="retired"), retired_path)
+        for path in paths:
+            os.remove(path)
+    
+    def _instance_id(self) -> str:
+        """Random ID of this process; regenerated after a fork, as workers fork from a preloaded master."""
+        pid = os.getpid()
+        if self._instance is None or self._instance[0] != pid:
+            self._instance = (pid, uuid.uuid4().hex)
+        return self._instance[1]
+    
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._write(self.collect())
+            except OSError as e:
+                print(f"⚠️  Failed to write metrics snapshot: {e}")
+    
+    def _write(self, snapshot: Dict[str, Any], path: Optional[str] = None) -> None:
+        path = path or os.path.join(self.directory, f"metrics_{snapshot['pid']}_{snapshot['instance']}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temporary, path)
+    
+    def _read_all(self) -> List[Dict[str, Any]]:
+        snapshots = map(self._read, glob.glob(os.path.join(self.directory, "metrics_*.json")))
+        return [snapshot for snapshot in snapshots if snapshot]
+    
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Missing, removed or being replaced; the next scrape picks it up
+            return None
+    
+    @staticmethod
+    def _merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine the snapshots of several processes into one."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        values: Dict[str, Dict[Tuple, float]] = {}
+        for snapshot in snapshots:
+            alive = _pid_alive(snapshot["pid"])
+            for name, metric in snapshot["metrics"].items():
+                # Gauges of exited processes describe state that is gone
+                if metric["type"] == "gauge" and not alive:
+                    continue
+                merged.setdefault(name, {key: metric[key] for key in ("type", "help", "aggregate")})
+                samples = values.setdefault(name, {})
+                for suffix, labels, value in metric["samples"]:
+                    key = (suffix, tuple(tuple(pair) for pair in labels))
+                    if key not in samples:
+                        samples[key] = value
+                    elif metric["aggregate"] == "max":
+                        samples[key] = max(samples[key], value)
+                    else:
+                        samples[key] += value
+        for name, metric in merged.items():
+            metric["samples"] = [(suffix, labels, value) for (suffix, labels), value in values[name].items()]
+        return {"pid": os.getpid(), "metrics": merged}
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template and status code."""
+    
+    def __init__(self, app: Callable):
+        self.app = app
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.inc(-1.0)
+            # The matched route's template keeps path parameters out of the labels
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"]
+            )
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+# Global metrics registry
+metrics = MetricsRegistry(settings.METRICS_DIRECTORY, settings.METRICS_FLUSH_INTERVAL)
+
+# Metrics shared by several modules
+http_request_duration = metrics.histogram(
+    "contextagent_http_request_duration_seconds",
+    "HTTP request latency, until the response body is sent",
+    ["method", "route", "status"]
+)
+http_requests_in_flight = metrics.gauge("contextagent_http_requests_in_flight", "HTTP requests being served")
+CACHE_COUNTERS = {
+    "hits": "Cache lookups answered from the cache",
+    "misses": "Cache lookups that missed",
+    "evictions": "Cache entries evicted to stay within the cache's limits"
+}
+CACHE_GAUGES = {"entries": "Entries in the cache"}
+chat_stage_duration = metrics.histogram(
+    "contextagent_chat_stage_duration_seconds",
+    "Latency of each chat stage: condense_question, answer_cache_lookup, retrieval, context_build, answer, agent",
+    ["stage"]
+) 
\ No newline at end of file
@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+class LazyComponent:
+    """Stands in for a component until first use, then forwards to the built instance.
+    
+    Modules keep exposing their global instances (`vector_store`, `qa_chain`, ...) as
+    before; importing them no longer builds anything.
+    """
+    
+    __slots__ = ("_registry", "_name")
+    
+    def __init__(self, registry: "ComponentRegistry", name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+    
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._registry.get(self._name), attribute)
+    
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        setattr(self._registry.get(self._name), attribute, value)
+    
+    def __repr__(self) -> str:
+        instance = self._registry.peek(self._name)
+        return repr(instance) if instance is not None else f"<lazy component {self._name!r}>"
+
+class ComponentRegistry:
+    """Builds the application's components on first use and times every startup step.
+    
+    Components are registered with a factory when their module is imported and built
+    the first time they are used, by a request or by the startup warm-up the lifespan
+    runs. A failing factory is recorded and retried on the next use rather than taking
+    the whole import down. Each component has its own lock, so building one never waits
+    for an unrelated one. Build times exclude the components built while building (e.g.
+    the embedder under the vector store), so the breakdown adds up.
+    """
+    
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._local = threading.local()
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        # True while the lifespan's startup thread is building and warming up components
+        self.starting = False
+        self.ready = False
+    
+    def register(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Register a component factory and return a lazy stand-in for the instance."""
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        return LazyComponent(self, name)
+    
+    def get(self, name: str) -> Any:
+        """Return a component, building it first if needed."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            if name not in self._instances:
+                with self.measure(name):
+                    try:
+                        self._instances[name] = self._factories[name]()
+                    except Exception as e:
+                        self.errors[name] = str(e)
+                        raise
+                self.errors.pop(name, None)
+            return self._instances[name]
+    
+    def peek(self, name: str) -> Optional[Any]:
+        """Return a component only if it has already been built."""
+        return self._instances.get(name)
+    
+    @property
+    def built(self) -> bool:
+        """Whether every registered component has been built."""
+        return len(self._instances) == len(self._factories)
+    
+    def build_missing(self) -> None:
+        """Build every component not built yet, raising the first failure."""
+        for name in list(self._factories):
+            self.get(name)
+    
+    def build_all(self) -> None:
+        """Build every registered component, recording failures instead of raising."""
+        for name in list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"❌ Failed to initialize {name}: {e}")
+    
+    @contextmanager
+    def measure(self, step: str) -> Iterator[None]:
+        """Time a startup step, excluding nested steps, and record it under `step`."""
+        stack: List[float] = self._local.__dict__.setdefault("nested", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.timings[step] = self.timings.get(step, 0.0) + (elapsed - nested) * 1000
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "components": {
+                name: "ready" if name in self._instances else "failed" if name in self.errors else "pending"
+                for name in self._factories
+            },
+            "errors": dict(self.errors),
+            "startup_ms": {step: round(ms, 1) for step, ms in self.timings.items()}
+        }
+
+# Global component registry
+registry = ComponentRegistry() 
\ No newline at end of file
@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+class _Broadcast:
+    """One in-flight event stream, replayed from the start to every subscriber."""
+    
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight computation.
+    
+    The first caller for a key starts the computation as its own task and later callers
+    wait for that task instead of starting another, so one caller disconnecting does
+    not cancel the others. Streams are fanned out the same way: every subscriber gets
+    every event from the start, including those produced before it joined. A stream
+    nobody is listening to any more is cancelled. Nothing is cached once a call is done.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self._stats = {"calls": 0, "coalesced": 0, "streams": 0, "streams_coalesced": 0}
+    
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return the result of `factory()`, shared with concurrent calls for `key`, and whether it was shared."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["calls"] += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._finish(key, task))
+        return await asyncio.shield(task), shared
+    
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark a failure as retrieved even if every caller has gone
+        if not task.cancelled():
+            task.exception()
+    
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> Tuple[AsyncIterator[T], bool]:
+        """Subscribe to the events of `factory()`, shared with concurrent subscribers for `key`, and whether it was shared."""
+        broadcast = self._streams.get(key)
+        shared = broadcast is not None
+        if shared:
+            self._stats["streams_coalesced"] += 1
+        else:
+            self._stats["streams"] += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._produce(key, broadcast, factory()))
+        broadcast.subscribers += 1
+        return self._subscribe(key, broadcast), shared
+    
+    async def _produce(self, key: str, broadcast: _Broadcast, events: AsyncIterator[T]) -> None:
+        try:
+            async for event in events:
+                async with broadcast.changed:
+                    broadcast.events.append(event)
+                    broadcast.changed.notify_all()
+        except BaseException as e:
+            broadcast.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            async with broadcast.changed:
+                broadcast.done = True
+                broadcast.changed.notify_all()
+    
+    async def _subscribe(self, key: str, broadcast: _Broadcast) -> AsyncIterator[T]:
+        index = 0
+        try:
+            while True:
+                async with broadcast.changed:
+                    await broadcast.changed.wait_for(lambda: len(broadcast.events) > index or broadcast.done)
+                    events = broadcast.events[index:]
+                    done = broadcast.done
+                index += len(events)
+                for event in events:
+                    yield event
+                if done and index == len(broadcast.events):
+                    if broadcast.error is not None and not isinstance(broadcast.error, asyncio.CancelledError):
+                        raise broadcast.error
+                    return
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # Nobody is listening; later callers start afresh instead of joining a cancelled stream
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+                broadcast.task.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls) + len(self._streams), **self._stats}
\ No newline at end of file
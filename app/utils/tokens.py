@@ -0,0 +1,24 @@
+from functools import lru_cache
+from typing import Optional
+from app.utils.config import settings
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """The tiktoken encoding for a model, or None when tiktoken or its data is unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count the tokens of a text for the chat model, falling back to ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = _encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
\ No newline at end of file
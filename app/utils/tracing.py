@@ -0,0 +1,149 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from app.utils.config import settings
+
+class Span:
+    """One timed step of a traced request, with the steps it ran nested under it."""
+    
+    __slots__ = ("name", "attributes", "start", "end", "children")
+    
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+    
+    def child(self, name: str, **attributes: Any) -> "Span":
+        """Start a span nested under this one."""
+        span = Span(name, attributes)
+        # list.append is atomic, so spans may be added from the thread pool
+        self.children.append(span)
+        return span
+    
+    def finish(self, **attributes: Any) -> None:
+        """End the span, and any child still open, e.g. one whose end callback never came."""
+        self.attributes.update(attributes)
+        if self.end is None:
+            self.end = time.perf_counter()
+        for child in self.children:
+            if child.end is None:
+                child.finish()
+    
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Serialize the span tree, with start offsets in ms from `origin` (this span's start by default)."""
+        origin = self.start if origin is None else origin
+        end = self.end if self.end is not None else time.perf_counter()
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3)
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+# The span new spans are nested under; None when the current request is not traced
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("contextagent_span", default=None)
+
+class _SpanContext:
+    """Makes a span the current one while a block runs."""
+    
+    __slots__ = ("span", "_token")
+    
+    def __init__(self, span: Span):
+        self.span = span
+        self._token = None
+    
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.span.finish()
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited in another context, e.g. a stream finalized by another task
+            pass
+
+class _NoSpan:
+    """Stands in for a span context outside traced requests, at the cost of one context lookup."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> None:
+        return None
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+_NO_SPAN = _NoSpan()
+
+def span(name: str, **attributes: Any):
+    """Context manager timing a block as a span of the current trace; does nothing when untraced."""
+    parent = _current.get()
+    if parent is None:
+        return _NO_SPAN
+    return _SpanContext(parent.child(name, **attributes))
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """Start a span of the current trace that is ended with `finish()`, e.g. from callbacks."""
+    parent = _current.get()
+    return parent.child(name, **attributes) if parent is not None else None
+
+def current_span() -> Optional[Span]:
+    """The innermost span of the current trace, or None."""
+    return _current.get()
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the innermost span of the current trace, if any."""
+    parent = _current.get()
+    if parent is not None:
+        parent.attributes.update(attributes)
+
+def trace(name: str, **attributes: Any) -> _SpanContext:
+    """Context manager tracing a block: spans started inside it are nested under the returned root span."""
+    return _SpanContext(Span(name, attributes))
+
+class TraceBuffer:
+    """Keeps the most recent traces of this process for `/debug/traces`."""
+    
+    def __init__(self, max_traces: int):
+        self.max_traces = max_traces
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=max(max_traces, 1))
+        self._lock = threading.Lock()
+    
+    def record(self, root: Span) -> Dict[str, Any]:
+        """Serialize a finished trace, keep it if the buffer is enabled, and return it."""
+        data = {
+            "trace_id": uuid.uuid4().hex,
+            "started_at": time.time() - (time.perf_counter() - root.start),
+            **root.to_dict()
+        }
+        if self.max_traces:
+            with self._lock:
+                self._traces.append(data)
+        return data
+    
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of the most recent traces, newest first."""
+        with self._lock:
+            traces = list(self._traces)[-limit:] if limit > 0 else []
+        return [
+            {key: entry[key] for key in ("trace_id", "name", "started_at", "duration_ms", "attributes") if key in entry}
+            for entry in reversed(traces)
+        ]
+    
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((entry for entry in self._traces if entry["trace_id"] == trace_id), None)
+
+# Global trace buffer
+trace_buffer = TraceBuffer(settings.TRACE_BUFFER_SIZE) 
\ No newline at end of file
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Concurrent chat throughput benchmark for ContextAgent.
+
+Fires concurrent POST /chat/ requests at a running server while probing
+/health, and reports throughput and latency for a single worker. Run it
+against a checkout before and after a change to compare:
+
+    uvicorn app.main:app --workers 1 &
+    python benchmarks/chat_concurrency.py --concurrency 16 --requests 64
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+MODES = {
+    "simple": {"use_rag": False, "use_agent": False},
+    "rag": {"use_rag": True, "use_agent": False},
+    "agent": {"use_rag": False, "use_agent": True},
+}
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def send_chat(base_url, payload):
+    """Send one chat request and return (latency_seconds, ok)."""
+    start = time.perf_counter()
+    try:
+        response = requests.post(f"{base_url}/chat/", json=payload, timeout=300)
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+def probe_health(base_url, stop_event, latencies):
+    """Poll /health until stopped, recording latencies."""
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        try:
+            requests.get(f"{base_url}/health", timeout=60)
+            latencies.append(time.perf_counter() - start)
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+
+def run(base_url, mode, concurrency, total_requests, question):
+    """Run the benchmark and return a result dictionary."""
+    payload = dict(MODES[mode], question=question)
+    health_latencies = []
+    stop_event = threading.Event()
+    prober = threading.Thread(target=probe_health, args=(base_url, stop_event, health_latencies))
+    prober.start()
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: send_chat(base_url, payload), range(total_requests)))
+    elapsed = time.perf_counter() - start
+    
+    stop_event.set()
+    prober.join()
+    
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "succeeded": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "health_p50_s": round(percentile(health_latencies, 50), 4),
+        "health_max_s": round(max(health_latencies), 4) if health_latencies else 0.0,
+        "health_mean_s": round(statistics.mean(health_latencies), 4) if health_latencies else 0.0,
+    }
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the server")
+    parser.add_argument("--mode", choices=sorted(MODES), default="simple", help="Chat mode to exercise")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=64, help="Total chat requests to send")
+    parser.add_argument("--question", default="Summarize the uploaded documents in one sentence.")
+    parser.add_argument("--output", help="Optional path to write the JSON result")
+    args = parser.parse_args()
+    
+    print(f"🚀 Benchmarking {args.url} ({args.mode}, concurrency={args.concurrency})...")
+    result = run(args.url, args.mode, args.concurrency, args.requests, args.question)
+    
+    print(f"✅ {result['succeeded']}/{result['requests']} succeeded in {result['elapsed_s']}s")
+    print(f"   Throughput: {result['throughput_rps']} req/s")
+    print(f"   Chat latency p50/p95: {result['latency_p50_s']}s / {result['latency_p95_s']}s")
+    print(f"   /health latency p50/max under load: {result['health_p50_s']}s / {result['health_max_s']}s")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Offline component benchmark suite.
+
+Times the app's building blocks in-process, with the deterministic fake chat and
+embedding models of benchmarks/fake_models.py in place of OpenAI, so it needs no
+server, network or API key and gives the same workload on every run:
+
+- loading: DocumentLoader on generated .txt and .md files, one by one and as a directory
+- splitting: DocumentEmbedder.split_documents on generated multi-page documents
+- index: VectorStore.add_documents growing one index through every corpus size, and
+  VectorStore.similarity_search at each size (distinct queries, so the caches miss)
+- memory: session get_session, add_message and get_messages
+- qa: QAChain.get_answer end to end, for first questions and follow-ups (which add a
+  question condensing call); `overhead_ms` is the latency left after the fake model
+  latencies, i.e. what the app itself costs
+
+Model latencies default to 0 so the timings are the app's own. Results are written as
+JSON along with the commit they were measured on; pass an earlier file as --baseline
+to print how every timing changed:
+
+    python benchmarks/component_suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/component_suite.py --output after.json --baseline before.json
+    python benchmarks/component_suite.py --store faiss --sizes 1000,10000,50000 --llm-latency 0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PHASES = ["loading", "splitting", "index", "memory", "qa"]
+WORDS = (
+    "retrieval augmented generation answers questions from uploaded documents by embedding "
+    "their chunks searching the nearest neighbours of the question and passing them to the model"
+).split()
+
+def isolate(state, args):
+    """Point every persisted file of the app into `state`; must run before the app is imported."""
+    os.environ.update({
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        "ANONYMIZED_TELEMETRY": "False",
+        "VECTOR_STORE_TYPE": args.store,
+        "CHROMA_PERSIST_DIRECTORY": os.path.join(state, "chroma"),
+        "FAISS_INDEX_DIRECTORY": os.path.join(state, "faiss"),
+        "QUANTIZED_INDEX_DIRECTORY": os.path.join(state, "quantized"),
+        "LEXICAL_INDEX_PATH": os.path.join(state, "lexical.db"),
+        "INGEST_MANIFEST_PATH": os.path.join(state, "manifest.db"),
+        "INGEST_JOBS_PATH": os.path.join(state, "jobs.db"),
+        "INGEST_SPOOL_DIRECTORY": os.path.join(state, "uploads"),
+        "SESSION_DB_PATH": os.path.join(state, "sessions.db"),
+        "RETRIEVAL_MODE": args.retrieval_mode,
+        # Every chunk is new, so the cache would only add writes to the measurement
+        "EMBEDDING_CACHE_ENABLED": "false"
+    })
+
+def text(seed, words):
+    """Deterministic filler text of `words` words."""
+    return " ".join(WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(words)) + "."
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(latencies_ms):
+    """Latency percentiles of a phase, in milliseconds."""
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(statistics.mean(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3)
+    }
+
+def bench_loading(directory, args):
+    """Time DocumentLoader per format, file by file and as a parallel directory load."""
+    from app.utils.document_loader import document_loader
+    
+    results = {}
+    for extension in args.formats.split(","):
+        folder = os.path.join(directory, extension)
+        os.makedirs(folder)
+        for i in range(args.files):
+            with open(os.path.join(folder, f"doc_{i}.{extension}"), "w") as f:
+                for section in range(args.file_kb):
+                    if extension == "md":
+                        f.write(f"## Section {section}\n\n")
+                    f.write(text(i + section, 170) + "\n\n")
+        paths = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+        megabytes = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+        
+        try:
+            start = time.perf_counter()
+            documents = [doc for path in paths for doc in document_loader.load_document(path)]
+            sequential = time.perf_counter() - start
+        except Exception as e:
+            # e.g. the Markdown loader's optional dependency is missing
+            results[extension] = {"error": str(e)}
+            print(f"   ⚠️  {extension}: {e}")
+            continue
+        
+        start = time.perf_counter()
+        document_loader.load_documents_from_directory(folder)
+        parallel = time.perf_counter() - start
+        results[extension] = {
+            "files": len(paths),
+            "megabytes": round(megabytes, 2),
+            "documents": len(documents),
+            "sequential_s": round(sequential, 4),
+            "sequential_files_per_s": round(len(paths) / sequential, 1),
+            "directory_s": round(parallel, 4),
+            "directory_files_per_s": round(len(paths) / parallel, 1)
+        }
+        print(f"   {extension}: {results[extension]['sequential_files_per_s']} files/s one by one, "
+              f"{results[extension]['directory_files_per_s']} files/s as a directory")
+    return results
+
+def bench_splitting(args):
+    """Time splitting long documents into chunks."""
+    from langchain.schema import Document
+    from app.ingest.embedder import embedder
+    
+    documents = [
+        Document(page_content="\n\n".join(text(i + p, 170) for p in range(args.file_kb)), metadata={"source": f"doc_{i}.txt"})
+        for i in range(args.files)
+    ]
+    megabytes = sum(len(doc.page_content) for doc in documents) / 1024 / 1024
+    embedder.split_documents(documents[:1])
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        chunks = embedder.split_documents(documents)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    result = {
+        "documents": len(documents),
+        "chunks": len(chunks),
+        "megabytes": round(megabytes, 2),
+        "best_s": round(best, 4),
+        "chunks_per_s": round(len(chunks) / best, 1),
+        "megabytes_per_s": round(megabytes / best, 2)
+    }
+    print(f"   {result['chunks']} chunks, {result['chunks_per_s']} chunks/s, {result['megabytes_per_s']} MB/s")
+    return result
+
+def make_chunks(start, count):
+    """Documents of about one chunk each, numbered from `start`."""
+    from langchain.schema import Document
+    return [
+        Document(page_content=f"Chunk {i}. " + text(i, 120), metadata={"source": f"doc_{i % 100}.txt"})
+        for i in range(start, start + count)
+    ]
+
+def bench_index(sizes, args):
+    """Grow the index through every corpus size, timing add_documents and then similarity_search."""
+    from app.ingest.vector_store import vector_store
+    
+    ingest, search = [], []
+    stored = 0
+    for size in sizes:
+        start = time.perf_counter()
+        vector_store.add_documents(make_chunks(stored, size - stored))
+        elapsed = time.perf_counter() - start
+        ingest.append({
+            "size": size,
+            "added": size - stored,
+            "elapsed_s": round(elapsed, 3),
+            "chunks_per_s": round((size - stored) / elapsed, 1)
+        })
+        stored = size
+        
+        latencies = []
+        for i in range(args.queries):
+            query = f"Which chunk explains {WORDS[i % len(WORDS)]} at size {size}, query {i}?"
+            start = time.perf_counter()
+            vector_store.similarity_search(query, k=args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        search.append({"size": size, **summarize(latencies)})
+        print(f"   {size} chunks: add {ingest[-1]['chunks_per_s']} chunks/s, "
+              f"search p50 {search[-1]['p50_ms']}ms p95 {search[-1]['p95_ms']}ms")
+    return {"ingest": ingest, "search": search}
+
+def bench_memory(args):
+    """Time the session store operations every chat request makes."""
+    from app.memory.session_memory import memory_manager
+    
+    sessions = [f"bench-memory-{i}" for i in range(args.sessions)]
+    add, get, load = [], [], []
+    for turn in range(args.messages):
+        for session_id in sessions:
+            start = time.perf_counter()
+            session = memory_manager.get_session(session_id)
+            load.append((time.perf_counter() - start) * 1e6)
+            
+            start = time.perf_counter()
+            session.add_message("user" if turn % 2 == 0 else "agent", text(turn, 40))
+            add.append((time.perf_counter() - start) * 1e6)
+            
+            start = time.perf_counter()
+            session.get_messages()
+            get.append((time.perf_counter() - start) * 1e6)
+    for session_id in sessions:
+        memory_manager.clear_session(session_id)
+    
+    result = {
+        "sessions": len(sessions),
+        "messages_per_session": args.messages,
+        "get_session_us": round(statistics.mean(load), 2),
+        "add_message_us": round(statistics.mean(add), 2),
+        "get_messages_us": round(statistics.mean(get), 2),
+        "get_messages_p95_us": round(percentile(get, 95), 2)
+    }
+    print(f"   get_session {result['get_session_us']}us, add_message {result['add_message_us']}us, "
+          f"get_messages {result['get_messages_us']}us")
+    return result
+
+def bench_qa(args):
+    """Time QAChain.get_answer for first questions and their follow-ups."""
+    import fake_models
+    from app.chains.qa_chain import qa_chain
+    
+    qa_chain.get_answer("Warm-up question", session_id="bench-qa-warm-up")
+    
+    results = {}
+    phases = {"first_turn": [], "follow_up": []}
+    calls = {phase: {"llm_calls": 0, "embedding_calls": 0} for phase in phases}
+    for i in range(args.questions):
+        session_id = f"bench-qa-{i}"
+        for phase, question in (
+            ("first_turn", f"What does document {i} say about {WORDS[i % len(WORDS)]}?"),
+            ("follow_up", f"And how does that relate to {WORDS[(i + 5) % len(WORDS)]}?")
+        ):
+            before = fake_models.snapshot()
+            start = time.perf_counter()
+            response = qa_chain.get_answer(question, session_id=session_id)
+            phases[phase].append((time.perf_counter() - start) * 1000)
+            after = fake_models.snapshot()
+            for counter in calls[phase]:
+                calls[phase][counter] += after[counter] - before[counter]
+            if "error" in response.get("metadata", {}):
+                raise RuntimeError(f"get_answer failed: {response['metadata']['error']}")
+    
+    for phase, latencies in phases.items():
+        llm_calls = calls[phase]["llm_calls"] / len(latencies)
+        embedding_calls = calls[phase]["embedding_calls"] / len(latencies)
+        model_ms = (llm_calls * args.llm_latency + embedding_calls * args.embedding_latency) * 1000
+        results[phase] = {
+            **summarize(latencies),
+            "llm_calls_per_answer": round(llm_calls, 2),
+            "embedding_calls_per_answer": round(embedding_calls, 2),
+            "overhead_ms": round(statistics.mean(latencies) - model_ms, 3)
+        }
+        print(f"   {phase}: p50 {results[phase]['p50_ms']}ms p95 {results[phase]['p95_ms']}ms, "
+              f"{results[phase]['overhead_ms']}ms beyond the model calls")
+    return results
+
+def git_revision():
+    """The checked-out commit, and whether the tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True)
+        return commit, bool(status.stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def flatten(results, prefix=""):
+    """Timings and throughputs of a results tree, keyed by their path (list entries by size)."""
+    values = {}
+    items = results.items() if isinstance(results, dict) else (
+        (f"size={entry.get('size', i)}", entry) for i, entry in enumerate(results)
+    )
+    for key, value in items:
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, (dict, list)):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and key.endswith(("_ms", "_us", "_s")):
+            values[path] = value
+    return values
+
+def compare(results, config, baseline_path):
+    """Print how every timing changed since a baseline run; throughputs (per_s) are better when higher."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"📊 Compared with {baseline_path} (commit {(baseline.get('commit') or 'unknown')[:12]}):")
+    differing = sorted(
+        key for key, value in config.items()
+        if key not in ("output", "baseline") and baseline.get("config", {}).get(key) != value
+    )
+    if differing:
+        print(f"   ⚠️  Measured with different settings: {', '.join(differing)}")
+    old, new = flatten(baseline["results"]), flatten(results)
+    for path in sorted(set(old) & set(new)):
+        if not old[path]:
+            continue
+        change = (new[path] - old[path]) / old[path] * 100
+        better = change > 0 if path.endswith("per_s") else change < 0
+        marker = "  " if abs(change) < 5 else ("✅" if better else "❌")
+        print(f"   {marker} {path}: {old[path]} → {new[path]} ({change:+.1f}%)")
+
+def main():
+    """Parse arguments and run the suite."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phases", default=",".join(PHASES), help=f"Comma-separated subset of {PHASES}")
+    parser.add_argument("--store", choices=["chroma", "faiss", "quantized"], default="chroma", help="VECTOR_STORE_TYPE")
+    parser.add_argument("--retrieval-mode", choices=["vector", "lexical", "hybrid"], default="vector")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Comma-separated corpus sizes in chunks")
+    parser.add_argument("--queries", type=int, default=200, help="Timed searches per corpus size")
+    parser.add_argument("--k", type=int, default=4, help="Results per search")
+    parser.add_argument("--files", type=int, default=200, help="Generated files per format")
+    parser.add_argument("--file-kb", type=int, default=8, help="Approximate size of each file in KB")
+    parser.add_argument("--formats", default="txt,md", help="Comma-separated file formats to load")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions of the splitting run; the best counts")
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions in the memory phase")
+    parser.add_argument("--messages", type=int, default=20, help="Messages added to each session")
+    parser.add_argument("--questions", type=int, default=50, help="Conversations of two questions in the qa phase")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake chat model call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per fake embeddings call")
+    parser.add_argument("--dim", type=int, default=1536, help="Fake embedding dimension")
+    parser.add_argument("--output", help="Optional path to write the JSON results")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    args = parser.parse_args()
+    
+    phases = args.phases.split(",")
+    sizes = sorted(int(value) for value in args.sizes.split(","))
+    state = tempfile.mkdtemp(prefix="bench_suite_")
+    isolate(state, args)
+    
+    import fake_models
+    fake_models.install(args.llm_latency, args.embedding_latency, args.dim)
+    from app.utils.registry import registry
+    
+    results = {}
+    try:
+        start = time.perf_counter()
+        registry.build_all()
+        print(f"🧱 Components built in {time.perf_counter() - start:.2f}s ({args.store}, {args.retrieval_mode} retrieval)")
+        
+        if "loading" in phases:
+            print("📂 Loading documents...")
+            results["loading"] = bench_loading(os.path.join(state, "files"), args)
+        if "splitting" in phases:
+            print("✂️  Splitting documents...")
+            results["splitting"] = bench_splitting(args)
+        if "index" in phases:
+            print("🗄️  Indexing and searching...")
+            results.update(bench_index(sizes, args))
+        elif "qa" in phases:
+            from app.ingest.vector_store import vector_store
+            vector_store.add_documents(make_chunks(0, sizes[0]))
+        if "memory" in phases:
+            print("🧠 Session memory...")
+            results["memory"] = bench_memory(args)
+        if "qa" in phases:
+            print("💬 QAChain.get_answer...")
+            results["qa"] = bench_qa(args)
+    finally:
+        shutil.rmtree(state, ignore_errors=True)
+    
+    commit, dirty = git_revision()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+    if args.baseline:
+        compare(results, vars(args), args.baseline)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
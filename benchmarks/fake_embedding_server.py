@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI embeddings and chat completions APIs.
+
+Returns deterministic vectors (and a fixed chat answer) after a configurable
+latency and answers with HTTP 429 once the requests-per-minute limit is
+exceeded, so ingestion throughput, retry behaviour and server throughput can
+be measured without network access:
+
+    python benchmarks/fake_embedding_server.py --port 9100 --latency 0.2 --rpm 600
+    OPENAI_API_BASE=http://localhost:9100/v1 python benchmarks/ingest_throughput.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import struct
+import time
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake OpenAI server")
+config = {"latency": 0.2, "jitter": 0.05, "rpm": 0, "dimensions": 1536}
+request_times = deque()
+counters = {"requests": 0, "inputs": 0, "rate_limited": 0, "completions": 0}
+ANSWER = "This is a fake answer from the benchmark server."
+
+def fake_vector(item, dimensions):
+    """Build a deterministic unit-length vector from the input text or token list."""
+    seed = hashlib.sha256(repr(item).encode("utf-8")).digest()
+    rng = random.Random(struct.unpack("<Q", seed[:8])[0])
+    values = [rng.uniform(-1.0, 1.0) for _ in range(dimensions)]
+    norm = sum(v * v for v in values) ** 0.5
+    return [v / norm for v in values]
+
+def rate_limit():
+    """Return a 429 response once the requests-per-minute limit is exceeded, else None."""
+    now = time.monotonic()
+    if config["rpm"]:
+        while request_times and now - request_times[0] > 60:
+            request_times.popleft()
+        if len(request_times) >= config["rpm"]:
+            counters["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests"}},
+                headers={"retry-after": "1"}
+            )
+        request_times.append(now)
+    return None
+
+async def simulate_latency():
+    """Sleep for the configured latency plus jitter."""
+    await asyncio.sleep(max(0.0, config["latency"] + random.uniform(-config["jitter"], config["jitter"])))
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    """Mimic POST /v1/embeddings."""
+    payload = await request.json()
+    limited = rate_limit()
+    if limited:
+        return limited
+    
+    inputs = payload["input"]
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    
+    counters["requests"] += 1
+    counters["inputs"] += len(inputs)
+    await simulate_latency()
+    
+    return {
+        "object": "list",
+        "model": payload.get("model", "text-embedding-ada-002"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_vector(item, config["dimensions"])}
+            for i, item in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0}
+    }
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """Mimic POST /v1/chat/completions, streamed word by word when requested."""
+    payload = await request.json()
+    limited = rate_limit()
+    if limited:
+        return limited
+    
+    counters["completions"] += 1
+    await simulate_latency()
+    
+    model = payload.get("model", "gpt-4")
+    created = int(time.time())
+    if not payload.get("stream"):
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+    
+    def chunk(delta, finish_reason=None):
+        data = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(data)}\n\n"
+    
+    def events():
+        yield chunk({"role": "assistant", "content": ""})
+        for word in ANSWER.split(" "):
+            yield chunk({"content": word + " "})
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/stats")
+async def stats():
+    """Report how many requests and inputs were served."""
+    return counters
+
+def main():
+    """Parse arguments and start the server."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Random +/- latency in seconds")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+    
+    config.update(latency=args.latency, jitter=args.jitter, rpm=args.rpm, dimensions=args.dimensions)
+    print(f"🧪 Fake OpenAI server on http://{args.host}:{args.port}/v1 (latency={args.latency}s, rpm={args.rpm or '∞'})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+In-process stand-ins for ChatOpenAI and OpenAIEmbeddings.
+
+They subclass the real classes, so the app builds and calls them exactly as it
+would the real ones, but answer deterministically after a configurable latency
+without any network access. `install()` swaps them into the app modules before
+the app's components are built (components are built on first use):
+
+    from fake_models import install
+    install(llm_latency=0.5, embedding_latency=0.05)
+    from app.chains.qa_chain import qa_chain
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+config = {"llm_latency": 0.0, "embedding_latency": 0.0, "dimensions": 1536}
+counters = {"llm_calls": 0, "embedding_calls": 0, "embedded_texts": 0}
+ANSWER = "This is a fake answer from the benchmark chat model."
+
+def fake_answer(messages: List[BaseMessage]) -> str:
+    """ANSWER tagged with a digest of the prompt, so different prompts get different answers."""
+    digest = hashlib.sha256("\n".join(str(message.content) for message in messages).encode("utf-8")).hexdigest()
+    return f"{ANSWER} ({digest[:12]})"
+
+def estimate_tokens(text: str) -> int:
+    """About 4 characters per token, like the app's fallback when tiktoken is unavailable."""
+    return max(1, len(text) // 4) if text else 0
+
+def fake_vector(text: str, dimensions: int) -> List[float]:
+    """Build a deterministic unit-length vector from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+class FakeChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that answers after `llm_latency` seconds and reports estimated token usage.
+    
+    The answer depends only on the prompt, so a condensed follow-up question is new
+    whenever the conversation is, as with a real model.
+    """
+    
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        counters["llm_calls"] += 1
+        answer = fake_answer(messages)
+        prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        completion_tokens = estimate_tokens(answer)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=answer), generation_info={"finish_reason": "stop"})],
+            llm_output={
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                },
+                "model_name": self.model_name
+            }
+        )
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(config["llm_latency"])
+        return self._result(messages)
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(config["llm_latency"])
+        return self._result(messages)
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(config["llm_latency"])
+        counters["llm_calls"] += 1
+        for word in fake_answer(messages).split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(config["llm_latency"])
+        counters["llm_calls"] += 1
+        for word in fake_answer(messages).split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+class FakeOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings returning deterministic vectors after `embedding_latency` seconds per call."""
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        counters["embedding_calls"] += 1
+        counters["embedded_texts"] += len(texts)
+        return [fake_vector(text, config["dimensions"]) for text in texts]
+    
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = 0) -> List[List[float]]:
+        time.sleep(config["embedding_latency"])
+        return self._embed(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+    
+    async def aembed_documents(self, texts: List[str], chunk_size: Optional[int] = 0) -> List[List[float]]:
+        await asyncio.sleep(config["embedding_latency"])
+        return self._embed(texts)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+def install(llm_latency: float = 0.0, embedding_latency: float = 0.0, dimensions: int = 1536) -> None:
+    """Make the app build the fakes; call before any of its components is used."""
+    from app.chains import agent_chain, qa_chain
+    from app.ingest import embedder
+    from app.memory import summary
+    
+    config.update(llm_latency=llm_latency, embedding_latency=embedding_latency, dimensions=dimensions)
+    for module in (qa_chain, agent_chain, summary):
+        module.ChatOpenAI = FakeChatOpenAI
+    embedder.OpenAIEmbeddings = FakeOpenAIEmbeddings
+
+def snapshot() -> Dict[str, int]:
+    """A copy of the call counters, to diff around a measured phase."""
+    return dict(counters)
\ No newline at end of file
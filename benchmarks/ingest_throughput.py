@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Ingestion throughput benchmark for the batched embedding pipeline.
+
+Embeds and stores synthetic chunks through VectorStore.add_documents for a
+grid of batch sizes and concurrency levels, against the API configured by
+OPENAI_API_BASE (normally benchmarks/fake_embedding_server.py):
+
+    python benchmarks/fake_embedding_server.py --latency 0.2 &
+    OPENAI_API_BASE=http://localhost:9100/v1 python benchmarks/ingest_throughput.py --chunks 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Isolate the benchmark from the real index and cache before the app reads its settings
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["CHROMA_PERSIST_DIRECTORY"] = tempfile.mkdtemp(prefix="bench_chroma_")
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+
+from langchain.schema import Document
+from langchain_openai import OpenAIEmbeddings
+
+from app.ingest.embedder import embedder
+from app.ingest.embedding_pipeline import EmbeddingPipeline, RateLimitedEmbeddings
+from app.ingest.vector_store import vector_store
+from app.utils.config import settings
+
+class RawTextEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings that sends raw strings, so no tiktoken download is needed offline."""
+    
+    def embed_documents(self, texts, chunk_size=0):
+        response = self.client.create(input=texts, model=self.model)
+        return [item.embedding for item in response.data]
+
+embeddings = RateLimitedEmbeddings(
+    RawTextEmbeddings(openai_api_key=settings.OPENAI_API_KEY, model=settings.EMBEDDING_MODEL),
+    embedder.rate_limiter
+)
+
+def make_documents(count, run_id):
+    """Build `count` distinct pseudo-documents, each about one chunk long."""
+    return [
+        Document(
+            page_content=f"Run {run_id} document {i}. " + ("Lorem ipsum dolor sit amet. " * 30),
+            metadata={"source": f"bench_{run_id}_{i}.txt", "file_path": f"/bench/{run_id}/{i}.txt"}
+        )
+        for i in range(count)
+    ]
+
+def run_case(chunks, batch_size, concurrency):
+    """Ingest `chunks` documents with the given pipeline settings and return the result."""
+    embedder.pipeline = EmbeddingPipeline(
+        embeddings,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        max_retries=embedder.pipeline.max_retries,
+        retry_backoff=embedder.pipeline.retry_backoff
+    )
+    documents = make_documents(chunks, f"b{batch_size}c{concurrency}")
+    
+    progress = {}
+    try:
+        vector_store.add_documents(documents, on_progress=lambda result: progress.update(result.to_dict()))
+    except RuntimeError as e:
+        print(f"   ⚠️  {e}")
+    return dict(progress, batch_size=batch_size, concurrency=concurrency)
+
+def main():
+    """Parse arguments and run the benchmark grid."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000, help="Chunks to ingest per case")
+    parser.add_argument("--batch-sizes", default="16,64,128", help="Comma-separated batch sizes")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--output", help="Optional path to write the JSON results")
+    args = parser.parse_args()
+    
+    print(f"🚀 Ingesting {args.chunks} chunks per case via {os.getenv('OPENAI_API_BASE', 'the OpenAI API')}")
+    results = []
+    for batch_size in [int(v) for v in args.batch_sizes.split(",")]:
+        for concurrency in [int(v) for v in args.concurrency.split(",")]:
+            result = run_case(args.chunks, batch_size, concurrency)
+            results.append(result)
+            print(
+                f"   batch={batch_size:<4} concurrency={concurrency:<3} "
+                f"{result['chunks_per_second']:>8} chunks/s  "
+                f"({result['elapsed_seconds']}s, failed batches: {result['failed_batches']})"
+            )
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Quantized index benchmark: recall and memory of float16/int8 storage vs exact search.
+
+Clustered random vectors (closer to real embeddings than uniform noise, which makes
+every neighbour equally far) are indexed with the quantized backend in float16 and
+int8, each with and without exact re-scoring from the full-precision vectors on
+disk. Every configuration is compared against exact float32 brute force:
+
+    python benchmarks/quantized_recall.py --size 100000 --dim 1536
+    python benchmarks/quantized_recall.py --size 20000 --dim 384 --output quantized.json
+
+Recall@k is the fraction of the exact top-k found in the returned top-k. Memory per
+vector counts what the backend keeps in RAM; re-scoring reads float32 rows from disk.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+CONFIGS = [("float16", False), ("float16", True), ("int8", False), ("int8", True)]
+
+def clustered_vectors(rng, count, dim, clusters=100):
+    """Unit vectors scattered around random cluster centres."""
+    import numpy as np
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def exact_neighbours(vectors, queries, k):
+    """Row indices of the exact top-k by float32 L2 distance."""
+    import numpy as np
+    neighbours = []
+    for query in queries:
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        top = np.argpartition(distances, k)[:k]
+        neighbours.append(top[np.argsort(distances[top])])
+    return neighbours
+
+def run_config(dtype, rescore, vectors, queries, truth, ks, batch_size):
+    """Index the vectors with one configuration and measure recall and latency."""
+    from langchain.schema import Document
+    from app.ingest.quantized import QuantizedBackend
+    
+    directory = tempfile.mkdtemp(prefix=f"bench_quantized_{dtype}_")
+    try:
+        backend = QuantizedBackend(directory, dtype=dtype, rescore=rescore)
+        for offset in range(0, len(vectors), batch_size):
+            batch = vectors[offset:offset + batch_size]
+            ids = [str(i) for i in range(offset, offset + len(batch))]
+            backend.upsert(ids, [Document(page_content=i) for i in ids], batch.tolist())
+        backend.persist()
+        
+        # Reopen the persisted index the way a server would at startup
+        backend = QuantizedBackend(directory, dtype=dtype, rescore=rescore)
+        k_max = max(ks)
+        latencies = []
+        recalls = {k: [] for k in ks}
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            results = backend.search(query.tolist(), k_max)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = [int(doc.page_content) for doc, _ in results]
+            for k in ks:
+                recalls[k].append(len(set(found[:k]) & set(expected[:k].tolist())) / k)
+        
+        stats = backend.get_stats()
+        latencies.sort()
+        return {
+            "dtype": dtype,
+            "rescore": rescore,
+            **{f"recall@{k}": round(statistics.mean(values), 4) for k, values in recalls.items()},
+            "bytes_per_vector": stats["bytes_per_vector"],
+            "float32_bytes_per_vector": stats["float32_bytes_per_vector"],
+            "memory_ratio": round(stats["bytes_per_vector"] / stats["float32_bytes_per_vector"], 3),
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3)
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    """Parse arguments and run every configuration."""
+    import numpy as np
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000, help="Corpus size in vectors")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per configuration")
+    parser.add_argument("--k", default="1,4,10", help="Comma-separated k values for recall@k")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Vectors per upsert call")
+    parser.add_argument("--output", help="Optional path to write the JSON results")
+    args = parser.parse_args()
+    
+    ks = [int(k) for k in args.k.split(",")]
+    rng = np.random.default_rng(42)
+    vectors = clustered_vectors(rng, args.size, args.dim)
+    # Queries are perturbed corpus vectors, so each has a meaningful neighbourhood
+    queries = vectors[rng.integers(0, args.size, args.queries)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    
+    print(f"🚀 Exact float32 search: {args.size} x {args.dim}d, {args.queries} queries")
+    truth = exact_neighbours(vectors, queries, max(ks))
+    
+    results = []
+    for dtype, rescore in CONFIGS:
+        result = run_config(dtype, rescore, vectors, queries, truth, ks, args.batch_size)
+        result.update({"size": args.size, "dim": args.dim})
+        results.append(result)
+        recalls = " ".join(f"R@{k} {result[f'recall@{k}']}" for k in ks)
+        print(
+            f"   {dtype:<7} rescore={str(rescore):<5} | {recalls} | "
+            f"{result['bytes_per_vector']} B/vector ({result['memory_ratio']:.0%} of float32) | "
+            f"p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms"
+        )
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
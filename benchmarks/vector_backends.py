@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Vector backend benchmark: query latency and memory of Chroma vs FAISS.
+
+For every backend and corpus size, random unit vectors are written through the
+backend's upsert API and persisted, then a fresh process opens the persisted
+index the way a server worker would (FAISS memory-maps it) and runs timed
+top-k queries. Build time, query latency percentiles and the resident memory
+added by opening and querying the index (split into private memory and shared
+page cache) are reported:
+
+    python benchmarks/vector_backends.py --sizes 100000,1000000
+    python benchmarks/vector_backends.py --sizes 20000 --dim 384 --backends faiss-flat,faiss-hnsw
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+BACKENDS = ["chroma", "faiss-flat", "faiss-ivf", "faiss-hnsw"]
+
+def rss_mb():
+    """Private (anonymous) and shared file-backed resident memory of this process in MB.
+    
+    Memory-mapped index pages show up as file-backed: they live in the page cache and
+    are shared by every process mapping the same file.
+    """
+    usage = {"RssAnon": 0.0, "RssFile": 0.0}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in usage:
+                usage[key] = int(line.split()[1]) / 1024
+    return usage["RssAnon"], usage["RssFile"]
+
+def make_backend(name, directory, size):
+    """Open a backend of the given kind on a directory."""
+    from app.ingest.backends import ChromaBackend, FaissBackend
+    if name == "chroma":
+        return ChromaBackend(directory, None)
+    # The usual sqrt(N) inverted lists, so IVF gets trained at every corpus size
+    return FaissBackend(directory, index_type=name.split("-", 1)[1], mmap=True, ivf_nlist=max(1, int(size ** 0.5)))
+
+def random_vectors(rng, count, dim):
+    """Random unit vectors, like normalized embeddings."""
+    import numpy as np
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build(name, directory, size, dim, batch_size, results):
+    """Write `size` vectors through the backend and persist them."""
+    import numpy as np
+    from langchain.schema import Document
+    
+    rng = np.random.default_rng(42)
+    backend = make_backend(name, directory, size)
+    start = time.perf_counter()
+    for offset in range(0, size, batch_size):
+        count = min(batch_size, size - offset)
+        ids = [f"chunk-{i}" for i in range(offset, offset + count)]
+        documents = [
+            Document(page_content=f"Chunk {i}", metadata={"source": f"doc_{i % 100}.txt"})
+            for i in range(offset, offset + count)
+        ]
+        backend.upsert(ids, documents, random_vectors(rng, count, dim).tolist())
+    backend.persist()
+    results["build_seconds"] = round(time.perf_counter() - start, 2)
+    results["stats"] = backend.get_stats()
+
+def query(name, directory, size, dim, queries, k, results):
+    """Open the persisted backend and time top-k queries."""
+    import numpy as np
+    
+    # Import everything first, so RSS deltas only cover the index itself
+    from app.ingest import backends  # noqa: F401
+    if name == "chroma":
+        import chromadb  # noqa: F401
+    else:
+        import faiss  # noqa: F401
+    anon_baseline, file_baseline = rss_mb()
+    
+    def record(phase):
+        anon, shared = rss_mb()
+        results[f"private_mb_after_{phase}"] = round(anon - anon_baseline, 1)
+        results[f"shared_mb_after_{phase}"] = round(shared - file_baseline, 1)
+    
+    start = time.perf_counter()
+    backend = make_backend(name, directory, size)
+    results["open_seconds"] = round(time.perf_counter() - start, 3)
+    record("open")
+    
+    rng = np.random.default_rng(7)
+    latencies = []
+    for vector in random_vectors(rng, queries, dim):
+        start = time.perf_counter()
+        backend.search(vector.tolist(), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    latencies.sort()
+    results["p50_ms"] = round(statistics.median(latencies), 3)
+    results["p95_ms"] = round(latencies[int(len(latencies) * 0.95) - 1], 3)
+    results["mean_ms"] = round(statistics.mean(latencies), 3)
+    record("queries")
+
+def run_in_process(target, *args):
+    """Run one phase in a fresh process and return the values it reported."""
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        results = manager.dict()
+        process = context.Process(target=target, args=(*args, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"{target.__name__} exited with code {process.exitcode}")
+        return dict(results)
+
+def main():
+    """Parse arguments and run the benchmark matrix."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000", help="Comma-separated corpus sizes in chunks")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"Comma-separated subset of {BACKENDS}")
+    parser.add_argument("--queries", type=int, default=200, help="Timed queries per case")
+    parser.add_argument("--k", type=int, default=4, help="Results per query")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Chunks per upsert call")
+    parser.add_argument("--output", help="Optional path to write the JSON results")
+    args = parser.parse_args()
+    
+    results = []
+    for size in [int(v) for v in args.sizes.split(",")]:
+        for name in args.backends.split(","):
+            directory = tempfile.mkdtemp(prefix=f"bench_{name}_")
+            print(f"🚀 {name}: {size} x {args.dim}d")
+            try:
+                result = {"backend": name, "size": size, "dim": args.dim}
+                result.update(run_in_process(build, name, directory, size, args.dim, args.batch_size))
+                result.update(run_in_process(query, name, directory, size, args.dim, args.queries, args.k))
+                results.append(result)
+                print(
+                    f"   build {result['build_seconds']}s | p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms | "
+                    f"RSS after queries: +{result['private_mb_after_queries']}MB private, "
+                    f"+{result['shared_mb_after_queries']}MB shared page cache"
+                )
+            except Exception as e:
+                print(f"   ⚠️  {e}")
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
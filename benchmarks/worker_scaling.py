@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Production server scaling benchmark: throughput and memory from 1 to N workers.
+
+Seeds a FAISS index with random vectors, then for every worker count starts
+`python -m app.server` against the fake OpenAI server, waits for /ready (with
+STARTUP_WARMUP, so every worker maps and searches the index), and drives
+concurrent /chat/ requests with distinct questions (BM25 retrieval by default,
+then the fake LLM). Reports throughput and
+latency, and each worker's private and shared (page cache) resident memory: the
+index pages are shared, so total PSS grows by the private memory per worker only.
+
+    python benchmarks/worker_scaling.py --workers 1,2,4 --concurrency 64 --requests 2000
+
+Throughput can only scale up to the number of CPU cores available.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_concurrency import MODES, percentile, send_chat
+
+def seed_index(state, chunks, dim):
+    """Write `chunks` random vectors to a persisted FAISS flat index, and their text to the lexical index."""
+    import numpy as np
+    from langchain.schema import Document
+    from app.ingest.backends import FaissBackend
+    from app.ingest.lexical_index import LexicalIndex
+    
+    rng = np.random.default_rng(42)
+    backend = FaissBackend(os.path.join(state, "faiss"), index_type="flat", mmap=True)
+    lexical = LexicalIndex(os.path.join(state, "lexical.db"))
+    for offset in range(0, chunks, 5000):
+        count = min(5000, chunks - offset)
+        vectors = rng.standard_normal((count, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{i}" for i in range(offset, offset + count)]
+        documents = [
+            Document(page_content=f"Chunk {i} of the uploaded documents.", metadata={"source": f"doc_{i % 100}.txt"})
+            for i in range(offset, offset + count)
+        ]
+        backend.upsert(ids, documents, vectors.tolist())
+        lexical.upsert(ids, documents)
+    backend.persist()
+    return os.path.getsize(backend.index_path) / 1024 / 1024
+
+def memory_mb(pid):
+    """Private and shared resident memory, and proportional set size, of a process in MB."""
+    usage = {"RssAnon": 0.0, "RssFile": 0.0, "RssShmem": 0.0, "Pss": 0.0}
+    for path in (f"/proc/{pid}/status", f"/proc/{pid}/smaps_rollup"):
+        try:
+            with open(path) as f:
+                for line in f:
+                    key = line.split(":")[0]
+                    if key in usage:
+                        usage[key] = int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    return {
+        "private_mb": round(usage["RssAnon"], 1),
+        "shared_mb": round(usage["RssFile"] + usage["RssShmem"], 1),
+        "pss_mb": round(usage["Pss"], 1)
+    }
+
+def worker_pids(master_pid):
+    """PIDs of the API worker processes under the server's master process."""
+    pids = []
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        for pid in f.read().split():
+            with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+                if b"--ingest-only" not in cmdline.read():
+                    pids.append(int(pid))
+    return pids
+
+def wait_ready(base_url, timeout):
+    """Poll /ready until it answers 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/ready", timeout=5).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+def run_case(workers, args, env):
+    """Start the server with `workers` workers, load it and return the result."""
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL if not args.verbose else None,
+        stderr=subprocess.DEVNULL if not args.verbose else None
+    )
+    try:
+        # Every worker reports ready on its own; give them all time to finish warming up
+        if not wait_ready(base_url, args.startup_timeout):
+            raise RuntimeError(f"Server with {workers} worker(s) did not become ready")
+        time.sleep(2)
+        
+        def send(i):
+            payload = dict(MODES[args.mode], question=f"{args.question} (#{i})")
+            return send_chat(base_url, payload)
+        
+        # Warm every worker's connections before timing
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(send, range(-args.concurrency, 0)))
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(send, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        
+        memory = [memory_mb(pid) for pid in worker_pids(server.pid)]
+        latencies = [latency for latency, ok in results if ok]
+        return {
+            "workers": workers,
+            "requests": args.requests,
+            "succeeded": len(latencies),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_p50_s": round(percentile(latencies, 50), 4),
+            "latency_p95_s": round(percentile(latencies, 95), 4),
+            "worker_private_mb": [m["private_mb"] for m in memory],
+            "worker_shared_mb": [m["shared_mb"] for m in memory],
+            "total_pss_mb": round(sum(m["pss_mb"] for m in memory), 1)
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="Chat requests per worker count")
+    parser.add_argument("--mode", choices=sorted(MODES), default="simple", help="Chat mode to exercise")
+    parser.add_argument("--question", default="Summarize the uploaded documents in one sentence.")
+    parser.add_argument(
+        "--retrieval-mode",
+        choices=["vector", "lexical", "hybrid"],
+        default="lexical",
+        help="Retrieval for every question; lexical needs no embedding call (no tiktoken download)"
+    )
+    parser.add_argument("--chunks", type=int, default=20000, help="Vectors in the seeded index")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake OpenAI latency in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--verbose", action="store_true", help="Show the server's output")
+    parser.add_argument("--output", help="Optional path to write the JSON results")
+    args = parser.parse_args()
+    
+    state = tempfile.mkdtemp(prefix="bench_workers_")
+    index_mb = seed_index(state, args.chunks, args.dim)
+    print(f"📦 Seeded a {args.chunks}-vector FAISS index ({index_mb:.1f} MB)")
+    
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        "OPENAI_API_BASE": f"http://127.0.0.1:{args.fake_port}/v1",
+        "ANONYMIZED_TELEMETRY": "False",
+        "VECTOR_STORE_TYPE": "faiss",
+        "FAISS_INDEX_DIRECTORY": os.path.join(state, "faiss"),
+        "LEXICAL_INDEX_PATH": os.path.join(state, "lexical.db"),
+        "INGEST_MANIFEST_PATH": os.path.join(state, "manifest.db"),
+        "INGEST_JOBS_PATH": os.path.join(state, "jobs.db"),
+        "INGEST_SPOOL_DIRECTORY": os.path.join(state, "uploads"),
+        "EMBEDDING_CACHE_PATH": os.path.join(state, "embeddings.db"),
+        "RETRIEVAL_MODE": args.retrieval_mode,
+        "STARTUP_WARMUP": "true",
+        # Distinct questions already defeat coalescing; disable it so every request does the work
+        "CHAT_COALESCING": "false"
+    }
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "fake_embedding_server.py"),
+         "--port", str(args.fake_port), "--latency", str(args.latency), "--jitter", "0"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    
+    results = []
+    try:
+        time.sleep(2)
+        for workers in [int(value) for value in args.workers.split(",")]:
+            print(f"🚀 {workers} worker(s), concurrency={args.concurrency}...")
+            result = run_case(workers, args, env)
+            result["speedup"] = round(result["throughput_rps"] / results[0]["throughput_rps"], 2) if results else 1.0
+            results.append(result)
+            print(f"   {result['throughput_rps']} req/s (x{result['speedup']}), "
+                  f"p50/p95 {result['latency_p50_s']}s / {result['latency_p95_s']}s, "
+                  f"{result['succeeded']}/{result['requests']} succeeded")
+            print(f"   Private MB per worker: {result['worker_private_mb']}, "
+                  f"shared MB per worker: {result['worker_shared_mb']}, total PSS: {result['total_pss_mb']} MB")
+    finally:
+        fake.terminate()
+        fake.wait()
+    
+    print(f"🖥️  CPU cores available: {os.cpu_count()}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "index_mb": round(index_mb, 1), "results": results}, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
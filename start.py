@@ -3,6 +3,7 @@
 Startup script for ContextAgent
 """
 
+import argparse
 import os
 import sys
 import uvicorn
@@ -48,6 +49,12 @@ def check_dependencies():
 
 def main():
     """Main startup function."""
+    parser = argparse.ArgumentParser(description="Start ContextAgent")
+    parser.add_argument("--production", action="store_true",
+                        help="Run worker processes and an ingest process instead of the auto-reloading dev server")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes with --production")
+    args = parser.parse_args()
+    
     print("🚀 Starting ContextAgent...")
     print("=" * 50)
     
@@ -59,6 +66,12 @@ def main():
     if not check_dependencies():
         sys.exit(1)
     
+    if args.production:
+        from app.server import serve
+        print("\n🎯 Starting production server...")
+        serve(workers=args.workers)
+        return
+    
     print("\n🎯 Starting server...")
     print("📖 API Documentation: http://localhost:8000/docs")
     print("🔍 Health Check: http://localhost:8000/health")
@@ -44,6 +44,26 @@ def test_chat():
     except Exception as e:
         print(f"❌ Chat test error: {e}")
 
+def test_chat_stream():
+    """Test streaming chat endpoint."""
+    print("\n📡 Testing streaming chat endpoint...")
+    try:
+        response = requests.post(f"{BASE_URL}/chat/stream", json={
+            "question": "Hello! Can you tell me about yourself?",
+            "use_rag": False,
+            "use_agent": False
+        }, stream=True)
+        
+        if response.status_code == 200:
+            events = [line for line in response.iter_lines(decode_unicode=True) if line.startswith("event:")]
+            print("✅ Streaming test passed")
+            print(f"   Events received: {len(events)} (last: {events[-1] if events else 'none'})")
+        else:
+            print(f"❌ Streaming test failed: {response.status_code}")
+            print(f"   Error: {response.text}")
+    except Exception as e:
+        print(f"❌ Streaming test error: {e}")
+
 def test_agent():
     """Test agent with calculator tool."""
     print("\n🤖 Testing agent with calculator...")
@@ -107,6 +127,7 @@ def main():
     
     test_health()
     test_chat()
+    test_chat_stream()
     test_agent()
     test_stats()
     test_tools()
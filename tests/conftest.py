@@ -0,0 +1,71 @@
+"""
+Shared test setup: every on-disk component writes to a temporary directory, and the
+chat and embedding models are the offline fakes from benchmarks/fake_models.py, so the
+tests need neither an API key nor network access.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+STATE_DIRECTORY = tempfile.mkdtemp(prefix="contextagent_tests_")
+atexit.register(shutil.rmtree, STATE_DIRECTORY, ignore_errors=True)
+
+# Settings are read when app.utils.config is first imported
+os.environ.update({
+    "OPENAI_API_KEY": "sk-test",
+    "ANONYMIZED_TELEMETRY": "False",
+    "VECTOR_STORE_TYPE": "faiss",
+    "FAISS_INDEX_DIRECTORY": os.path.join(STATE_DIRECTORY, "faiss"),
+    "EMBEDDING_CACHE_PATH": os.path.join(STATE_DIRECTORY, "embeddings.db"),
+    "LEXICAL_INDEX_PATH": os.path.join(STATE_DIRECTORY, "lexical.db"),
+    "INGEST_MANIFEST_PATH": os.path.join(STATE_DIRECTORY, "manifest.db"),
+    "INGEST_JOBS_PATH": os.path.join(STATE_DIRECTORY, "jobs.db"),
+    "INGEST_SPOOL_DIRECTORY": os.path.join(STATE_DIRECTORY, "uploads"),
+    "SESSION_DB_PATH": os.path.join(STATE_DIRECTORY, "sessions.db"),
+    "METRICS_DIRECTORY": "",
+    "EMBEDDING_BATCH_SIZE": "4",
+    "EMBEDDING_CONCURRENCY": "1",
+    "EMBEDDING_MAX_RETRIES": "0"
+})
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import fake_models
+
+fake_models.install(dimensions=32)
+
+import pytest
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient of the app, once its components have started."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    
+    with TestClient(app) as test_client:
+        deadline = time.monotonic() + 30
+        while test_client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, "The app did not become ready"
+            time.sleep(0.02)
+        yield test_client
+
+@pytest.fixture
+def failing_embeddings(monkeypatch):
+    """Make embedding any batch that contains the word FAIL raise."""
+    embed = fake_models.FakeOpenAIEmbeddings._embed
+    
+    def failing_embed(self, texts):
+        if any("FAIL" in text for text in texts):
+            raise RuntimeError("embedding failed")
+        return embed(self, texts)
+    
+    monkeypatch.setattr(fake_models.FakeOpenAIEmbeddings, "_embed", failing_embed)
+
+def write_paragraphs(path, paragraphs) -> None:
+    """Write a text file that the splitter cuts into one chunk per paragraph."""
+    with open(path, "w") as f:
+        f.write("\n\n".join(f"{paragraph} " + "filler " * 120 for paragraph in paragraphs)) 
\ No newline at end of file
@@ -0,0 +1,58 @@
+from app.chains.answer_cache import SemanticAnswerCache
+
+def store(cache, embedding, version, answer, scope=""):
+    cache.store(embedding, version, f"question for {answer}", answer, ["a.txt"], scope)
+
+def test_similar_question_hits():
+    cache = SemanticAnswerCache(True, 10, 0.95, 60)
+    store(cache, [1.0, 0.0], 1, "first")
+    
+    hit = cache.lookup([0.99, 0.05], 1)
+    
+    assert hit["answer"] == "first"
+    assert hit["similarity"] > 0.95
+    assert cache.lookup([0.0, 1.0], 1) is None
+
+def test_newer_collection_version_drops_every_entry():
+    cache = SemanticAnswerCache(True, 10, 0.95, 60)
+    store(cache, [1.0, 0.0], 1, "first")
+    
+    assert cache.lookup([1.0, 0.0], 2) is None
+    assert cache.get_stats()["invalidations"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+def test_answer_computed_against_an_older_version_is_not_stored():
+    """An answer whose generation overlapped a write may be stale."""
+    cache = SemanticAnswerCache(True, 10, 0.95, 60)
+    cache.lookup([1.0, 0.0], 2)
+    
+    store(cache, [1.0, 0.0], 1, "stale")
+    
+    assert cache.lookup([1.0, 0.0], 2) is None
+
+def test_entries_only_match_within_their_scope():
+    cache = SemanticAnswerCache(True, 10, 0.95, 60)
+    store(cache, [1.0, 0.0], 1, "vector", '["vector", null]')
+    store(cache, [1.0, 0.0], 1, "filtered", '["vector", {"source": "a.txt"}]')
+    
+    assert cache.lookup([1.0, 0.0], 1, '["vector", null]')["answer"] == "vector"
+    assert cache.lookup([1.0, 0.0], 1, '["vector", {"source": "a.txt"}]')["answer"] == "filtered"
+    assert cache.lookup([1.0, 0.0], 1, '["hybrid", null]') is None
+
+def test_full_cache_evicts_least_recently_used():
+    cache = SemanticAnswerCache(True, 2, 0.95, 60)
+    store(cache, [1.0, 0.0], 1, "first")
+    store(cache, [0.0, 1.0], 1, "second")
+    cache.lookup([1.0, 0.0], 1)
+    
+    store(cache, [-1.0, 0.0], 1, "third")
+    
+    assert cache.lookup([0.0, 1.0], 1) is None
+    assert cache.lookup([1.0, 0.0], 1)["answer"] == "first"
+    assert cache.get_stats()["evictions"] == 1
+
+def test_zero_max_entries_disables_the_cache():
+    cache = SemanticAnswerCache(True, 0, 0.95, 60)
+    
+    assert not cache.enabled
+    assert cache.get_stats()["entries"] == 0 
\ No newline at end of file
@@ -0,0 +1,76 @@
+from langchain.schema import Document
+from app.chains.context_builder import ContextBuilder
+
+TEXT = "".join(f"Sentence number {i} of the source document. " for i in range(40))
+
+def chunk(start: int, end: int, source: str = "a.txt", **metadata) -> Document:
+    return Document(page_content=TEXT[start:end], metadata={"source": source, "start_index": start, **metadata})
+
+def test_overlapping_chunks_are_merged_once():
+    """Text the splitter repeats between neighbouring chunks is sent once."""
+    context, stats = ContextBuilder(0).build([chunk(0, 400), chunk(300, 700)])
+    
+    assert [doc.page_content for doc in context] == [TEXT[0:700]]
+    assert stats["chunks_merged"] == 1
+    assert stats["context_tokens"] < stats["retrieved_tokens"]
+
+def test_adjacent_chunks_are_joined_across_stripped_whitespace():
+    """A gap of stripped separator whitespace is filled so offsets stay exact."""
+    context, _ = ContextBuilder(0).build([chunk(0, 100), chunk(102, 200)])
+    
+    assert [doc.page_content for doc in context] == [TEXT[0:100] + "\n\n" + TEXT[102:200]]
+
+def test_bridging_chunk_merges_three_segments():
+    """A chunk joining two taken segments absorbs both."""
+    context, stats = ContextBuilder(0).build([chunk(0, 200), chunk(400, 600), chunk(150, 450)])
+    
+    assert [doc.page_content for doc in context] == [TEXT[0:600]]
+    assert stats["chunks_merged"] == 2
+
+def test_chunks_of_other_sources_or_pages_stay_apart():
+    context, stats = ContextBuilder(0).build([
+        chunk(0, 400, page=1),
+        chunk(300, 700, page=2),
+        chunk(500, 900, source="b.txt", page=1)
+    ])
+    
+    assert len(context) == 3
+    assert stats["chunks_merged"] == 0
+
+def test_text_overlap_merges_chunks_without_offsets():
+    first = Document(page_content=TEXT[0:300], metadata={"source": "a.txt"})
+    second = Document(page_content=TEXT[200:500], metadata={"source": "a.txt"})
+    
+    context, _ = ContextBuilder(0).build([first, second])
+    
+    assert [doc.page_content for doc in context] == [TEXT[0:500]]
+
+def test_exact_duplicates_are_dropped():
+    context, stats = ContextBuilder(0).build([chunk(0, 100), chunk(0, 100, source="copy.txt")])
+    
+    assert len(context) == 1
+    assert stats["context_tokens"] * 2 == stats["retrieved_tokens"]
+
+def test_merged_passage_keeps_rank_of_most_relevant_chunk():
+    """The merged passage takes the place of its best-ranked chunk and keeps its metadata."""
+    context, _ = ContextBuilder(0).build([
+        chunk(1000, 1200),
+        chunk(0, 100, source="b.txt"),
+        chunk(1150, 1400, rank="later")
+    ])
+    
+    assert [doc.metadata["source"] for doc in context] == ["a.txt", "b.txt"]
+    assert context[0].page_content == TEXT[1000:1400]
+    assert "rank" not in context[0].metadata
+
+def test_chunks_over_the_token_budget_are_dropped():
+    """Only the new text of a chunk counts against the budget, so merges can still fit."""
+    first_tokens = ContextBuilder(0).build([chunk(0, 400)])[1]["context_tokens"]
+    builder = ContextBuilder(first_tokens + 5)
+    
+    context, stats = builder.build([chunk(0, 400), chunk(1000, 1400, source="b.txt"), chunk(390, 410)])
+    
+    assert [doc.metadata["source"] for doc in context] == ["a.txt"]
+    assert context[0].page_content == TEXT[0:410]
+    assert stats["chunks_dropped"] == 1
+    assert stats["context_tokens"] <= builder.max_tokens 
\ No newline at end of file
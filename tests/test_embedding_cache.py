@@ -0,0 +1,64 @@
+import asyncio
+from langchain.schema.embeddings import Embeddings
+from app.ingest.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as [its length, its position], recording every text sent."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+    
+    def embed_query(self, text):
+        return [float(len(text)), 0.0]
+
+def test_vectors_round_trip_through_a_restart(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    EmbeddingCache(path, 100).put_many("model", ["a", "b"], [[0.5, 1.5], [2.0, -1.0]])
+    
+    cache = EmbeddingCache(path, 100)
+    
+    assert cache.get_many("model", ["b", "c", "a"]) == [[2.0, -1.0], None, [0.5, 1.5]]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.get_stats()["entries"] == 2
+
+def test_entries_are_keyed_by_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), 100)
+    cache.put_many("small", ["text"], [[1.0]])
+    
+    assert cache.get_many("large", ["text"]) == [None]
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), 2)
+    clock = iter(range(100))
+    monkeypatch.setattr("app.ingest.embedding_cache.time.time", lambda: next(clock))
+    cache.put_many("model", ["old", "kept"], [[1.0], [2.0]])
+    cache.get_many("model", ["old"])
+    
+    cache.put_many("model", ["new"], [[3.0]])
+    
+    assert cache.get_many("model", ["old", "kept", "new"]) == [[1.0], None, [3.0]]
+    assert cache.get_stats()["evictions"] == 1
+
+def test_only_unique_misses_are_embedded(tmp_path):
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, EmbeddingCache(str(tmp_path / "embeddings.db"), 100), "model")
+    embeddings.embed_documents(["one"])
+    
+    vectors = embeddings.embed_documents(["one", "three", "three", "fives"])
+    
+    assert underlying.calls == [["one"], ["three", "fives"]]
+    assert vectors == [[3.0, 0.0], [5.0, 0.0], [5.0, 0.0], [5.0, 1.0]]
+
+def test_async_embedding_uses_the_cache(tmp_path):
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, EmbeddingCache(str(tmp_path / "embeddings.db"), 100), "model")
+    embeddings.embed_documents(["cached"])
+    
+    vectors = asyncio.run(embeddings.aembed_documents(["cached", "fresh"]))
+    
+    assert underlying.calls == [["cached"], ["fresh"]]
+    assert vectors == [[6.0, 0.0], [5.0, 0.0]] 
\ No newline at end of file
@@ -0,0 +1,90 @@
+import pytest
+from langchain.schema import Document
+from app.ingest.backends import FaissBackend
+
+INDEX_TYPES = ["flat", "ivf", "hnsw"]
+
+def vector(position, dimension=8):
+    return [1.0 if i == position else 0.0 for i in range(dimension)]
+
+def chunk(name, topic="general"):
+    return Document(page_content=name, metadata={"source": f"{name}.txt", "topic": topic})
+
+def fill(backend, count=6):
+    ids = [f"id-{i}" for i in range(count)]
+    documents = [chunk(f"doc-{i}", "even" if i % 2 == 0 else "odd") for i in range(count)]
+    backend.upsert(ids, documents, [vector(i) for i in range(count)])
+
+def names(results):
+    return [document.page_content for document, _ in results]
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_nearest_chunk_is_found(tmp_path, index_type):
+    backend = FaissBackend(str(tmp_path), index_type=index_type)
+    fill(backend)
+    
+    results = backend.search(vector(3), 2)
+    
+    assert names(results)[0] == "doc-3"
+    assert results[0][1] == pytest.approx(0.0)
+    assert len(results) == 2
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_upsert_replaces_and_delete_removes(tmp_path, index_type):
+    backend = FaissBackend(str(tmp_path), index_type=index_type)
+    fill(backend)
+    
+    backend.upsert(["id-1"], [chunk("doc-1-new")], [vector(1)])
+    backend.delete(["id-2"])
+    
+    assert backend.count() == 5
+    assert names(backend.search(vector(1), 1)) == ["doc-1-new"]
+    assert "doc-2" not in names(backend.search(vector(2), 6))
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_filter_returns_only_matching_chunks(tmp_path, index_type):
+    backend = FaissBackend(str(tmp_path), index_type=index_type)
+    fill(backend)
+    
+    results = backend.search(vector(1), 3, filter={"topic": "even"})
+    
+    assert sorted(names(results)) == ["doc-0", "doc-2", "doc-4"]
+    assert backend.search(vector(1), 3, filter={"topic": "none"}) == []
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_persisted_index_is_memory_mapped_on_reopen(tmp_path, index_type):
+    backend = FaissBackend(str(tmp_path), index_type=index_type)
+    fill(backend)
+    backend.persist()
+    
+    reopened = FaissBackend(str(tmp_path), index_type=index_type)
+    
+    assert names(reopened.search(vector(4), 1)) == ["doc-4"]
+    assert reopened.read_only
+    reopened.upsert(["id-9"], [chunk("doc-9")], [vector(7)])
+    assert not reopened.read_only
+    assert names(reopened.search(vector(7), 1)) == ["doc-9"]
+
+def test_reader_refreshes_after_the_writer_persists(tmp_path):
+    writer = FaissBackend(str(tmp_path))
+    fill(writer, 2)
+    writer.persist()
+    reader = FaissBackend(str(tmp_path), writer=False)
+    assert not reader.refresh()
+    
+    writer.upsert(["id-5"], [chunk("doc-5")], [vector(5)])
+    writer.persist()
+    
+    assert reader.refresh()
+    assert names(reader.search(vector(5), 1)) == ["doc-5"]
+
+def test_reader_rejects_writes(tmp_path):
+    writer = FaissBackend(str(tmp_path))
+    fill(writer, 2)
+    writer.persist()
+    reader = FaissBackend(str(tmp_path), writer=False)
+    
+    with pytest.raises(RuntimeError, match="read-only"):
+        reader.upsert(["id-5"], [chunk("doc-5")], [vector(5)])
+    with pytest.raises(RuntimeError, match="read-only"):
+        reader.clear() 
\ No newline at end of file
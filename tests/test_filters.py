@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+import pytest
+from langchain.schema import Document
+from app.ingest.backends import ChunkStore, matches_filter
+from app.ingest.filters import build_where, normalize_tags, tag_metadata
+
+DOCUMENTS = [
+    {"source": "a.txt", "file_type": ".txt", "page": 1, "tag:finance": True, "ingested_at": 100.0},
+    {"source": "b.pdf", "file_type": ".pdf", "page": 2, "tag:legal": True, "ingested_at": 200.0},
+    {"source": "c.md", "file_type": ".md", "page": 3, "ingested_at": 300.0},
+    {"source": "d.txt", "file_type": ".txt", "ingested_at": 400.0}
+]
+
+@pytest.fixture
+def store(tmp_path):
+    chunk_store = ChunkStore(str(tmp_path / "chunks.db"))
+    ids = [metadata["source"] for metadata in DOCUMENTS]
+    documents = [Document(page_content=metadata["source"], metadata=metadata) for metadata in DOCUMENTS]
+    row_ids, _ = chunk_store.write(ids, documents)
+    return chunk_store, dict(zip(row_ids, ids))
+
+def select(store, where):
+    chunk_store, sources = store
+    return sorted(sources[row_id] for row_id in chunk_store.select(where))
+
+def test_build_where_without_scopes_is_none():
+    assert build_where() is None
+    assert build_where(sources=[], tags=[" "]) is None
+
+def test_build_where_single_scope_is_not_wrapped():
+    assert build_where(sources=["a.txt"]) == {"source": {"$in": ["a.txt"]}}
+    assert build_where(tags=["Finance"]) == {"tag:finance": True}
+
+def test_build_where_combines_scopes():
+    after = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    
+    where = build_where(file_types=["PDF", ".Txt"], tags=["legal", "finance"], ingested_after=after)
+    
+    assert where == {"$and": [
+        {"file_type": {"$in": [".pdf", ".txt"]}},
+        {"$or": [{"tag:legal": True}, {"tag:finance": True}]},
+        {"ingested_at": {"$gte": after.timestamp()}}
+    ]}
+
+def test_tags_are_normalized():
+    assert normalize_tags([" Finance", "finance", "", "Legal "]) == ["finance", "legal"]
+    assert tag_metadata(["Finance"]) == {"tag:finance": True}
+
+@pytest.mark.parametrize("where, expected", [
+    ({"source": "a.txt"}, ["a.txt"]),
+    ({"source": {"$in": ["a.txt", "c.md"]}}, ["a.txt", "c.md"]),
+    ({"file_type": {"$nin": [".txt"]}}, ["b.pdf", "c.md"]),
+    ({"page": {"$ne": 1}}, ["b.pdf", "c.md", "d.txt"]),
+    ({"page": {"$gte": 2, "$lt": 3}}, ["b.pdf"]),
+    ({"ingested_at": {"$gt": 150.0, "$lte": 300.0}}, ["b.pdf", "c.md"]),
+    ({"$or": [{"tag:finance": True}, {"tag:legal": True}]}, ["a.txt", "b.pdf"]),
+    ({"$and": [{"file_type": ".txt"}, {"ingested_at": {"$gte": 200.0}}]}, ["d.txt"]),
+    ({"$and": []}, ["a.txt", "b.pdf", "c.md", "d.txt"]),
+    (build_where(file_types=["txt", "md"], ingested_before=datetime.fromtimestamp(300.0, timezone.utc)), ["a.txt", "c.md"])
+])
+def test_where_sql_matches_matches_filter(store, where, expected):
+    """ChunkStore's SQL translation selects exactly what matches_filter accepts."""
+    assert select(store, where) == expected
+    assert sorted(metadata["source"] for metadata in DOCUMENTS if matches_filter(metadata, where)) == expected
+
+def test_where_sql_follows_rewritten_chunks(store):
+    """Replaced chunks are selected by their new metadata only."""
+    chunk_store, sources = store
+    row_ids, replaced = chunk_store.write(["a.txt"], [Document(page_content="a", metadata={"source": "a.txt", "page": 9})])
+    sources.update(zip(row_ids, ["a.txt"]))
+    
+    assert len(replaced) == 1
+    assert select(store, {"page": 9}) == ["a.txt"]
+    assert select(store, {"page": 1}) == []
+
+def test_unsupported_operator_raises(store):
+    with pytest.raises(ValueError):
+        select(store, {"page": {"$regex": "1"}})
+    with pytest.raises(ValueError):
+        matches_filter({"page": 1}, {"page": {"$regex": "1"}}) 
\ No newline at end of file
@@ -0,0 +1,80 @@
+import os
+import pytest
+from conftest import write_paragraphs
+from app.ingest.incremental import IncrementalIngestor
+from app.ingest.manifest import IngestManifest
+from app.ingest.vector_store import vector_store
+from app.utils.document_loader import document_loader
+
+@pytest.fixture
+def ingestor(tmp_path):
+    return IncrementalIngestor(vector_store, IngestManifest(str(tmp_path / "manifest.db")), document_loader)
+
+@pytest.fixture
+def directory(tmp_path):
+    path = tmp_path / "docs"
+    path.mkdir()
+    return path
+
+def test_only_changed_files_are_reindexed(ingestor, directory):
+    write_paragraphs(directory / "a.txt", ["apple", "apricot"])
+    write_paragraphs(directory / "b.txt", ["banana"])
+    first = ingestor.sync_directory(str(directory))
+    assert (len(first.added), first.chunks_added) == (2, 3)
+    count = vector_store.backend.count()
+    
+    write_paragraphs(directory / "a.txt", ["apple", "avocado"])
+    second = ingestor.sync_directory(str(directory))
+    
+    assert second.updated == [str(directory / "a.txt")]
+    assert second.unchanged == [str(directory / "b.txt")]
+    assert (second.chunks_added, second.chunks_removed) == (2, 1)
+    assert vector_store.backend.count() == count
+
+def test_touched_file_with_the_same_content_is_not_reindexed(ingestor, directory):
+    write_paragraphs(directory / "a.txt", ["cherry"])
+    ingestor.sync_directory(str(directory))
+    stat = os.stat(directory / "a.txt")
+    os.utime(directory / "a.txt", (stat.st_atime, stat.st_mtime + 10))
+    
+    result = ingestor.sync_directory(str(directory))
+    
+    assert result.unchanged == [str(directory / "a.txt")]
+    assert result.chunks_added == 0
+
+def test_deleted_file_loses_its_chunks(ingestor, directory):
+    write_paragraphs(directory / "a.txt", ["damson", "date"])
+    ingestor.sync_directory(str(directory))
+    count = vector_store.backend.count()
+    
+    os.remove(directory / "a.txt")
+    result = ingestor.sync_directory(str(directory))
+    
+    assert result.removed == [str(directory / "a.txt")]
+    assert vector_store.backend.count() == count - 2
+    assert ingestor.manifest.get(str(directory / "a.txt")) is None
+
+def test_file_failing_partway_leaves_no_chunks(ingestor, directory, failing_embeddings):
+    write_paragraphs(directory / "bad.txt", [f"elderberry {i}" for i in range(10)] + ["FAIL"])
+    write_paragraphs(directory / "good.txt", ["fig"])
+    count = vector_store.backend.count()
+    
+    result = ingestor.sync_directory(str(directory))
+    
+    assert list(result.failed) == [str(directory / "bad.txt")]
+    assert result.added == [str(directory / "good.txt")]
+    assert vector_store.backend.count() == count + 1
+    assert ingestor.manifest.get(str(directory / "bad.txt")) is None
+
+def test_update_failing_partway_keeps_the_previous_version(ingestor, directory, failing_embeddings):
+    write_paragraphs(directory / "a.txt", ["grape", "guava"])
+    ingestor.sync_directory(str(directory))
+    chunk_ids = ingestor.manifest.get(str(directory / "a.txt"))["chunk_ids"]
+    count = vector_store.backend.count()
+    
+    write_paragraphs(directory / "a.txt", ["grape", "gooseberry", "greengage", "grapefruit", "galia", "FAIL"])
+    result = ingestor.sync_directory(str(directory))
+    
+    assert list(result.failed) == [str(directory / "a.txt")]
+    assert vector_store.backend.count() == count
+    assert ingestor.manifest.get(str(directory / "a.txt"))["chunk_ids"] == chunk_ids 
\ No newline at end of file
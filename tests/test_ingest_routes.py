@@ -0,0 +1,63 @@
+import pytest
+
+from app.ingest.jobs import job_manager
+from app.utils.config import settings
+
+def test_upload_to_a_full_queue_is_rejected_with_429(client, monkeypatch):
+    monkeypatch.setattr(job_manager, "max_pending", 0)
+    
+    response = client.post("/ingest/upload", files={"file": ("full.txt", b"queue is full", "text/plain")})
+    
+    assert response.status_code == 429
+    assert "Too many pending ingestion jobs" in response.json()["detail"]
+
+def test_batch_reports_a_full_queue_per_file(client, monkeypatch):
+    monkeypatch.setattr(job_manager, "max_pending", 0)
+    
+    response = client.post("/ingest/upload/batch", files=[
+        ("files", ("one.txt", b"first file", "text/plain")),
+        ("files", ("two.exe", b"second file", "application/octet-stream"))
+    ])
+    
+    assert response.status_code == 202
+    assert [result["status"] for result in response.json()] == ["queue_full", "error"]
+
+def test_upload_is_queued(client):
+    response = client.post("/ingest/upload", files={"file": ("queued.txt", b"queued upload", "text/plain")})
+    
+    assert response.status_code == 202
+    assert response.json()["job_id"]
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    monkeypatch.setattr(settings, "MAX_BATCH_UPLOAD_SIZE", 4096)
+
+@pytest.mark.parametrize("path", ["/ingest/upload", "/ingest/upload/batch"])
+def test_body_over_the_limit_is_rejected_from_content_length(client, small_limits, path):
+    field = "files" if path.endswith("batch") else "file"
+    
+    response = client.post(path, files=[(field, ("big.txt", b"x" * 100_000, "text/plain"))])
+    
+    assert response.status_code == 413
+
+@pytest.mark.parametrize("path", ["/ingest/upload", "/ingest/upload/batch"])
+def test_streamed_body_over_the_limit_is_rejected(client, small_limits, path):
+    field = "files" if path.endswith("batch") else "file"
+    boundary = "limit-test"
+    head = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"big.txt\"\r\n"
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode()
+    body = iter([head] + [b"x" * 10_000] * 10 + [f"\r\n--{boundary}--\r\n".encode()])
+    
+    response = client.post(path, content=body, headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    
+    assert response.status_code == 413
+
+def test_batch_within_its_limit_reports_an_oversized_file(client, small_limits):
+    response = client.post("/ingest/upload/batch", files=[("files", ("big.txt", b"x" * 2048, "text/plain"))])
+    
+    assert response.status_code == 202
+    assert response.json()[0]["status"] == "error"
+    assert "File too large" in response.json()[0]["message"] 
\ No newline at end of file
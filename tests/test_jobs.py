@@ -0,0 +1,125 @@
+import os
+import time
+import pytest
+from conftest import write_paragraphs
+from app.ingest.jobs import CANCELLED, COMPLETED, FAILED, QUEUED, JobManager, JobQueueFullError, upload_manifest_path
+from app.ingest.manifest import hash_file, ingest_manifest
+from app.ingest.vector_store import vector_store
+
+def wait_for(manager, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.status not in (QUEUED, "running"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+@pytest.fixture
+def manager(tmp_path):
+    job_manager = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10)
+    yield job_manager
+    job_manager.shutdown()
+
+def submit_upload(manager, tmp_path, paragraphs, name="doc.txt", document_id=None):
+    """Spool a file the way the upload route does and queue it."""
+    job_id = manager.new_job_id()
+    path = manager.spool_path(job_id, name)
+    write_paragraphs(path, paragraphs)
+    return manager.submit_upload(job_id, path, name, hash_file(path), document_id=document_id)
+
+def test_upload_is_indexed_and_recorded(manager, tmp_path):
+    job = wait_for(manager, submit_upload(manager, tmp_path, ["alpha", "beta", "gamma"]).id)
+    
+    assert job.status == COMPLETED
+    assert job.result["chunk_count"] == 3
+    entry = ingest_manifest.get(upload_manifest_path(job.params["content_hash"]))
+    assert len(entry["chunk_ids"]) == 3
+    # Spooled files are removed once the job can no longer be resumed
+    assert not os.path.exists(job.params["file_path"])
+
+def test_reingesting_the_same_content_overwrites_its_chunks(manager, tmp_path):
+    """Chunk IDs come from the manifest key, not from the per-job spool path."""
+    first = wait_for(manager, submit_upload(manager, tmp_path, ["delta", "epsilon"]).id)
+    key = upload_manifest_path(first.params["content_hash"])
+    chunk_ids = ingest_manifest.get(key)["chunk_ids"]
+    count = vector_store.backend.count()
+    second = wait_for(manager, submit_upload(manager, tmp_path, ["delta", "epsilon"], name="copy.txt").id)
+    
+    assert (first.status, second.status) == (COMPLETED, COMPLETED)
+    assert ingest_manifest.get(key)["chunk_ids"] == chunk_ids
+    assert second.result["chunks_replaced"] == 0
+    assert vector_store.backend.count() == count
+
+def test_failed_upload_leaves_no_partial_chunks(manager, tmp_path, failing_embeddings):
+    count = vector_store.backend.count()
+    paragraphs = [f"partial {i}" for i in range(10)] + ["FAIL"]
+    
+    job = wait_for(manager, submit_upload(manager, tmp_path, paragraphs).id)
+    
+    assert job.status == FAILED
+    assert vector_store.backend.count() == count
+    assert ingest_manifest.get(upload_manifest_path(job.params["content_hash"])) is None
+
+def test_failed_replacement_keeps_the_previous_version(manager, tmp_path, failing_embeddings):
+    first = wait_for(manager, submit_upload(manager, tmp_path, ["zeta", "eta"], document_id="doc-1").id)
+    count = vector_store.backend.count()
+    
+    second = wait_for(manager, submit_upload(
+        manager, tmp_path, ["zeta", "theta", "iota", "kappa", "lambda", "FAIL"], document_id="doc-1"
+    ).id)
+    
+    assert (first.status, second.status) == (COMPLETED, FAILED)
+    assert vector_store.backend.count() == count
+    assert len(ingest_manifest.get(upload_manifest_path("", "doc-1"))["chunk_ids"]) == 2
+
+def test_jobs_recorded_by_another_process_are_resumed(tmp_path):
+    """An API worker only records jobs; the ingest process picks them up when it starts."""
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    write_paragraphs(directory / "a.txt", ["resumed"])
+    submitter = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10, role="submit")
+    job = submitter.submit_directory(str(directory))
+    
+    worker = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10)
+    try:
+        assert submitter.get(job.id).status == QUEUED
+        worker.start()
+        assert wait_for(worker, job.id).status == COMPLETED
+        assert wait_for(submitter, job.id).result["files_added"] == 1
+    finally:
+        worker.shutdown()
+
+def test_cancelled_job_is_not_resumed(tmp_path):
+    submitter = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10, role="submit")
+    job = submitter.submit_clear()
+    
+    worker = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10)
+    try:
+        assert worker.cancel(job.id).status == CANCELLED
+        worker.start()
+        assert worker.get(job.id).status == CANCELLED
+        assert not worker.jobs
+    finally:
+        worker.shutdown()
+
+def test_cancel_request_from_an_api_worker_reaches_the_ingest_process(tmp_path):
+    submitter = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10, role="submit")
+    job = submitter.submit_clear()
+    submitter.cancel(job.id)
+    
+    worker = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 10)
+    try:
+        worker.start()
+        assert worker.get(job.id).status == CANCELLED
+    finally:
+        worker.shutdown()
+
+def test_full_queue_rejects_new_jobs(tmp_path):
+    submitter = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "spool"), 1, 2, role="submit")
+    submitter.submit_clear()
+    submitter.submit_clear()
+    
+    with pytest.raises(JobQueueFullError):
+        submitter.submit_clear()
+    assert submitter.get_stats()["pending"] == 2 
\ No newline at end of file
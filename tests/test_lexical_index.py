@@ -0,0 +1,47 @@
+import pytest
+from langchain.schema import Document
+from app.ingest.lexical_index import LexicalIndex
+
+@pytest.fixture
+def index(tmp_path):
+    lexical_index = LexicalIndex(str(tmp_path / "lexical.db"))
+    documents = [
+        Document(page_content=f"Error E{1000 + i} in the payment service", metadata={"source": f"log{i % 3}.txt", "n": i})
+        for i in range(30)
+    ]
+    lexical_index.upsert([f"c{i}" for i in range(30)], documents)
+    return lexical_index
+
+def test_exact_identifier_is_found(index):
+    results = index.search("what does E1007 mean?", 3)
+    
+    assert results[0][0].metadata["n"] == 7
+    assert results[0][1] < 0
+
+def test_filter_applies_to_all_k_results(index):
+    """The filter is applied after ranking, fetching more rows until k matches are found."""
+    results = index.search("payment error", 5, {"source": "log2.txt"})
+    
+    assert len(results) == 5
+    assert all(doc.metadata["source"] == "log2.txt" for doc, _ in results)
+
+def test_filter_with_few_matches_returns_them_all(index):
+    results = index.search("payment", 10, {"$and": [{"source": "log1.txt"}, {"n": {"$gte": 25}}]})
+    
+    assert sorted(doc.metadata["n"] for doc, _ in results) == [25, 28]
+
+def test_filter_without_matches_returns_nothing(index):
+    assert index.search("payment", 5, {"source": "missing.txt"}) == []
+
+def test_query_operators_are_taken_literally(index):
+    assert index.search('"payment" OR NEAR(', 2)
+    assert index.search("?!", 2) == []
+
+def test_upsert_replaces_and_delete_removes(index):
+    index.upsert(["c7"], [Document(page_content="Renamed refund handler", metadata={"source": "log1.txt", "n": 7})])
+    index.delete(["c8"])
+    
+    assert index.search("E1007", 1) == []
+    assert index.search("refund", 1)[0][0].metadata["n"] == 7
+    assert index.search("E1008", 1) == []
+    assert index.count() == 29 
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import pytest
+from app.utils.metrics import MetricsRegistry
+
+@pytest.fixture(scope="module")
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def define(registry):
+    """Register the same metrics every process of the app would."""
+    return (
+        registry.counter("requests_total", "Requests", ["route"]),
+        registry.gauge("in_flight", "Requests in flight"),
+        registry.gauge("documents", "Documents in the shared index", aggregate="max"),
+        registry.histogram("latency_seconds", "Latency", buckets=[0.1, 1.0])
+    )
+
+def write_other_process(registry, pid):
+    """Write a snapshot as another worker would have."""
+    requests, in_flight, documents, latency = define(registry)
+    requests.inc(3, route="/chat")
+    in_flight.set(5)
+    documents.set(40)
+    latency.observe(0.5)
+    snapshot = registry.collect()
+    registry._write(dict(snapshot, pid=pid))
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    _, _, _, latency = define(registry)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+    
+    lines = registry.render().splitlines()
+    
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_sum 5.55" in lines
+    assert "latency_seconds_count 3" in lines
+
+def test_exited_processes_count_towards_totals_but_not_gauges(tmp_path, exited_pid):
+    write_other_process(MetricsRegistry(str(tmp_path)), exited_pid)
+    registry = MetricsRegistry(str(tmp_path))
+    requests, in_flight, documents, latency = define(registry)
+    requests.inc(2, route="/chat")
+    in_flight.set(1)
+    documents.set(42)
+    latency.observe(0.05)
+    
+    lines = registry.render().splitlines()
+    
+    assert 'requests_total{route="/chat"} 5' in lines
+    assert "in_flight 1" in lines
+    assert "latency_seconds_count 2" in lines
+    assert "documents 42" in lines
+
+def test_gauges_of_live_processes_are_combined(tmp_path):
+    write_other_process(MetricsRegistry(str(tmp_path)), os.getppid())
+    registry = MetricsRegistry(str(tmp_path))
+    _, in_flight, documents, _ = define(registry)
+    in_flight.set(1)
+    documents.set(38)
+    
+    lines = registry.render().splitlines()
+    
+    assert "in_flight 6" in lines
+    # Shared state is reported once, not summed over processes
+    assert "documents 40" in lines
+
+def test_retired_snapshots_keep_totals_and_drop_gauges(tmp_path, exited_pid):
+    write_other_process(MetricsRegistry(str(tmp_path)), exited_pid)
+    write_other_process(MetricsRegistry(str(tmp_path)), exited_pid)
+    registry = MetricsRegistry(str(tmp_path))
+    define(registry)
+    
+    registry.retire(exited_pid)
+    
+    assert sorted(os.listdir(tmp_path)) == ["metrics_retired.json"]
+    retired = registry._read(str(tmp_path / "metrics_retired.json"))
+    assert retired["instance"] == "retired"
+    assert "in_flight" not in retired["metrics"]
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/chat"} 6' in lines
+    assert "latency_seconds_count 2" in lines
+
+def test_retiring_again_adds_to_the_retired_totals(tmp_path, exited_pid):
+    registry = MetricsRegistry(str(tmp_path))
+    write_other_process(MetricsRegistry(str(tmp_path)), exited_pid)
+    registry.retire(exited_pid)
+    write_other_process(MetricsRegistry(str(tmp_path)), exited_pid)
+    
+    registry.retire(exited_pid)
+    
+    assert 'requests_total{route="/chat"} 6' in registry.render().splitlines()
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.export_stats("cache", lambda: {"hits": 7, "size": 3}, counters={"hits": "Hits"}, gauges={"size": "Size"})
+    registry.export_stats("unbuilt", lambda: None, counters={"hits": "Hits"})
+    
+    @registry.collector
+    def broken():
+        raise RuntimeError("component failed")
+    
+    lines = registry.render().splitlines()
+    
+    assert "cache_hits_total 7" in lines
+    assert "cache_size 3" in lines
+    assert not any(line.startswith("unbuilt_hits_total ") for line in lines) 
\ No newline at end of file
@@ -0,0 +1,32 @@
+import os
+from app.utils.document_loader import DocumentLoader
+
+def write_texts(directory, names):
+    for name in names:
+        (directory / name).write_text(f"contents of {name}")
+    return [str(directory / name) for name in names]
+
+def results_by_name(results):
+    return {os.path.basename(file_path): (documents, error) for file_path, documents, error in results}
+
+def test_files_are_parsed_in_process_with_one_worker(tmp_path):
+    paths = write_texts(tmp_path, ["a.txt", "b.txt"]) + [str(tmp_path / "missing.txt")]
+    
+    results = results_by_name(DocumentLoader.parse_files(paths, workers=1))
+    
+    assert results["a.txt"][0][0].page_content == "contents of a.txt"
+    assert results["b.txt"][1] is None
+    assert results["missing.txt"] == ([], f"File not found: {tmp_path / 'missing.txt'}")
+
+def test_stuck_files_time_out_and_the_rest_run_on_a_new_pool(tmp_path):
+    # Opening a FIFO without a writer blocks, like a parser that never returns
+    os.mkfifo(tmp_path / "stuck-1.txt")
+    os.mkfifo(tmp_path / "stuck-2.txt")
+    paths = [str(tmp_path / "stuck-1.txt"), str(tmp_path / "stuck-2.txt")] + write_texts(tmp_path, ["a.txt", "b.txt"])
+    
+    results = results_by_name(DocumentLoader.parse_files(paths, workers=2, timeout=4))
+    
+    assert results["stuck-1.txt"] == ([], "Parsing timed out after 4s")
+    assert results["stuck-2.txt"] == ([], "Parsing timed out after 4s")
+    assert results["a.txt"][0][0].page_content == "contents of a.txt"
+    assert results["b.txt"][0][0].page_content == "contents of b.txt" 
\ No newline at end of file
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+from app.ingest.quantized import QuantizedBackend
+
+DTYPES = ["float16", "int8"]
+
+def random_vectors(count, dimension=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+
+def fill(backend, vectors):
+    ids = [f"id-{i}" for i in range(len(vectors))]
+    documents = [
+        Document(page_content=f"doc-{i}", metadata={"source": f"{i}.txt", "topic": "even" if i % 2 == 0 else "odd"})
+        for i in range(len(vectors))
+    ]
+    backend.upsert(ids, documents, vectors.tolist())
+
+def names(results):
+    return [document.page_content for document, _ in results]
+
+def exact_nearest(vectors, query, k):
+    return [f"doc-{i}" for i in np.argsort(((vectors - query) ** 2).sum(axis=1))[:k]]
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_rescored_search_matches_exact_search(tmp_path, dtype):
+    vectors = random_vectors(200)
+    backend = QuantizedBackend(str(tmp_path), dtype=dtype)
+    fill(backend, vectors)
+    query = random_vectors(1, seed=1)[0]
+    
+    results = backend.search(query.tolist(), 5)
+    
+    assert names(results) == exact_nearest(vectors, query, 5)
+    assert results[0][1] == pytest.approx(float(((vectors - query) ** 2).sum(axis=1).min()), rel=1e-4)
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_search_many_answers_each_query(tmp_path, dtype):
+    vectors = random_vectors(50)
+    backend = QuantizedBackend(str(tmp_path), dtype=dtype)
+    fill(backend, vectors)
+    
+    results = backend.search_many([vectors[3].tolist(), vectors[7].tolist()], 1)
+    
+    assert [names(result) for result in results] == [["doc-3"], ["doc-7"]]
+
+def test_upsert_replaces_and_delete_removes(tmp_path):
+    vectors = random_vectors(10)
+    backend = QuantizedBackend(str(tmp_path))
+    fill(backend, vectors)
+    
+    backend.upsert(["id-1"], [Document(page_content="doc-1-new", metadata={"source": "1.txt"})], [vectors[1].tolist()])
+    backend.delete(["id-2"])
+    
+    assert backend.count() == 9
+    assert names(backend.search(vectors[1].tolist(), 1)) == ["doc-1-new"]
+    assert "doc-2" not in names(backend.search(vectors[2].tolist(), 10))
+
+def test_filter_returns_only_matching_chunks(tmp_path):
+    vectors = random_vectors(10)
+    backend = QuantizedBackend(str(tmp_path))
+    fill(backend, vectors)
+    
+    results = backend.search(vectors[1].tolist(), 10, filter={"topic": "even"})
+    
+    assert sorted(names(results)) == [f"doc-{i}" for i in (0, 2, 4, 6, 8)]
+    assert backend.search(vectors[1].tolist(), 3, filter={"topic": "none"}) == []
+
+def test_persisted_index_is_compacted_and_reopened(tmp_path):
+    vectors = random_vectors(10)
+    backend = QuantizedBackend(str(tmp_path))
+    fill(backend, vectors)
+    backend.delete([f"id-{i}" for i in range(5)])
+    backend.persist()
+    assert backend.get_stats()["vectors"] == 5
+    
+    reopened = QuantizedBackend(str(tmp_path))
+    
+    assert reopened.read_only
+    assert names(reopened.search(vectors[7].tolist(), 1)) == ["doc-7"]
+    assert sorted(names(reopened.search(vectors[0].tolist(), 10))) == [f"doc-{i}" for i in range(5, 10)]
+
+def test_reader_refreshes_after_the_writer_persists(tmp_path):
+    vectors = random_vectors(6)
+    writer = QuantizedBackend(str(tmp_path))
+    fill(writer, vectors[:3])
+    writer.persist()
+    reader = QuantizedBackend(str(tmp_path), writer=False)
+    assert not reader.refresh()
+    
+    writer.upsert(["id-5"], [Document(page_content="doc-5", metadata={"source": "5.txt"})], [vectors[5].tolist()])
+    writer.persist()
+    
+    assert reader.refresh()
+    assert names(reader.search(vectors[5].tolist(), 1)) == ["doc-5"]
+    with pytest.raises(RuntimeError, match="read-only"):
+        reader.delete(["id-5"]) 
\ No newline at end of file
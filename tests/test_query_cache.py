@@ -0,0 +1,67 @@
+import pytest
+from app.ingest import query_cache
+from app.ingest.query_cache import LRUCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_get_returns_stored_value_and_counts_hits():
+    cache = LRUCache(10, 1000, 60)
+    cache.put("a", [1.0], 8)
+    
+    assert cache.get("a") == [1.0]
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(10, 1000, 60)
+    cache.put("a", "value", 8)
+    
+    clock[0] += 59
+    assert cache.get("a") == "value"
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.bytes == 0
+
+def test_entry_limit_evicts_least_recently_used():
+    cache = LRUCache(2, 1000, 60)
+    cache.put("a", 1, 1)
+    cache.put("b", 2, 1)
+    cache.get("a")
+    cache.put("c", 3, 1)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_byte_limit_evicts_until_it_holds():
+    cache = LRUCache(100, 100, 60)
+    for key in "abcd":
+        cache.put(key, key, 30)
+    
+    cache.put("e", "e", 60)
+    
+    assert [key for key in "abcde" if cache.get(key) is not None] == ["d", "e"]
+    assert cache.bytes == 90
+    assert cache.evictions == 3
+
+def test_replacing_a_key_updates_its_size():
+    cache = LRUCache(10, 100, 60)
+    cache.put("a", 1, 40)
+    cache.put("a", 2, 10)
+    
+    assert cache.bytes == 10
+    assert cache.get("a") == 2
+
+def test_values_larger_than_the_cache_are_not_stored():
+    cache = LRUCache(10, 100, 60)
+    cache.put("a", 1, 50)
+    cache.put("big", 2, 101)
+    
+    assert cache.get("big") is None
+    assert cache.get("a") == 1 
\ No newline at end of file
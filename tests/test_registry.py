@@ -0,0 +1,90 @@
+import time
+from app.utils.registry import ComponentRegistry, registry
+
+class Component:
+    def __init__(self):
+        self.value = 1
+
+def test_component_is_built_on_first_use():
+    components = ComponentRegistry()
+    built = []
+    component = components.register("component", lambda: built.append(1) or Component())
+    assert built == []
+    assert components.get_status()["components"] == {"component": "pending"}
+    
+    component.value = 2
+    
+    assert component.value == 2
+    assert built == [1]
+    assert components.built
+    assert components.get_status()["components"] == {"component": "ready"}
+
+def test_failed_build_is_recorded_and_retried():
+    components = ComponentRegistry()
+    attempts = []
+    
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("index unreadable")
+        return Component()
+    
+    component = components.register("component", factory)
+    components.build_all()
+    assert components.get_status()["components"] == {"component": "failed"}
+    assert components.errors == {"component": "index unreadable"}
+    
+    assert component.value == 1
+    assert components.errors == {}
+
+def test_build_times_exclude_nested_builds():
+    components = ComponentRegistry()
+    
+    def slow(seconds, dependency=None):
+        def factory():
+            if dependency:
+                components.get(dependency)
+            time.sleep(seconds)
+            return Component()
+        return factory
+    
+    components.register("embedder", slow(0.05))
+    components.register("vector_store", slow(0.01, dependency="embedder"))
+    components.build_all()
+    
+    assert components.timings["embedder"] >= 50
+    assert components.timings["vector_store"] < 40
+
+def test_routes_answer_503_while_starting(client, monkeypatch):
+    monkeypatch.setattr(ComponentRegistry, "built", property(lambda self: False))
+    monkeypatch.setattr(registry, "starting", True)
+    monkeypatch.setattr(registry, "ready", False)
+    
+    response = client.get("/ingest/stats")
+    
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").status_code == 200
+
+def test_routes_answer_503_when_a_failed_component_cannot_be_built(client, monkeypatch):
+    monkeypatch.setattr(ComponentRegistry, "built", property(lambda self: False))
+    
+    def build_missing():
+        raise RuntimeError("index unreadable")
+    
+    monkeypatch.setattr(registry, "build_missing", build_missing)
+    
+    response = client.get("/ingest/stats")
+    
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Components unavailable: index unreadable"
+
+def test_ready_reports_every_component(client):
+    response = client.get("/ready")
+    
+    assert response.status_code == 200
+    status = response.json()
+    assert status["ready"]
+    assert set(status["components"].values()) == {"ready"}
+    assert "start:vector_store" in status["startup_ms"] 
\ No newline at end of file
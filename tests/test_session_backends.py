@@ -0,0 +1,103 @@
+import time
+import pytest
+from app.memory.backends import SQLiteSessionBackend
+from app.memory.session_memory import MemoryManager
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+@pytest.fixture
+def backends(db_path):
+    """Open backends on one database, like workers sharing SESSION_DB_PATH."""
+    opened = []
+    
+    def open_backend(**kwargs):
+        backend = SQLiteSessionBackend(db_path, **kwargs)
+        opened.append(backend)
+        return backend
+    
+    yield open_backend
+    for backend in opened:
+        backend.shutdown()
+
+def contents(session):
+    return [record.content for record in session.messages]
+
+def test_messages_survive_a_restart(backends):
+    manager = MemoryManager(backend=backends())
+    manager.get_session("s").add_messages([("user", "question"), ("agent", "answer")])
+    manager.shutdown()
+    
+    restarted = MemoryManager(backend=backends())
+    
+    assert contents(restarted.get_session("s")) == ["question", "answer"]
+
+def test_cached_session_is_reloaded_after_another_worker_writes(backends):
+    worker_a = MemoryManager(backend=backends())
+    worker_b = MemoryManager(backend=backends())
+    assert contents(worker_b.get_session("s")) == []
+    
+    worker_a.get_session("s").add_message("user", "from a")
+    worker_a.backend.flush()
+    
+    assert contents(worker_b.get_session("s")) == ["from a"]
+    assert worker_b.get_stats()["cache_reloads"] == 1
+    worker_b.get_session("s")
+    assert worker_b.get_stats()["cache_hits"] == 1
+
+def test_cleared_session_is_not_served_from_another_workers_cache(backends):
+    worker_a = MemoryManager(backend=backends())
+    worker_b = MemoryManager(backend=backends())
+    worker_a.get_session("s").add_message("user", "old")
+    worker_a.backend.flush()
+    assert contents(worker_b.get_session("s")) == ["old"]
+    
+    # Recreated with as many messages as the copy worker b has cached
+    worker_a.clear_session("s")
+    worker_a.get_session("s").add_message("user", "new")
+    worker_a.backend.flush()
+    
+    assert contents(worker_b.get_session("s")) == ["new"]
+
+def test_messages_beyond_the_cap_are_trimmed(backends):
+    manager = MemoryManager(backend=backends(max_messages=2))
+    manager.get_session("s").add_messages([("user", "one"), ("agent", "two"), ("user", "three")])
+    manager.shutdown()
+    
+    assert backends().load("s").messages == [("agent", "two"), ("user", "three")]
+
+def test_idle_sessions_expire(backends):
+    backend = backends(session_ttl=60)
+    backend.append("s", "user", "hello")
+    backend.flush()
+    backend._conn.execute("UPDATE sessions SET last_used = ?", (time.time() - 120,))
+    backend._last_expiry = 0
+    
+    backend.flush()
+    
+    assert backend.count() == 0
+    assert backend.load("s").messages == []
+
+def test_summary_persists_and_skips_the_messages_it_covers(backends):
+    manager = MemoryManager(backend=backends(), window_tokens=1)
+    session = manager.get_session("s")
+    session.add_messages([("user", "first question"), ("agent", "first answer"), ("user", "second question")])
+    session.apply_summary("they asked a first question", session.pending_summary(), session.epoch)
+    manager.shutdown()
+    
+    restarted = MemoryManager(backend=backends(), window_tokens=1).get_session("s")
+    
+    assert restarted.summary == "they asked a first question"
+    assert contents(restarted) == ["second question"]
+
+def test_ephemeral_session_is_never_written(backends):
+    manager = MemoryManager(backend=backends())
+    manager.mark_ephemeral("batch-1-0")
+    manager.get_session("batch-1-0").add_message("user", "throwaway")
+    manager.backend.flush()
+    
+    manager.clear_session("batch-1-0")
+    
+    assert manager.backend.count() == 0
+    assert "batch-1-0" not in manager.sessions 
\ No newline at end of file
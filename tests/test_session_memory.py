@@ -0,0 +1,76 @@
+import time
+from app.memory.session_memory import MemoryManager, SessionMemory
+
+def test_least_recently_used_session_is_evicted():
+    manager = MemoryManager(max_sessions=2)
+    manager.get_session("a")
+    manager.get_session("b")
+    manager.get_session("a")
+    
+    manager.get_session("c")
+    
+    assert list(manager.sessions) == ["a", "c"]
+    assert manager.get_stats()["evicted"] == 1
+
+def test_idle_sessions_expire(monkeypatch):
+    manager = MemoryManager(session_ttl=60)
+    manager.get_session("idle")
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 120)
+    
+    manager.get_session("active")
+    
+    assert list(manager.sessions) == ["active"]
+    assert manager.get_stats()["expired"] == 1
+
+def test_oldest_messages_are_dropped_beyond_the_cap():
+    manager = MemoryManager(max_messages=2)
+    session = manager.get_session("s")
+    
+    session.add_messages([("user", "one"), ("agent", "two"), ("user", "three")])
+    
+    assert [record.content for record in session.messages] == ["two", "three"]
+    assert manager.get_stats()["messages_trimmed"] == 1
+    assert manager.total_bytes == session.size
+
+def test_byte_cap_evicts_other_sessions_before_trimming_the_active_one():
+    message = "x" * 1000
+    manager = MemoryManager()
+    manager.get_session("old").add_message("user", message)
+    size = manager.total_bytes
+    manager.max_bytes = 2 * size
+    
+    active = manager.get_session("active")
+    active.add_messages([("user", message), ("agent", message)])
+    assert list(manager.sessions) == ["active"]
+    assert manager.get_stats()["evicted_for_bytes"] == 1
+    
+    active.add_message("user", message)
+    assert len(active.messages) == 2
+    assert manager.total_bytes <= manager.max_bytes
+
+def test_evicted_session_no_longer_counts_towards_the_store():
+    manager = MemoryManager(max_sessions=1)
+    evicted = manager.get_session("a")
+    manager.get_session("b")
+    
+    evicted.add_message("user", "late write")
+    
+    assert evicted.detached
+    assert manager.total_bytes == 0
+
+def test_clear_session_releases_its_bytes():
+    manager = MemoryManager()
+    manager.get_session("s").add_message("user", "hello")
+    
+    manager.clear_session("s")
+    
+    assert manager.sessions == {}
+    assert manager.total_bytes == 0
+
+def test_unknown_roles_are_ignored():
+    session = SessionMemory("s")
+    
+    session.add_messages([("system", "ignored"), ("user", "kept")])
+    
+    assert [record.role for record in session.messages] == ["user"] 
\ No newline at end of file
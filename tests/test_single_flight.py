@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+    
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+    
+    async def main():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+    
+    results = asyncio.run(main())
+    
+    assert calls == [1]
+    assert [result for result, _ in results] == ["answer"] * 5
+    assert [shared for _, shared in results].count(False) == 1
+    assert flights.get_stats()["coalesced"] == 4
+    assert flights.get_stats()["in_flight"] == 0
+
+def test_nothing_is_cached_after_a_call_finishes():
+    flights = SingleFlight()
+    calls = []
+    
+    async def compute():
+        calls.append(1)
+        return len(calls)
+    
+    async def main():
+        return [await flights.do("key", compute), await flights.do("key", compute)]
+    
+    assert asyncio.run(main()) == [(1, False), (2, False)]
+
+def test_different_keys_do_not_share():
+    flights = SingleFlight()
+    
+    async def main():
+        return await asyncio.gather(
+            flights.do("a", lambda: asyncio.sleep(0.01, result="a")),
+            flights.do("b", lambda: asyncio.sleep(0.01, result="b"))
+        )
+    
+    assert asyncio.run(main()) == [("a", False), ("b", False)]
+
+def test_failure_reaches_every_caller():
+    flights = SingleFlight()
+    
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+    
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fail) for _ in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(main())
+    
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    """The computation runs as its own task, so one caller going away leaves it running."""
+    flights = SingleFlight()
+    
+    async def main():
+        first = asyncio.ensure_future(flights.do("key", lambda: asyncio.sleep(0.05, result="done")))
+        second = asyncio.ensure_future(flights.do("key", lambda: asyncio.sleep(0.05, result="other")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+    
+    assert asyncio.run(main()) == ("done", True)
+
+def test_stream_subscribers_get_every_event():
+    """A subscriber joining late still gets the events produced before it joined."""
+    flights = SingleFlight()
+    
+    async def events():
+        for i in range(3):
+            yield i
+            await asyncio.sleep(0.01)
+    
+    async def collect(stream):
+        return [event async for event in stream]
+    
+    async def main():
+        first, first_shared = flights.stream("key", events)
+        first_task = asyncio.ensure_future(collect(first))
+        await asyncio.sleep(0.015)
+        second, second_shared = flights.stream("key", events)
+        return await asyncio.gather(first_task, collect(second)), first_shared, second_shared
+    
+    (first_events, second_events), first_shared, second_shared = asyncio.run(main())
+    
+    assert first_events == second_events == [0, 1, 2]
+    assert (first_shared, second_shared) == (False, True)
+
+def test_stream_failure_is_raised_to_subscribers():
+    flights = SingleFlight()
+    
+    async def events():
+        yield "token"
+        raise RuntimeError("boom")
+    
+    async def main():
+        stream, _ = flights.stream("key", events)
+        received = []
+        with pytest.raises(RuntimeError):
+            async for event in stream:
+                received.append(event)
+        return received
+    
+    assert asyncio.run(main()) == ["token"] 
\ No newline at end of file
@@ -0,0 +1,91 @@
+import asyncio
+from langchain.schema import AIMessage, SystemMessage
+from app.memory.session_memory import MemoryManager
+from app.memory.summary import ConversationSummarizer
+
+class ScriptedLLM:
+    """Answers summary prompts with numbered summaries, optionally running a hook first."""
+    
+    def __init__(self, error=None, before_answer=None):
+        self.prompts = []
+        self.error = error
+        self.before_answer = before_answer
+    
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        if self.before_answer:
+            self.before_answer()
+        if self.error:
+            raise self.error
+        return AIMessage(content=f"summary {len(self.prompts)}")
+
+def summarize(session, llm, schedules=1):
+    summarizer = ConversationSummarizer()
+    summarizer.llm = llm
+    
+    async def main():
+        for _ in range(schedules):
+            summarizer.schedule(session)
+        await asyncio.gather(*summarizer._tasks)
+    
+    asyncio.run(main())
+    return summarizer
+
+def windowed_session(window_tokens=8):
+    session = MemoryManager(window_tokens=window_tokens).get_session("s")
+    session.add_messages([
+        ("user", "what colour is the sky today"),
+        ("agent", "the sky is blue today"),
+        ("user", "and what colour is the grass")
+    ])
+    return session
+
+def test_messages_outside_the_window_are_folded_into_the_summary():
+    session = windowed_session()
+    llm = ScriptedLLM()
+    
+    summarizer = summarize(session, llm)
+    
+    assert len(llm.prompts) == 1
+    assert "what colour is the sky today" in llm.prompts[0]
+    assert [record.content for record in session.messages] == ["and what colour is the grass"]
+    assert session.summary == "summary 1"
+    assert session.get_messages()[0] == SystemMessage(content="Summary of the earlier conversation: summary 1")
+    assert summarizer.get_stats() == {"running": 0, "summaries": 1, "messages_summarized": 2, "failures": 0}
+
+def test_session_within_its_window_is_not_summarized():
+    session = windowed_session(window_tokens=1000)
+    llm = ScriptedLLM()
+    
+    summarize(session, llm)
+    
+    assert llm.prompts == []
+    assert len(session.messages) == 3
+
+def test_one_task_runs_per_session():
+    llm = ScriptedLLM()
+    
+    summarize(windowed_session(), llm, schedules=3)
+    
+    assert len(llm.prompts) == 1
+
+def test_failed_summary_keeps_the_messages_verbatim():
+    session = windowed_session()
+    
+    summarizer = summarize(session, ScriptedLLM(error=RuntimeError("rate limited")))
+    
+    assert len(session.messages) == 3
+    assert session.summary == ""
+    assert summarizer.get_stats()["failures"] == 1
+
+def test_summary_of_a_session_cleared_meanwhile_is_discarded():
+    session = windowed_session()
+    
+    def clear_and_restart():
+        session.clear()
+        session.add_message("user", "a new conversation")
+    
+    summarize(session, ScriptedLLM(before_answer=clear_and_restart))
+    
+    assert session.summary == ""
+    assert [record.content for record in session.messages] == ["a new conversation"] 
\ No newline at end of file
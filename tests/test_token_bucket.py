@@ -0,0 +1,57 @@
+import pytest
+from app.ingest import embedding_pipeline
+from app.ingest.embedding_pipeline import TokenBucket
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock that `time.sleep` advances instead of blocking."""
+    now = [1000.0]
+    sleeps = []
+    
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+    
+    monkeypatch.setattr(embedding_pipeline.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(embedding_pipeline.time, "sleep", sleep)
+    return now, sleeps
+
+def test_full_bucket_does_not_wait(clock):
+    _, sleeps = clock
+    bucket = TokenBucket(60)
+    
+    for _ in range(60):
+        bucket.acquire()
+    
+    assert sleeps == []
+    assert bucket.tokens == pytest.approx(0)
+
+def test_empty_bucket_waits_for_refill(clock):
+    """Tokens refill at `capacity` per minute, so one token of 60/min takes a second."""
+    _, sleeps = clock
+    bucket = TokenBucket(60)
+    bucket.acquire(60)
+    
+    bucket.acquire(3)
+    
+    assert sum(sleeps) == pytest.approx(3)
+
+def test_refill_is_capped_at_capacity(clock):
+    now, sleeps = clock
+    bucket = TokenBucket(60)
+    bucket.acquire(60)
+    now[0] += 3600
+    
+    bucket.acquire(60)
+    bucket.acquire(1)
+    
+    assert sum(sleeps) == pytest.approx(1)
+
+def test_request_larger_than_capacity_drains_the_bucket(clock):
+    _, sleeps = clock
+    bucket = TokenBucket(10)
+    
+    bucket.acquire(1000)
+    
+    assert sleeps == []
+    assert bucket.tokens == pytest.approx(0) 
\ No newline at end of file
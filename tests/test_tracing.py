@@ -0,0 +1,65 @@
+import asyncio
+from app.utils.async_utils import run_sync
+from app.utils.tracing import TraceBuffer, annotate, span, start_span, trace
+
+def traced(name="request"):
+    with trace(name, session_id="s") as root:
+        with span("retrieve", k=4):
+            annotate(documents=2)
+        with span("answer"):
+            pass
+    return root
+
+def test_spans_nest_under_the_trace():
+    data = traced().to_dict()
+    
+    assert data["name"] == "request"
+    assert data["attributes"] == {"session_id": "s"}
+    assert [child["name"] for child in data["children"]] == ["retrieve", "answer"]
+    assert data["children"][0]["attributes"] == {"k": 4, "documents": 2}
+    assert data["children"][1]["start_ms"] >= data["children"][0]["start_ms"]
+
+def test_spans_outside_a_trace_do_nothing():
+    with span("untraced") as current:
+        annotate(ignored=True)
+    
+    assert current is None
+    assert start_span("untraced") is None
+
+def test_spans_from_the_thread_pool_join_the_trace():
+    def blocking_work():
+        with span("blocking"):
+            pass
+    
+    async def main():
+        with trace("request") as root:
+            await run_sync(blocking_work)
+        return root
+    
+    assert [child.name for child in asyncio.run(main()).children] == ["blocking"]
+
+def test_finishing_the_trace_ends_open_spans():
+    with trace("request") as root:
+        callback_span = start_span("llm")
+    
+    assert callback_span.end is not None
+
+def test_buffer_keeps_the_most_recent_traces():
+    buffer = TraceBuffer(2)
+    recorded = [buffer.record(traced(f"request-{i}")) for i in range(3)]
+    
+    recent = buffer.recent()
+    
+    assert [entry["name"] for entry in recent] == ["request-2", "request-1"]
+    assert "children" not in recent[0]
+    assert buffer.get(recorded[0]["trace_id"]) is None
+    assert buffer.get(recorded[2]["trace_id"])["children"][0]["name"] == "retrieve"
+    assert [entry["name"] for entry in buffer.recent(limit=1)] == ["request-2"]
+
+def test_disabled_buffer_still_returns_the_trace():
+    buffer = TraceBuffer(0)
+    
+    data = buffer.record(traced())
+    
+    assert data["trace_id"]
+    assert buffer.recent() == [] 
\ No newline at end of file